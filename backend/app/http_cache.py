@@ -0,0 +1,65 @@
+"""
+HTTP validator helpers (ETag / Last-Modified) shared by the routers.
+
+Routers compute a cheap validator for a resource, compare it with the
+request's ``If-None-Match`` / ``If-Modified-Since`` headers and answer
+``304 Not Modified`` before loading or serializing the full representation.
+"""
+import hashlib
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+from fastapi import Request, Response
+
+
+def make_etag(*parts) -> str:
+    """Build a strong, quoted ETag from the given version components."""
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """Weak comparison of an If-None-Match header against the current ETag."""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    current = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == current
+        for candidate in if_none_match.split(",")
+    )
+
+
+def is_not_modified(
+    request: Request,
+    etag: Optional[str],
+    last_modified: Optional[datetime] = None,
+) -> bool:
+    """
+    Evaluate conditional GET headers.
+
+    If-None-Match takes precedence; If-Modified-Since is only consulted when
+    the client sent no entity tags (RFC 9110 section 13.2.2).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        return etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def not_modified_response(etag: Optional[str], headers: Optional[Dict[str, str]] = None) -> Response:
+    """Empty 304 carrying the validators and caching headers of the resource."""
+    out = dict(headers or {})
+    if etag:
+        out["ETag"] = etag
+    return Response(status_code=304, headers=out)
@@ -14,6 +14,9 @@ from app.modules.tests.router import router as tests_router
 from app.modules.audit.router import router as audit_router
 from app.database import create_tables
 from app.modules.defects.router import router as defects_router
+from app.modules.photos.workers import image_pool
+from app.modules.photos.storage import photo_storage
+from app.modules.photos.jobs import photo_jobs
 
 
 
@@ -48,9 +51,14 @@ async def lifespan(app: FastAPI):
     print("📊 Creating database tables...")
     create_tables()
     print("✅ Database tables ready")
+    photo_jobs.start()
     yield
     # Shutdown
     print(f"👋 Shutting down {APP_NAME}")
+    # Let running jobs finish before their worker pool goes away
+    await photo_jobs.drain()
+    image_pool.shutdown()
+    photo_storage.shutdown()
 
 
 # Create FastAPI application
@@ -70,6 +78,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
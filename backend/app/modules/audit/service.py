@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime  
-from typing import Any, Dict, Optional, Tuple, List
+from typing import Any, Dict, Iterable, Optional, Tuple, List
 
 import logging  
 from sqlalchemy.orm import Session
@@ -42,6 +42,33 @@ def log_action(
         logger.exception("Failed to write audit log entry")  
 
 
+def log_actions(db: Session, entries: Iterable[Dict[str, Any]]) -> None:
+    """
+    Write several audit log entries in a single transaction.
+
+    Each entry is a dict of log_action's keyword arguments. Like
+    log_action, this never breaks the main request flow.
+    """
+    try:
+        rows = [
+            AuditLog(
+                action=entry["action"],
+                entity_type=entry["entity_type"],
+                entity_id=entry["entity_id"],
+                username=entry["username"],
+                meta=entry.get("meta") or {},
+            )
+            for entry in entries
+        ]
+        if not rows:
+            return
+        db.add_all(rows)
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.exception("Failed to write audit log entries")
+
+
 def get_log_by_id(db: Session, log_id: int) -> Optional[AuditLog]:
     return db.query(AuditLog).filter(AuditLog.id == log_id).first()
 
@@ -5,6 +5,9 @@ from sqlalchemy.orm import relationship
 
 from app.database import Base
 
+# Values of the DB enum defect_severity (init.sql)
+DEFECT_SEVERITIES = ("low", "medium", "high", "critical")
+
 
 class DefectCategory(Base):
     __tablename__ = "defect_category"
@@ -1,9 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List
 import logging
 
 from app.database import get_db
+from app.http_cache import is_not_modified, make_etag, not_modified_response
 from .service import defects_service
 from .schemas import (
     CategoryResponse,
@@ -38,9 +39,20 @@ async def create_defect(photo_id: int, payload: DefectCreate, db: Session = Depe
 
 
 @router.get("/photo/{photo_id}", response_model=List[DefectResponse])
-async def list_defects(photo_id: int, db: Session = Depends(get_db)):
-    """Get all defects for a specific photo."""
-    return await defects_service.list_defects_for_photo(db, photo_id)   
+async def list_defects(photo_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    """Get all defects for a specific photo.
+
+    The ETag is derived from the photo's defects_version, so a matching
+    If-None-Match is answered with 304 without loading any defects.
+    """
+    version = await defects_service.get_defects_version(db, photo_id)
+    if version is not None:
+        etag = make_etag("defects", photo_id, version)
+        if is_not_modified(request, etag):
+            return not_modified_response(etag, {"Cache-Control": "no-cache"})
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+    return await defects_service.list_defects_for_photo(db, photo_id)
 
 
 @router.get("/{defect_id}", response_model=DefectResponse)
@@ -4,6 +4,7 @@ from typing import List, Optional
 
 from .models import Defect, DefectAnnotation, DefectCategory
 from .schemas import DefectCreate, DefectUpdate, AnnotationCreate
+from app.modules.photos.models import Photo
 
 
 class DefectsService:
@@ -14,6 +15,17 @@ class DefectsService:
     and their associated annotations.
     """
     
+    def _bump_photo_version(self, db: Session, photo_id: int) -> None:
+        """Increment the photo's defects_version in the current transaction."""
+        db.query(Photo).filter(Photo.id == photo_id).update(
+            {Photo.defects_version: Photo.defects_version + 1},
+            synchronize_session=False,
+        )
+
+    async def get_defects_version(self, db: Session, photo_id: int) -> Optional[int]:
+        """Current defect list version of a photo (None if the photo does not exist)."""
+        return db.query(Photo.defects_version).filter(Photo.id == photo_id).scalar()
+
     async def list_categories(self, db: Session) -> List[DefectCategory]:
         """Get all defect categories ordered by name."""
         return db.query(DefectCategory).order_by(DefectCategory.name.asc()).all()
@@ -36,6 +48,7 @@ class DefectsService:
                 geometry=ann.geometry
             ))
 
+        self._bump_photo_version(db, photo_id)
         db.commit()
         db.refresh(defect)
         return defect
@@ -56,6 +69,9 @@ class DefectsService:
             geometry=ann.geometry
         )
         db.add(row)
+        photo_id = db.query(Defect.photo_id).filter(Defect.id == defect_id).scalar()
+        if photo_id is not None:
+            self._bump_photo_version(db, photo_id)
         db.commit()
         db.refresh(row)
         return row
@@ -92,6 +108,7 @@ class DefectsService:
                     geometry={}
                 ))
         
+        self._bump_photo_version(db, defect.photo_id)
         db.commit()
         db.refresh(defect)
         return defect
@@ -102,6 +119,7 @@ class DefectsService:
         if not defect:
             return False
         
+        self._bump_photo_version(db, defect.photo_id)
         db.delete(defect)
         db.commit()
         return True     
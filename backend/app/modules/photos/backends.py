@@ -0,0 +1,333 @@
+"""
+Storage backends for photo objects.
+
+A backend is a small, blocking key/value object store. PhotoStorage
+(storage.py) wraps the selected backend with the async facade, thread pool,
+disk cache and metrics, so backends only implement plain I/O.
+
+Selected with ``STORAGE_BACKEND``:
+    minio        MinIO / S3 (default). Bucket setup is deferred to first use,
+                 so constructing the backend does no network I/O.
+    filesystem   Objects are files under ``STORAGE_FS_ROOT``. Stat results
+                 carry ``local_path`` so the image route can hand the file to
+                 the server directly (pathsend / sendfile); ranged reads use
+                 mmap slices.
+"""
+import contextlib
+import json
+import logging
+import mimetypes
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from io import BytesIO
+from typing import Iterator, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger("backend_photos_backends")
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class ObjectInfo(NamedTuple):
+    """Metadata of a stored object, used for Range and validator headers."""
+    size: int
+    etag: Optional[str]
+    last_modified: Optional[datetime]
+    content_type: Optional[str]
+    local_path: Optional[str] = None  # set when the bytes can be served from a local file
+
+
+class StorageBackend(ABC):
+    """Blocking object store interface used by PhotoStorage."""
+
+    name = "abstract"
+    # True when stat() results point at files the web server can send directly
+    serves_local_files = False
+
+    @abstractmethod
+    def put(self, key: str, data: bytes, content_type: str) -> None:
+        """Store ``data`` under ``key``, replacing any existing object."""
+
+    @abstractmethod
+    def stat(self, key: str) -> ObjectInfo:
+        """Return object metadata; raises if the object does not exist."""
+
+    @abstractmethod
+    def open(
+        self,
+        key: str,
+        offset: int = 0,
+        length: Optional[int] = None,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+    ) -> Tuple[ObjectInfo, Iterator[bytes]]:
+        """Open an object (or a byte range of it) for chunked reading."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove an object; deleting a missing key is not an error."""
+
+    def delete_prefix(self, prefix: str) -> None:
+        """Remove every object whose key starts with ``prefix``."""
+        raise NotImplementedError(f"{self.name} backend cannot delete by prefix")
+
+    def exists(self, key: str) -> bool:
+        try:
+            self.stat(key)
+            return True
+        except Exception:
+            return False
+
+    def get(self, key: str) -> bytes:
+        _info, chunks = self.open(key)
+        return b"".join(chunks)
+
+    def public_url(self, key: str) -> str:
+        """Direct URL clients can fetch the object from, if the backend has one."""
+        raise NotImplementedError(f"{self.name} backend has no public URLs")
+
+    def presigned_put_url(self, key: str, expires_seconds: int) -> str:
+        """Time-limited URL clients can PUT the object to, if the backend supports it."""
+        raise NotImplementedError(f"{self.name} backend does not support direct uploads")
+
+
+class MinioBackend(StorageBackend):
+    """MinIO / S3 object storage."""
+
+    name = "minio"
+
+    def __init__(self, client=None, max_connections: int = 10, signing_client=None):
+        # An injected client (tests, custom setups) also signs URLs unless told otherwise
+        if signing_client is None and client is not None:
+            signing_client = client
+        if client is None:
+            import urllib3
+            from minio import Minio
+
+            client = Minio(
+                endpoint=os.getenv("MINIO_ENDPOINT", "minio:9000"),
+                access_key=os.getenv("MINIO_ACCESS_KEY", "minioadmin"),
+                secret_key=os.getenv("MINIO_SECRET_KEY", "minioadmin"),
+                secure=False,
+                http_client=urllib3.PoolManager(
+                    maxsize=max_connections,
+                    block=True,
+                    timeout=urllib3.Timeout(
+                        connect=float(os.getenv("STORAGE_CONNECT_TIMEOUT", "5")),
+                        read=float(os.getenv("STORAGE_READ_TIMEOUT", "30")),
+                    ),
+                    retries=urllib3.Retry(total=3, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]),
+                ),
+            )
+        self.client = client
+        self._signing_client = signing_client
+        self.bucket_name = os.getenv("MINIO_BUCKET", "qc-vision-photos")
+        self.public_endpoint = os.getenv("MINIO_PUBLIC_ENDPOINT", "localhost:9000")
+        self.internal_endpoint = os.getenv("MINIO_ENDPOINT", "minio:9000")
+        self._ready = False
+        self._ready_lock = threading.Lock()
+
+    def ensure_ready(self):
+        """Create the bucket and public-read policy once, on first use."""
+        if self._ready:
+            return
+        with self._ready_lock:
+            if not self._ready:
+                self._ensure_bucket_exists()
+                self._ready = True
+
+    def _ensure_bucket_exists(self):
+        """Create bucket if it doesn't exist and configure for public read access"""
+        if not self.client.bucket_exists(self.bucket_name):
+            self.client.make_bucket(self.bucket_name)
+            logger.info(f"Created bucket: {self.bucket_name}")
+
+        # Set bucket policy to allow public read access
+        # This way we don't need presigned URLs
+        policy = {
+            "Version": "2012-10-17",
+            "Statement": [
+                {
+                    "Effect": "Allow",
+                    "Principal": {"AWS": "*"},
+                    "Action": ["s3:GetObject"],
+                    "Resource": [f"arn:aws:s3:::{self.bucket_name}/*"]
+                }
+            ]
+        }
+
+        try:
+            self.client.set_bucket_policy(self.bucket_name, json.dumps(policy))
+            logger.info(f"Public read policy set for bucket: {self.bucket_name}")
+        except Exception as policy_error:
+            logger.warning(f"Could not set bucket policy: {str(policy_error)}")
+
+    def put(self, key: str, data: bytes, content_type: str) -> None:
+        self.ensure_ready()
+        self.client.put_object(
+            bucket_name=self.bucket_name,
+            object_name=key,
+            data=BytesIO(data),
+            length=len(data),
+            content_type=content_type,
+        )
+
+    def stat(self, key: str) -> ObjectInfo:
+        self.ensure_ready()
+        stat = self.client.stat_object(bucket_name=self.bucket_name, object_name=key)
+        return ObjectInfo(
+            size=stat.size,
+            etag='"' + stat.etag.strip('"') + '"' if stat.etag else None,
+            last_modified=stat.last_modified,
+            content_type=stat.content_type,
+        )
+
+    def open(self, key, offset=0, length=None, chunk_size=STREAM_CHUNK_SIZE):
+        self.ensure_ready()
+        response = self.client.get_object(
+            bucket_name=self.bucket_name,
+            object_name=key,
+            offset=offset,
+            length=length or 0,
+        )
+        headers = response.headers
+        info = ObjectInfo(
+            size=int(headers.get("Content-Length", -1)),
+            etag=headers.get("ETag"),
+            last_modified=parsedate_to_datetime(headers["Last-Modified"]) if headers.get("Last-Modified") else None,
+            content_type=headers.get("Content-Type"),
+        )
+        return info, self._iter_response(response, chunk_size)
+
+    @staticmethod
+    def _iter_response(response, chunk_size: int) -> Iterator[bytes]:
+        try:
+            for chunk in response.stream(chunk_size):
+                yield chunk
+        finally:
+            response.close()
+            response.release_conn()
+
+    def delete(self, key: str) -> None:
+        self.ensure_ready()
+        self.client.remove_object(bucket_name=self.bucket_name, object_name=key)
+
+    def delete_prefix(self, prefix: str) -> None:
+        self.ensure_ready()
+        for obj in self.client.list_objects(bucket_name=self.bucket_name, prefix=prefix, recursive=True):
+            self.client.remove_object(bucket_name=self.bucket_name, object_name=obj.object_name)
+
+    def public_url(self, key: str) -> str:
+        # Direct public URL (no signature needed since bucket is public)
+        return f"http://{self.public_endpoint}/{self.bucket_name}/{key}"
+
+    def _signer(self):
+        """
+        Client configured for the public endpoint.
+
+        SigV4 signatures cover the Host header, so a URL handed to a browser
+        must be signed for the host the browser will use, not minio:9000.
+        An explicit region keeps signing free of network calls.
+        """
+        if self._signing_client is None:
+            from minio import Minio
+
+            self._signing_client = Minio(
+                endpoint=self.public_endpoint,
+                access_key=os.getenv("MINIO_ACCESS_KEY", "minioadmin"),
+                secret_key=os.getenv("MINIO_SECRET_KEY", "minioadmin"),
+                secure=False,
+                region=os.getenv("MINIO_REGION", "us-east-1"),
+            )
+        return self._signing_client
+
+    def presigned_put_url(self, key: str, expires_seconds: int) -> str:
+        self.ensure_ready()
+        return self._signer().presigned_put_object(
+            bucket_name=self.bucket_name,
+            object_name=key,
+            expires=timedelta(seconds=expires_seconds),
+        )
+
+
+class FilesystemBackend(StorageBackend):
+    """Objects stored as plain files under a root directory."""
+
+    name = "filesystem"
+    serves_local_files = True
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        path = os.path.normpath(os.path.join(self.root, key.lstrip("/")))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid object key: {key}")
+        return path
+
+    def _info(self, path: str, st: os.stat_result) -> ObjectInfo:
+        return ObjectInfo(
+            size=st.st_size,
+            etag=f'"{st.st_mtime_ns:x}-{st.st_size:x}"',
+            last_modified=datetime.fromtimestamp(st.st_mtime, tz=timezone.utc),
+            content_type=mimetypes.guess_type(path)[0] or "application/octet-stream",
+            local_path=path,
+        )
+
+    def put(self, key: str, data: bytes, content_type: str) -> None:
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+            raise
+
+    def stat(self, key: str) -> ObjectInfo:
+        path = self._path(key)
+        return self._info(path, os.stat(path))
+
+    def open(self, key, offset=0, length=None, chunk_size=STREAM_CHUNK_SIZE):
+        path = self._path(key)
+        fh = open(path, "rb")
+        info = self._info(path, os.fstat(fh.fileno()))
+        end = info.size if not length else min(offset + length, info.size)
+        return info, self._iter_mmap(fh, offset, end, chunk_size)
+
+    @staticmethod
+    def _iter_mmap(fh, start: int, end: int, chunk_size: int) -> Iterator[bytes]:
+        try:
+            if end <= start:
+                return
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for pos in range(start, end, chunk_size):
+                    yield mm[pos:min(pos + chunk_size, end)]
+        finally:
+            fh.close()
+
+    def delete(self, key: str) -> None:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self._path(key))
+
+    def delete_prefix(self, prefix: str) -> None:
+        # Derived objects live in a directory per photo (prefix ends with "/")
+        shutil.rmtree(self._path(prefix), ignore_errors=True)
+
+
+def create_backend(max_connections: int = 10) -> StorageBackend:
+    """Instantiate the backend selected by STORAGE_BACKEND."""
+    kind = os.getenv("STORAGE_BACKEND", "minio").lower()
+    if kind == "filesystem":
+        return FilesystemBackend(os.getenv("STORAGE_FS_ROOT", "./data/photos"))
+    if kind == "minio":
+        return MinioBackend(max_connections=max_connections)
+    raise ValueError(f"Unknown STORAGE_BACKEND: {kind} (expected 'minio' or 'filesystem')")
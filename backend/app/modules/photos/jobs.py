@@ -0,0 +1,225 @@
+"""
+Persistent processing queue for asynchronous uploads.
+
+``POST /photos/upload?mode=async`` stores the raw bytes under ``staging/``,
+creates the Photo row in the ``processing`` state and a PhotoJob in the
+same transaction, and answers 202. Consumers running in the application
+process claim due jobs from the ``photo_jobs`` table and push the CPU work
+into the image worker pool, so the queue survives restarts and can be
+drained by several uvicorn workers at once. Direct uploads are queued the
+same way once their staging object has arrived, and their DirectUpload row
+follows the job's outcome:
+
+- claiming uses ``SELECT ... FOR UPDATE SKIP LOCKED`` on PostgreSQL (SQLite
+  has a single writer and ignores the clause);
+- validation errors fail the job and the photo immediately; anything else
+  is retried with exponential backoff until ``max_attempts``;
+- on shutdown ``drain()`` stops claiming and waits for running jobs; jobs
+  left ``running`` by a crashed process are requeued after
+  ``PHOTO_JOB_STALE_AFTER`` seconds.
+
+Configuration (environment variables):
+    PHOTO_JOB_CONSUMERS      concurrent consumers per process (default: 2, 0 disables)
+    PHOTO_JOB_POLL           seconds between polls when idle (default: 2)
+    PHOTO_JOB_MAX_ATTEMPTS   attempts before a job fails for good (default: 5)
+    PHOTO_JOB_BACKOFF        base retry delay in seconds, doubled per attempt (default: 5)
+    PHOTO_JOB_STALE_AFTER    seconds before a running job is presumed dead (default: 600)
+    PHOTO_JOB_DRAIN_TIMEOUT  seconds shutdown waits for running jobs (default: 30)
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from .models import DirectUpload, Photo, PhotoJob
+
+logger = logging.getLogger("backend_photos_jobs")
+
+
+class PhotoJobQueue:
+    """Database-backed job queue with in-process async consumers."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        consumers: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+        max_attempts: Optional[int] = None,
+        backoff: Optional[float] = None,
+    ):
+        self.session_factory = session_factory
+        self.consumers = consumers if consumers is not None else int(os.getenv("PHOTO_JOB_CONSUMERS", "2"))
+        self.poll_interval = poll_interval if poll_interval is not None else float(os.getenv("PHOTO_JOB_POLL", "2"))
+        self.max_attempts = max_attempts if max_attempts is not None else int(os.getenv("PHOTO_JOB_MAX_ATTEMPTS", "5"))
+        self.backoff = backoff if backoff is not None else float(os.getenv("PHOTO_JOB_BACKOFF", "5"))
+        self.stale_after = float(os.getenv("PHOTO_JOB_STALE_AFTER", "600"))
+        self.drain_timeout = float(os.getenv("PHOTO_JOB_DRAIN_TIMEOUT", "30"))
+
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._running = 0
+        self._metrics = {"completed": 0, "retried": 0, "failed": 0}
+
+    # --- producer side -------------------------------------------------
+
+    def enqueue(self, db: Session, photo: Photo, staging_key: str, filename: str) -> PhotoJob:
+        """Add a job for ``photo``; committed together with the caller's transaction."""
+        job = PhotoJob(
+            photo=photo,
+            filename=filename,
+            staging_key=staging_key,
+            status="queued",
+            max_attempts=self.max_attempts,
+        )
+        db.add(job)
+        return job
+
+    def notify(self) -> None:
+        """Wake idle consumers after a commit instead of waiting for the next poll."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    # --- consumer side -------------------------------------------------
+
+    def claim(self, db: Session) -> Optional[PhotoJob]:
+        """Lock the oldest due job, mark it running and commit."""
+        now = datetime.now(timezone.utc)
+        job = (
+            db.query(PhotoJob)
+            .filter(PhotoJob.status == "queued", PhotoJob.next_run_at <= now)
+            .order_by(PhotoJob.next_run_at, PhotoJob.id)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if job is None:
+            db.rollback()
+            return None
+        job.status = "running"
+        job.attempts += 1
+        job.locked_at = now
+        db.commit()
+        return job
+
+    def requeue_stale(self, db: Session) -> int:
+        """Return jobs stuck in ``running`` (their process died) to the queue."""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.stale_after)
+        count = (
+            db.query(PhotoJob)
+            .filter(PhotoJob.status == "running", PhotoJob.locked_at < cutoff)
+            .update({"status": "queued", "locked_at": None}, synchronize_session=False)
+        )
+        db.commit()
+        if count:
+            logger.warning(f"Requeued {count} stale photo job(s)")
+        return count
+
+    async def process(self, db: Session, job: PhotoJob) -> None:
+        """Run one claimed job and record its outcome."""
+        # Imported here: service imports this module for enqueue()
+        from .service import photo_service
+
+        try:
+            await photo_service.process_staged_photo(db, job)
+        except Exception as e:
+            db.rollback()
+            permanent = isinstance(e, ValueError) or job.attempts >= job.max_attempts
+            job.last_error = str(e)
+            job.locked_at = None
+            if permanent:
+                job.status = "failed"
+                if job.photo is not None:
+                    job.photo.status = "failed"
+                    db.query(DirectUpload).filter(DirectUpload.photo_id == job.photo_id).update(
+                        {"status": "failed", "error": str(e)}, synchronize_session=False
+                    )
+                self._metrics["failed"] += 1
+                logger.error(f"Photo job {job.id} failed after {job.attempts} attempt(s): {str(e)}")
+            else:
+                delay = self.backoff * 2 ** (job.attempts - 1)
+                job.status = "queued"
+                job.next_run_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+                self._metrics["retried"] += 1
+                logger.warning(f"Photo job {job.id} attempt {job.attempts} failed, retrying in {delay:.0f}s: {str(e)}")
+            db.commit()
+            if permanent and isinstance(e, ValueError):
+                # Not a usable image; the raw bytes are of no further use
+                await photo_service.discard_staged(job)
+        else:
+            self._metrics["completed"] += 1
+
+    async def run_once(self) -> bool:
+        """Claim and process a single due job; False when the queue is idle."""
+        with self.session_factory() as db:
+            job = self.claim(db)
+            if job is None:
+                return False
+            self._running += 1
+            try:
+                await self.process(db, job)
+            finally:
+                self._running -= 1
+            return True
+
+    async def _consume(self):
+        while not self._stopping:
+            try:
+                if await self.run_once():
+                    continue
+            except Exception:
+                logger.exception("Photo job consumer error")
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    # --- lifecycle -----------------------------------------------------
+
+    def start(self) -> None:
+        """Start consumers on the running loop. Called from the application lifespan."""
+        if self.consumers <= 0 or self._tasks:
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        try:
+            with self.session_factory() as db:
+                self.requeue_stale(db)
+        except Exception:
+            logger.exception("Could not requeue stale photo jobs")
+        self._tasks = [asyncio.create_task(self._consume()) for _ in range(self.consumers)]
+        logger.info(f"Started {self.consumers} photo job consumer(s)")
+
+    async def drain(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop claiming jobs and wait for running ones to finish.
+
+        Jobs still running after ``timeout`` are cancelled; they stay
+        ``running`` in the table and are requeued as stale on a later start.
+        """
+        if not self._tasks:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        done, pending = await asyncio.wait(self._tasks, timeout=timeout if timeout is not None else self.drain_timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            logger.warning(f"Photo job drain timed out, cancelled {len(pending)} consumer(s)")
+        self._tasks = []
+        logger.info("Photo job consumers drained")
+
+    def stats(self) -> dict:
+        return {
+            "consumers": len(self._tasks),
+            "running": self._running,
+            **self._metrics,
+        }
+
+
+photo_jobs = PhotoJobQueue()
@@ -1,14 +1,21 @@
 """
 Photo database models
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
-from datetime import datetime
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, Text
+from sqlalchemy.orm import relationship
+from datetime import datetime, timezone
 
 from app.database import Base
 
 
 class Photo(Base):
     __tablename__ = "photos"
+    __table_args__ = (
+        # Keyset pagination of a test's photos in (time_stamp, id) order
+        Index("idx_photos_test_time", "test_id", "time_stamp", "id"),
+        # Cross-test feed, newest first
+        Index("idx_photos_time", "time_stamp", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     test_id = Column(Integer, ForeignKey("quality_tests.id", ondelete="CASCADE"), nullable=False, index=True)
@@ -16,3 +23,70 @@ class Photo(Base):
     file_path = Column(Text, nullable=False)
     time_stamp = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
     analysis_results = Column(Text, nullable=True)
+    # Bumped on every defect/annotation change; drives the defect list ETag
+    defects_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # ready | processing (queued by an async upload) | failed
+    status = Column(String(20), nullable=False, default="ready", server_default="ready")
+    # Tiny base64 JPEG data URI shown until the image has loaded
+    placeholder = Column(Text, nullable=True)
+
+
+class DirectUpload(Base):
+    """
+    A photo uploaded by the client straight to storage (presigned PUT).
+
+    Tracks the staging object from ticket issue to the Photo row created by
+    background ingestion: awaiting_upload -> processing -> done | failed.
+    """
+    __tablename__ = "photo_direct_uploads"
+
+    id = Column(String(32), primary_key=True)
+    test_id = Column(Integer, ForeignKey("quality_tests.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    filename = Column(Text, nullable=False)
+    content_type = Column(String(100), nullable=False)
+    staging_key = Column(Text, nullable=False)
+    status = Column(String(20), nullable=False, default="awaiting_upload")
+    photo_id = Column(Integer, ForeignKey("photos.id", ondelete="SET NULL"), nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+
+class PhotoJob(Base):
+    """
+    Persistent image processing job behind an asynchronous upload.
+
+    The raw upload sits at ``staging_key`` until a consumer claims the job
+    (SELECT ... FOR UPDATE SKIP LOCKED), processes it and points the photo
+    at the stored result. Failed attempts are retried with backoff.
+    """
+    __tablename__ = "photo_jobs"
+    __table_args__ = (Index("idx_photo_jobs_due", "status", "next_run_at"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    photo_id = Column(Integer, ForeignKey("photos.id", ondelete="CASCADE"), nullable=False, index=True)
+
+    filename = Column(Text, nullable=False)
+    staging_key = Column(Text, nullable=False)
+    # queued | running | done | failed
+    status = Column(String(20), nullable=False, default="queued")
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    next_run_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc),
+    )
+
+    photo = relationship("Photo")
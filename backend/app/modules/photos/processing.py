@@ -0,0 +1,455 @@
+"""
+Pure image pipeline used by the photo upload path.
+
+Everything in this module is synchronous and side-effect free so it can run
+inside an ImageWorkerPool process: functions take bytes and return bytes
+(or plain data), never open files, sessions or storage clients.
+"""
+import base64
+import hashlib
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from io import BytesIO
+
+from PIL import Image, features
+
+logger = logging.getLogger("backend_photos_processing")
+
+MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'WEBP'}
+MIN_DIMENSION = 10
+MAX_DIMENSION = 10000
+# Decompression-bomb guard: header-declared pixel count accepted for decoding
+MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", 50_000_000))
+# Pixel memory (MiB) that may be decoded at the same time across the pool
+DECODE_BUDGET_MB = int(os.getenv("IMAGE_DECODE_BUDGET_MB", "512"))
+MAX_OUTPUT_DIMENSION = 2000
+JPEG_QUALITY = 85
+THUMBNAIL_SIZE = (300, 300)
+PREVIEW_SIZE = (1024, 1024)
+# Box-reduce by integer factors while the source is this many times larger
+# than the target, then finish with LANCZOS (see Image.resize reducing_gap)
+REDUCING_GAP = 3.0
+# Store compliant JPEGs byte-for-byte instead of re-encoding them
+JPEG_PASSTHROUGH = os.getenv("IMAGE_JPEG_PASSTHROUGH", "true").lower() not in ("0", "false", "no")
+# On-the-fly renditions: output format -> (Pillow format, MIME type, save options)
+RENDER_FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg", {"quality": JPEG_QUALITY}),
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+}
+if features.check("avif"):
+    RENDER_FORMATS["avif"] = ("AVIF", "image/avif", {"quality": 60})
+RENDER_FITS = ("contain", "cover")
+# Inline low-quality placeholder (LQIP): longest side and JPEG quality
+PLACEHOLDER_SIZE = 32
+PLACEHOLDER_QUALITY = 40
+# Deep-zoom tiles: edge length and JPEG quality
+TILE_SIZE = int(os.getenv("PHOTO_TILE_SIZE", "256"))
+TILE_QUALITY = 80
+
+
+@dataclass
+class ProcessedPhoto:
+    """Result of the upload pipeline, safe to pickle across processes."""
+    data: bytes
+    content_type: str
+    width: int
+    height: int
+    sha256: str = ""  # hex digest of ``data``, used as the storage key
+    passthrough: bool = False  # True when ``data`` is the original upload
+    placeholder: str = ""  # tiny base64 JPEG data URI shown while loading
+    derivatives: dict = field(default_factory=dict)  # variant name -> JPEG bytes
+
+
+@dataclass
+class TilePyramid:
+    """Deep-zoom tiles of one image; ``tiles`` maps "z/x/y" to JPEG bytes."""
+    width: int
+    height: int
+    tile_size: int
+    levels: int
+    tiles: dict = field(default_factory=dict)
+
+
+def validate_image(data: BytesIO, filename: str) -> Image.Image:
+    """
+    Validate photo file (size, format, dimensions, pixel budget) and return
+    the opened, not yet decoded image.
+
+    Only the header is parsed: every rejection happens before any pixel
+    data is decoded. Truncated or corrupt pixel data surfaces later, from
+    the single decode in process_upload.
+    """
+    # 1. Check file size BEFORE opening
+    data.seek(0, 2)  # Seek to end
+    file_size = data.tell()
+    data.seek(0)  # Reset
+
+    if file_size > MAX_FILE_SIZE:
+        raise ValueError(f"File too large: {file_size} bytes (max {MAX_FILE_SIZE})")
+
+    if file_size == 0:
+        raise ValueError("File is empty")
+
+    # 2. Header parse
+    try:
+        img = Image.open(data)
+    except Image.DecompressionBombError as e:
+        raise ValueError(f"Image too large: {str(e)}")
+    except Exception as e:
+        raise ValueError(f"Invalid image file: {str(e)}")
+
+    if img.format not in ALLOWED_FORMATS:
+        raise ValueError(f"Unsupported format: {img.format}. Allowed: {', '.join(ALLOWED_FORMATS)}")
+
+    # 3. Dimensions and pixel budget (decompression-bomb guard)
+    width, height = img.size
+
+    if width < MIN_DIMENSION or height < MIN_DIMENSION:
+        raise ValueError(f"Image too small: {width}x{height} (minimum {MIN_DIMENSION}x{MIN_DIMENSION})")
+    if width > MAX_DIMENSION or height > MAX_DIMENSION:
+        raise ValueError(f"Image too large: {width}x{height} (maximum {MAX_DIMENSION}x{MAX_DIMENSION})")
+    if width * height > MAX_PIXELS:
+        raise ValueError(f"Image too large: {width * height} pixels (maximum {MAX_PIXELS})")
+
+    logger.info(f"Validated photo: {filename} ({img.format}, {width}x{height}, {file_size} bytes)")
+
+    return img
+
+
+def decoded_bytes(image: Image.Image, max_dimension: int) -> int:
+    """
+    Estimate the largest pixel buffer decoding ``image`` for an output of at
+    most ``max_dimension`` will allocate.
+
+    Mirrors Image.draft(): a JPEG is decoded at the largest 1/2, 1/4 or 1/8
+    scale that still covers the target; other formats decode in full. Four
+    bytes per pixel covers the RGBA intermediate of the RGB flattening.
+    """
+    width, height = image.size
+    if image.format == "JPEG" and (width > max_dimension or height > max_dimension):
+        ratio = min(max_dimension / width, max_dimension / height)
+        target_w, target_h = max(int(width * ratio), 1), max(int(height * ratio), 1)
+        scale = min(width // target_w, height // target_h)
+        for factor in (8, 4, 2, 1):
+            if scale >= factor:
+                break
+        width, height = -(-width // factor), -(-height // factor)
+    return width * height * 4
+
+
+class DecodeBudget:
+    """
+    Caps the pixel memory decoded concurrently.
+
+    The budget is counted in MiB units of a (bounded) semaphore; a job
+    takes all the units it needs under ``lock`` so two large decodes can
+    never each hold half of the budget and wait forever. A job larger than
+    the whole budget is clamped to it, i.e. it runs alone.
+
+    Thread primitives by default; ImageWorkerPool installs multiprocessing
+    ones in every worker process (install_decode_budget) so the cap is
+    shared by the whole pool.
+    """
+
+    def __init__(self, max_mb: int, semaphore=None, lock=None):
+        self.max_mb = max(int(max_mb), 1)
+        self._units = semaphore if semaphore is not None else threading.BoundedSemaphore(self.max_mb)
+        self._lock = lock if lock is not None else threading.Lock()
+
+    @contextmanager
+    def reserve(self, nbytes: int):
+        units = min(max(-(-nbytes // (1024 * 1024)), 1), self.max_mb)
+        with self._lock:
+            for _ in range(units):
+                self._units.acquire()
+        try:
+            yield units
+        finally:
+            for _ in range(units):
+                self._units.release()
+
+
+decode_budget = DecodeBudget(DECODE_BUDGET_MB)
+
+
+def install_decode_budget(semaphore, lock, max_mb: int) -> None:
+    """Worker process initializer: share the pool-wide decode budget."""
+    global decode_budget
+    decode_budget = DecodeBudget(max_mb, semaphore=semaphore, lock=lock)
+
+
+def process_image(image: Image.Image, max_dimension: int = MAX_OUTPUT_DIMENSION) -> Image.Image:
+    """
+    Process image: resize if too large, convert to RGB.
+
+    Large JPEGs that have not been decoded yet are decoded at a reduced DCT
+    scale (1/2, 1/4 or 1/8) that still covers the target size, so a 40MP
+    frame never materialises at full resolution. Other formats are
+    box-reduced by an integer factor before the final LANCZOS pass.
+    """
+    width, height = image.size
+
+    # Resize if too large
+    if width > max_dimension or height > max_dimension:
+        ratio = min(max_dimension / width, max_dimension / height)
+        image = resample(image, (int(width * ratio), int(height * ratio)))
+
+    return flatten_rgb(image)
+
+
+def resample(image: Image.Image, size) -> Image.Image:
+    """Downscale to ``size`` with a reduced DCT decode and box pre-reduction."""
+    size = (max(int(size[0]), 1), max(int(size[1]), 1))
+    # No-op for non-JPEGs and for images whose pixels are already loaded
+    image.draft(image.mode, size)
+    return image.resize(size, Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+
+
+def flatten_rgb(image: Image.Image) -> Image.Image:
+    """Composite transparent images onto white so they can be saved as JPEG."""
+    # Convert to RGB for JPEG compatibility
+    if image.mode in ('RGBA', 'LA', 'P'):
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        if image.mode == 'P':
+            image = image.convert('RGBA')
+        if 'A' in image.mode:
+            background.paste(image, mask=image.split()[-1])
+        else:
+            background.paste(image)
+        image = background
+
+    return image
+
+
+# EXIF Orientation value -> transpose that makes the pixels upright
+# (the same table as PIL.ImageOps.exif_transpose)
+EXIF_ORIENTATION = 0x0112
+_ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+
+def exif_orientation(image: Image.Image) -> int:
+    """EXIF Orientation of an opened image (1 when absent), read from the header."""
+    try:
+        return int(image.getexif().get(EXIF_ORIENTATION, 1))
+    except (TypeError, ValueError, SyntaxError):
+        return 1
+
+
+def apply_orientation(image: Image.Image, orientation: int) -> Image.Image:
+    """
+    Rotate/flip pixels as the EXIF Orientation says.
+
+    Like ImageOps.exif_transpose, but the orientation is read up front so it
+    can be applied after downscaling: transposing first would load the full
+    image and defeat the reduced DCT decode.
+    """
+    method = _ORIENTATION_TRANSPOSE.get(orientation)
+    return image.transpose(method) if method is not None else image
+
+
+def image_to_bytes(image: Image.Image, format: str = 'JPEG', quality: int = JPEG_QUALITY) -> bytes:
+    """Convert PIL Image to bytes."""
+    buffer = BytesIO()
+    image.save(buffer, format=format, quality=quality)
+    buffer.seek(0)
+    return buffer.read()
+
+
+def is_passthrough_compliant(image: Image.Image) -> bool:
+    """
+    Check, from header data only, whether an upload can be stored as-is.
+
+    The full-size output of the pipeline is an RGB JPEG no larger than
+    MAX_OUTPUT_DIMENSION; an input that already is one would only lose
+    quality (and CPU time) by being decoded and re-encoded.
+
+    Only JPEGs without EXIF or XMP metadata qualify: stored bytes are sent
+    to every client, so camera details and GPS positions must not survive,
+    and an EXIF Orientation would make the full image and its (transposed,
+    metadata-free) derivatives disagree. Those uploads are re-encoded.
+    """
+    width, height = image.size
+    return (
+        image.format == "JPEG"
+        and image.mode == "RGB"
+        and width <= MAX_OUTPUT_DIMENSION
+        and height <= MAX_OUTPUT_DIMENSION
+        and not image.info.get("exif")
+        and not image.info.get("xmp")
+    )
+
+
+def make_derivatives(image: Image.Image) -> dict:
+    """
+    Render the smaller named variants of an already processed image.
+
+    Each step resamples the previous (smaller) result, so the source is
+    decoded once and the thumbnail never touches the full-size pixels.
+    """
+    preview = process_image(image, max(PREVIEW_SIZE))
+    thumb = process_image(preview, max(THUMBNAIL_SIZE))
+    return {
+        "preview": image_to_bytes(preview, quality=JPEG_QUALITY),
+        "thumb": image_to_bytes(thumb, quality=JPEG_QUALITY),
+    }
+
+
+def render_size(source, width, height, fit: str = "contain"):
+    """
+    Output size of a rendition of a ``source``-sized image.
+
+    ``contain`` fits inside ``width`` x ``height`` (either may be None for
+    "unbounded"), ``cover`` fills the box and is cropped to it. A box with
+    an unbounded side has nothing to fill, so ``cover`` then scales like
+    ``contain``. Images are never upscaled, so the result may be smaller
+    than the box.
+    """
+    src_w, src_h = source
+    box_w, box_h = width or src_w, height or src_h
+    if fit == "cover" and width and height:
+        scale = max(box_w / src_w, box_h / src_h)
+    else:
+        scale = min(box_w / src_w, box_h / src_h)
+    scale = min(scale, 1.0)
+    return max(round(src_w * scale), 1), max(round(src_h * scale), 1)
+
+
+def render_image(data: bytes, width, height, fit: str = "contain", fmt: str = "jpeg") -> bytes:
+    """
+    Render a resized rendition of a stored photo for the image endpoint.
+
+    Uses the same resampling as the upload pipeline (reduced DCT decode,
+    box pre-reduction, LANCZOS). ``cover`` crops the scaled image around
+    its centre to the requested box.
+    """
+    pil_format, _content_type, options = RENDER_FORMATS[fmt]
+    image = Image.open(BytesIO(data))
+    # Objects stored by older passthrough uploads may still carry an orientation
+    orientation = exif_orientation(image)
+    upright = image.size if orientation < 5 else image.size[::-1]
+    scaled = render_size(upright, width, height, fit)
+
+    try:
+        with decode_budget.reserve(decoded_bytes(image, max(scaled))):
+            if scaled != upright:
+                image = resample(image, scaled if orientation < 5 else scaled[::-1])
+            image = apply_orientation(image, orientation)
+            if fit == "cover":
+                crop_w, crop_h = min(width or scaled[0], scaled[0]), min(height or scaled[1], scaled[1])
+                left, top = (scaled[0] - crop_w) // 2, (scaled[1] - crop_h) // 2
+                image = image.crop((left, top, left + crop_w, top + crop_h))
+            image = flatten_rgb(image)
+            if image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+            buffer = BytesIO()
+            image.save(buffer, format=pil_format, **options)
+    except (OSError, SyntaxError) as e:
+        raise ValueError(f"Corrupted image file: {str(e)}")
+    return buffer.getvalue()
+
+
+def tile_levels(width: int, height: int, tile_size: int = TILE_SIZE) -> int:
+    """Zoom levels of a pyramid: level 0 fits in one tile, the last is full size."""
+    levels = 1
+    while max(width, height) > tile_size << (levels - 1):
+        levels += 1
+    return levels
+
+
+def build_tile_pyramid(data: bytes, tile_size: int = TILE_SIZE) -> TilePyramid:
+    """
+    Cut a stored photo into an XYZ tile pyramid.
+
+    Level ``levels - 1`` is the image at full resolution; every lower level
+    halves the one above it (rounding up), down to level 0 which fits in a
+    single tile. Tiles are ``tile_size`` squares except along the right and
+    bottom edges, where they are cropped to the image.
+    """
+    image = Image.open(BytesIO(data))
+    orientation = exif_orientation(image)
+    width, height = image.size if orientation < 5 else image.size[::-1]
+    levels = tile_levels(width, height, tile_size)
+    pyramid = TilePyramid(width=width, height=height, tile_size=tile_size, levels=levels)
+
+    try:
+        with decode_budget.reserve(decoded_bytes(image, max(width, height))):
+            level_image = apply_orientation(flatten_rgb(image), orientation)
+            for z in range(levels - 1, -1, -1):
+                if z < levels - 1:
+                    level_image = resample(level_image, (-(-level_image.width // 2), -(-level_image.height // 2)))
+                for y in range(0, level_image.height, tile_size):
+                    for x in range(0, level_image.width, tile_size):
+                        tile = level_image.crop((x, y, min(x + tile_size, level_image.width), min(y + tile_size, level_image.height)))
+                        pyramid.tiles[f"{z}/{x // tile_size}/{y // tile_size}"] = image_to_bytes(tile, quality=TILE_QUALITY)
+    except (OSError, SyntaxError) as e:
+        raise ValueError(f"Corrupted image file: {str(e)}")
+    return pyramid
+
+
+def make_placeholder(image: Image.Image) -> str:
+    """
+    Render a ~32px JPEG of an already decoded image as a ``data:`` URI.
+
+    Well under a kilobyte, so it can be sent inline with photo lists and
+    shown (blurred up by the browser) until the real image has loaded.
+    """
+    small = process_image(image, PLACEHOLDER_SIZE)
+    encoded = base64.b64encode(image_to_bytes(small, quality=PLACEHOLDER_QUALITY)).decode("ascii")
+    return f"data:image/jpeg;base64,{encoded}"
+
+
+def process_upload(data: bytes, filename: str) -> ProcessedPhoto:
+    """
+    Run the full upload pipeline on raw file bytes.
+
+    Validates, resizes, applies the EXIF orientation and re-encodes to JPEG
+    without metadata, and renders the thumb and preview derivatives and the
+    inline placeholder from the same decoded image. Compliant JPEGs (no
+    metadata, hence upright) skip the full-size re-encode and keep their
+    original bytes. This is the
+    entry point submitted to the image worker pool.
+    """
+    img = validate_image(BytesIO(data), filename)
+    passthrough = JPEG_PASSTHROUGH and is_passthrough_compliant(img)
+    orientation = exif_orientation(img)
+    # Passthrough uploads only decode pixels for the preview and thumb
+    target = max(PREVIEW_SIZE) if passthrough else MAX_OUTPUT_DIMENSION
+
+    try:
+        with decode_budget.reserve(decoded_bytes(img, target)):
+            if passthrough:
+                output, processed = data, img
+            else:
+                # Re-encoding drops all metadata, so bake the orientation into the pixels
+                processed = apply_orientation(process_image(img), orientation)
+                output = image_to_bytes(processed, quality=JPEG_QUALITY)
+            # Read before make_derivatives: a draft decode shrinks an unloaded image
+            width, height = processed.size
+            derivatives = make_derivatives(processed)
+            placeholder = make_placeholder(processed)
+    except (OSError, SyntaxError) as e:
+        # Truncated or undecodable pixel data that passed the header checks
+        raise ValueError(f"Corrupted image file: {str(e)}")
+
+    return ProcessedPhoto(
+        data=output,
+        content_type="image/jpeg",
+        width=width,
+        height=height,
+        sha256=hashlib.sha256(output).hexdigest(),
+        passthrough=passthrough,
+        placeholder=placeholder,
+        derivatives=derivatives,
+    )
@@ -0,0 +1,79 @@
+"""
+HTTP Range helpers for the photo image proxy.
+
+Only single byte ranges are honoured (``bytes=0-1023``, ``bytes=1024-``,
+``bytes=-500``). Multi-range requests are answered with the full body, which
+RFC 9110 allows and which is all image viewers ask for in practice.
+"""
+from email.utils import format_datetime, parsedate_to_datetime
+from datetime import datetime
+from typing import Optional, Tuple
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised when a Range header cannot be served for the object size."""
+
+    def __init__(self, size: int):
+        super().__init__(f"Requested range not satisfiable (size {size})")
+        self.size = size
+
+
+def parse_range_header(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a Range header into an inclusive ``(start, end)`` byte pair.
+
+    Returns None when the full object should be served (no header, a unit
+    other than bytes, multiple ranges or a syntactically invalid value).
+    """
+    if not header:
+        return None
+    unit, _, spec = header.strip().partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    start_str, sep, end_str = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if start_str == "":
+            # Suffix range: last N bytes
+            suffix = int(end_str)
+            if suffix <= 0:
+                raise RangeNotSatisfiable(size)
+            return max(size - suffix, 0), size - 1
+        start = int(start_str)
+        end = int(end_str) if end_str else size - 1
+    except ValueError:
+        return None
+
+    if start >= size:
+        raise RangeNotSatisfiable(size)
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+
+def if_range_matches(if_range: Optional[str], etag: Optional[str], last_modified: Optional[datetime]) -> bool:
+    """
+    Evaluate an If-Range precondition.
+
+    The Range is only applied when the validator still identifies the
+    current representation; otherwise the whole object is sent.
+    """
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        # Strong comparison only: weak validators never match
+        return etag is not None and not if_range.startswith("W/") and if_range == etag
+    if last_modified is None:
+        return False
+    try:
+        return parsedate_to_datetime(if_range) == last_modified.replace(microsecond=0)
+    except (TypeError, ValueError):
+        return False
+
+
+def http_date(value: datetime) -> str:
+    """Format a datetime for Last-Modified style headers."""
+    return format_datetime(value, usegmt=True)
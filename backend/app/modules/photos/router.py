@@ -1,27 +1,170 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
+from datetime import datetime
+from typing import AsyncIterator, Iterator, List, Literal, Optional
+from urllib.parse import unquote
+import hmac
 import logging
-import io
+import os
+import uuid
+
+import anyio
 
 from .service import photo_service
-from .schemas import PhotoResponse, PhotoUrlResponse
+from starlette.concurrency import run_in_threadpool
+
+from .schemas import (
+    DirectUploadCreate,
+    DirectUploadStatus,
+    DirectUploadTicket,
+    PhotoBatchItem,
+    PhotoBatchResponse,
+    PhotoFeedResponse,
+    PhotoGroupsResponse,
+    PhotoJobStatus,
+    PhotoListResponse,
+    PhotoLookupRequest,
+    PhotoResponse,
+    PhotoTileManifest,
+    PhotoUrlResponse,
+    UploadSessionCreate,
+    UploadSessionResponse,
+)
 from app.database import get_db
-from .models import Photo
-from .storage import photo_storage
-from app.modules.audit.service import log_action
+from .models import DirectUpload, Photo, PhotoJob
+from .storage import photo_storage, photo_version, render_path, tile_path, variant_path
+from .processing import RENDER_FORMATS, render_image
+from .ranges import RangeNotSatisfiable, http_date, if_range_matches, parse_range_header
+from .workers import image_pool, ImagePoolBusyError, ImageJobTimeoutError
+from .uploads import ChunkTooLarge, UploadSessionNotFound, upload_sessions
+from .jobs import photo_jobs
+from app.modules.audit.service import log_action, log_actions
+from app.modules.tests.models import Tests
+from app.http_cache import is_not_modified, not_modified_response
 
 logger = logging.getLogger("backend_photos_router")
 
 router = APIRouter(prefix="", tags=["photos"])
 
+# Upper bound on files accepted by POST /batch
+BATCH_MAX_FILES = int(os.getenv("PHOTO_BATCH_MAX_FILES", "100"))
+# Lifetime of presigned PUT URLs issued by POST /direct-uploads
+DIRECT_UPLOAD_EXPIRES = int(os.getenv("DIRECT_UPLOAD_EXPIRES", "900"))
+# Shared secret MinIO sends with bucket notifications (unset: not checked)
+DIRECT_UPLOAD_WEBHOOK_TOKEN = os.getenv("DIRECT_UPLOAD_WEBHOOK_TOKEN")
+# Widths/heights accepted by GET /{photo_id}/image?w=&h= (bounds the rendition cache)
+RENDER_SIZES = {int(v) for v in os.getenv("PHOTO_RENDER_SIZES", "64,128,256,320,480,640,800,1024,1280,1600,2000").split(",")}
+# Versioned image URLs and tiles never change content once the photo is ready
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Default for POST /upload without ?mode=: "sync" processes inline, "async" queues
+PHOTO_UPLOAD_MODE = os.getenv("PHOTO_UPLOAD_MODE", "sync")
+# Test IDs accepted by one photo lookup (GET / and POST /lookup)
+LOOKUP_MAX_TESTS = int(os.getenv("PHOTO_LOOKUP_MAX_TESTS", "1000"))
 
-@router.get("/test/{test_id}", response_model=List[PhotoResponse])
-async def get_photos_for_test(test_id: int, db: Session = Depends(get_db)):
-    """Get all photos for a specific test."""
-    photos = db.query(Photo).filter(Photo.test_id == test_id).all()
-    return photos
+
+@router.get("/test/{test_id}", response_model=PhotoListResponse)
+def get_photos_for_test(
+    test_id: int,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    since: Optional[datetime] = Query(None, description="Only photos taken at or after this time"),
+    until: Optional[datetime] = Query(None, description="Only photos taken before this time"),
+    include_total: bool = Query(False, description="Also count all matching photos"),
+    db: Session = Depends(get_db),
+):
+    """
+    Get the photos of a test, one keyset-paginated page at a time.
+
+    Photos come in upload order (``time_stamp``, then ``id``); follow
+    ``next_cursor`` until it is null.
+    """
+    try:
+        return photo_service.list_test_photos(
+            db,
+            test_id,
+            limit=limit,
+            cursor=cursor,
+            since=since,
+            until=until,
+            include_total=include_total,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _lookup_photos(db: Session, test_ids: List[int], per_test: Optional[int]) -> dict:
+    if len(set(test_ids)) > LOOKUP_MAX_TESTS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {LOOKUP_MAX_TESTS} test IDs per lookup",
+        )
+    return photo_service.photos_for_tests(db, test_ids, per_test=per_test)
+
+
+@router.get("", response_model=PhotoGroupsResponse)
+def get_photos_for_tests(
+    test_ids: str = Query(..., description="Comma-separated test IDs, e.g. 1,2,3"),
+    per_test: Optional[int] = Query(None, ge=1, le=500, description="Keep only the first N photos of each test"),
+    db: Session = Depends(get_db),
+):
+    """Photos of several tests in one request, grouped by test."""
+    try:
+        ids = [int(v) for v in test_ids.split(",") if v.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="test_ids must be comma-separated integers")
+    if not ids:
+        raise HTTPException(status_code=400, detail="test_ids must not be empty")
+    return _lookup_photos(db, ids, per_test)
+
+
+@router.post("/lookup", response_model=PhotoGroupsResponse)
+def lookup_photos_for_tests(payload: PhotoLookupRequest, db: Session = Depends(get_db)):
+    """Same as GET with test_ids, for sets too large for a URL."""
+    return _lookup_photos(db, payload.test_ids, payload.per_test)
+
+
+@router.get("/feed", response_model=PhotoFeedResponse)
+def get_photo_feed(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    test_type: Optional[str] = Query(None),
+    test_status: Optional[str] = Query(None, alias="status", description="Status of the test"),
+    product_id: Optional[int] = Query(None),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Photos across all tests, newest first, for the gallery.
+
+    Each item carries the photo (with its versioned thumbnail URL and
+    placeholder) and the test's product, type and status.
+    """
+    try:
+        return photo_service.list_feed(
+            db,
+            limit=limit,
+            cursor=cursor,
+            test_type=test_type,
+            test_status=test_status,
+            product_id=product_id,
+            since=since,
+            until=until,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/metrics")
+async def get_photo_metrics():
+    """Runtime counters for the image processing pipeline."""
+    return {
+        "image_pool": image_pool.stats(),
+        "storage": photo_storage.stats(),
+        "photo_cache": photo_storage.cache.stats() if photo_storage.cache else None,
+        "photo_jobs": photo_jobs.stats(),
+    }
 
 
 @router.get("/{photo_id}/url", response_model=PhotoUrlResponse)
@@ -35,47 +178,284 @@ async def get_photo_url(photo_id: int, db: Session = Depends(get_db)):
     return PhotoUrlResponse(url=url, expires_in=3600)
 
 
+async def _local_file_response(info, media_type: str, headers: dict) -> Optional[FileResponse]:
+    """
+    Send a stat_photo result that points at a local file.
+
+    FileResponse handles Range/If-Range itself against our ETag. The file is
+    stat'ed first (on the storage I/O pool) and the result handed over, so a
+    disk cache entry evicted since stat_photo yields None and the caller
+    streams from the backend instead of failing mid-response.
+    """
+    stat_result = await photo_storage.stat_local_file(info.local_path)
+    if stat_result is None:
+        logger.info(f"Local file {info.local_path} disappeared, streaming from storage")
+        return None
+    return FileResponse(info.local_path, media_type=media_type, headers=headers, stat_result=stat_result)
+
+
 @router.get("/{photo_id}/image")
-async def get_photo_image(photo_id: int, db: Session = Depends(get_db)):
+async def get_photo_image(
+    photo_id: int,
+    request: Request,
+    variant: Literal["thumb", "preview", "full"] = Query("full", description="Image rendition to return"),
+    w: Optional[int] = Query(None, description="Rendition width (one of PHOTO_RENDER_SIZES)"),
+    h: Optional[int] = Query(None, description="Rendition height (one of PHOTO_RENDER_SIZES)"),
+    fit: Literal["contain", "cover"] = Query("contain"),
+    format: Optional[Literal["auto", "jpeg", "webp", "avif"]] = Query(None),
+    v: Optional[str] = Query(None, description="Content version from PhotoResponse.image_url"),
+    db: Session = Depends(get_db),
+):
     """Get photo image data directly (proxy through backend).
     Works on any device without exposing MinIO URLs.
+
+    ``variant=thumb`` (300px) and ``variant=preview`` (1024px) return the
+    derivatives generated at upload time; photos uploaded before derivatives
+    existed fall back to the full image.
+
+    The body is streamed in chunks straight from storage. A single
+    ``Range`` (optionally guarded by ``If-Range``) is answered with 206.
+    ``If-None-Match`` / ``If-Modified-Since`` matching the stored object's
+    ETag / modification time return 304 without opening the object.
+    Objects present in the local disk cache are sent as files (zero-copy
+    where the ASGI server supports ``http.response.pathsend``).
+
+    ``w`` / ``h`` / ``fit`` / ``format`` request an on-the-fly rendition of
+    the full image. Sizes are restricted to PHOTO_RENDER_SIZES so the set
+    of renditions per photo stays bounded; ``format=auto`` (the default)
+    picks AVIF, WebP or JPEG from ``Accept``. Renditions are rendered once
+    in the image worker pool and stored under ``renders/``, after which
+    they are served (and disk-cached) like any other object.
+
+    Requests carrying the photo's current content version ``v`` (as in
+    ``PhotoResponse.image_url``) are cacheable for a year as immutable: a
+    new version always means a new URL. Other requests keep a one-hour
+    max-age.
     """
+    rendition = w is not None or h is not None or format is not None
+    if rendition:
+        if variant != "full":
+            raise HTTPException(status_code=400, detail="variant cannot be combined with w, h or format")
+        for name, value in (("w", w), ("h", h)):
+            if value is not None and value not in RENDER_SIZES:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"{name}={value} is not an allowed size: {', '.join(str(v) for v in sorted(RENDER_SIZES))}",
+                )
+        fmt = _negotiate_format(request.headers.get("accept")) if format in (None, "auto") else format
+        if fmt not in RENDER_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Format {fmt} is not supported by this server")
+
     photo = db.query(Photo).filter(Photo.id == photo_id).first()
     if not photo:
         raise HTTPException(status_code=404, detail="Photo not found")
+    if rendition and photo.status != "ready":
+        # Never render (and store) from an unvalidated staging object
+        raise HTTPException(status_code=409, detail=f"Photo is {photo.status}")
 
     try:
-        image_data = await photo_storage.get_photo(photo.file_path)
+        if rendition:
+            file_path = render_path(photo.file_path, w, h, fit, fmt)
+            info = await _ensure_rendition(photo, file_path, w, h, fit, fmt)
+        else:
+            file_path = variant_path(photo.file_path, variant)
+            try:
+                info = await photo_storage.stat_photo(file_path)
+            except Exception as e:
+                if variant == "full":
+                    raise
+                logger.warning(f"Variant {variant} missing for photo {photo_id}, serving full image: {str(e)}")
+                file_path = photo.file_path
+                info = await photo_storage.stat_photo(file_path)
 
         content_type = "image/jpeg"
-        if photo.file_path.lower().endswith(".png"):
+        if file_path.lower().endswith(".png"):
             content_type = "image/png"
-        elif photo.file_path.lower().endswith(".webp"):
+        elif file_path.lower().endswith(".webp"):
             content_type = "image/webp"
+        elif file_path.lower().endswith(".avif"):
+            content_type = "image/avif"
+
+        immutable = v is not None and photo.status == "ready" and v == photo_version(photo.file_path)
+        headers = {
+            "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else "public, max-age=3600",
+            "Content-Disposition": f'inline; filename="{file_path.split("/")[-1]}"',
+            "Accept-Ranges": "bytes",
+        }
+        if rendition and format in (None, "auto"):
+            # The representation depends on the Accept header
+            headers["Vary"] = "Accept"
+        if info.etag:
+            headers["ETag"] = info.etag
+        if info.last_modified:
+            headers["Last-Modified"] = http_date(info.last_modified)
+
+        if is_not_modified(request, info.etag, info.last_modified):
+            return not_modified_response(
+                info.etag,
+                {k: v for k, v in headers.items() if k in ("Cache-Control", "Last-Modified", "Vary")},
+            )
+
+        if info.local_path:
+            local = await _local_file_response(info, content_type, headers)
+            if local is not None:
+                return local
+            info = await photo_storage.stat_photo(file_path)
+
+        byte_range = None
+        if if_range_matches(request.headers.get("if-range"), info.etag, info.last_modified):
+            try:
+                byte_range = parse_range_header(request.headers.get("range"), info.size)
+            except RangeNotSatisfiable:
+                return Response(
+                    status_code=416,
+                    headers={**headers, "Content-Range": f"bytes */{info.size}"},
+                )
+
+        if byte_range is None:
+            body = await photo_storage.stream_photo(file_path)
+            headers["Content-Length"] = str(info.size)
+            status_code = 200
+        else:
+            start, end = byte_range
+            body = await photo_storage.stream_photo(file_path, offset=start, length=end - start + 1)
+            headers["Content-Length"] = str(end - start + 1)
+            headers["Content-Range"] = f"bytes {start}-{end}/{info.size}"
+            status_code = 206
 
         return StreamingResponse(
-            io.BytesIO(image_data),
+            body,
+            status_code=status_code,
             media_type=content_type,
-            headers={
-                "Cache-Control": "public, max-age=3600",
-                "Content-Disposition": f'inline; filename="{photo.file_path.split("/")[-1]}"'
-            }
+            headers=headers,
         )
+    except ImagePoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         logger.error(f"Failed to retrieve image for photo {photo_id}: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to retrieve image")
 
 
+def _negotiate_format(accept: Optional[str]) -> str:
+    """Best rendition format the client lists in ``Accept`` (AVIF > WebP > JPEG)."""
+    accepted = set()
+    for part in (accept or "").split(","):
+        media_type, _, params = part.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    pass
+        if q > 0:
+            accepted.add(media_type.strip().lower())
+    for fmt in ("avif", "webp"):
+        if fmt in RENDER_FORMATS and RENDER_FORMATS[fmt][1] in accepted:
+            return fmt
+    return "jpeg"
+
+
+async def _ensure_rendition(photo: Photo, file_path: str, width, height, fit: str, fmt: str):
+    """Stat a cached rendition, rendering and storing it on first request."""
+    try:
+        return await photo_storage.stat_photo(file_path)
+    except Exception:
+        pass
+    source = await photo_storage.get_photo(photo.file_path)
+    data = await image_pool.run(render_image, source, width, height, fit, fmt)
+    await photo_storage.upload_photo(data, file_path, RENDER_FORMATS[fmt][1])
+    logger.info(f"Rendered {file_path} for photo {photo.id} ({len(data)} bytes)")
+    return await photo_storage.stat_photo(file_path)
+
+
+def _tiled_photo(db: Session, photo_id: int) -> Photo:
+    photo = db.query(Photo).filter(Photo.id == photo_id).first()
+    if not photo:
+        raise HTTPException(status_code=404, detail="Photo not found")
+    if photo.status != "ready":
+        # Tiles are cached as immutable; never cut them from a staged upload
+        raise HTTPException(status_code=409, detail=f"Photo is {photo.status}")
+    return photo
+
+
+@router.get("/{photo_id}/tiles", response_model=PhotoTileManifest)
+async def get_photo_tiles(photo_id: int, request: Request, db: Session = Depends(get_db)):
+    """
+    Deep-zoom manifest of a photo.
+
+    The XYZ tile pyramid is built in the image worker pool on the first
+    request and stored; clients then fetch only the tiles visible at the
+    current zoom from ``url_template``.
+    """
+    photo = _tiled_photo(db, photo_id)
+    try:
+        manifest = await photo_service.ensure_tiles(photo)
+    except ImagePoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except Exception as e:
+        logger.error(f"Failed to build tiles for photo {photo_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to build tiles")
+
+    base = request.app.url_path_for("get_photo_tiles", photo_id=photo_id)
+    return PhotoTileManifest(photo_id=photo_id, url_template=f"{base}/{{z}}/{{x}}/{{y}}.jpg", **manifest)
+
+
+@router.get("/{photo_id}/tiles/{z}/{x}/{y}.jpg")
+async def get_photo_tile(photo_id: int, z: int, x: int, y: int, request: Request, db: Session = Depends(get_db)):
+    """One pyramid tile, cached by clients as immutable."""
+    photo = _tiled_photo(db, photo_id)
+    file_path = tile_path(photo.file_path, f"{z}/{x}/{y}")
+
+    try:
+        try:
+            info = await photo_storage.stat_photo(file_path)
+        except Exception:
+            # Pyramid not built yet, or a tile outside it
+            manifest = await photo_service.ensure_tiles(photo)
+            size = manifest["tile_size"] << (manifest["levels"] - 1 - z) if 0 <= z < manifest["levels"] else 0
+            info = None
+            if size and 0 <= x * size < manifest["width"] and 0 <= y * size < manifest["height"]:
+                info = await photo_storage.stat_photo(file_path)
+    except ImagePoolBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except Exception as e:
+        logger.error(f"Failed to retrieve tile {z}/{x}/{y} for photo {photo_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to retrieve tile")
+    if info is None:
+        raise HTTPException(status_code=404, detail="Tile not found")
+
+    headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    if info.etag:
+        headers["ETag"] = info.etag
+    if is_not_modified(request, info.etag, info.last_modified):
+        return not_modified_response(info.etag, headers)
+    if info.local_path:
+        local = await _local_file_response(info, "image/jpeg", headers)
+        if local is not None:
+            return local
+    headers["Content-Length"] = str(info.size)
+    return StreamingResponse(await photo_storage.stream_photo(file_path), media_type="image/jpeg", headers=headers)
+
+
 @router.post("/upload", response_model=PhotoResponse, status_code=201)
 async def upload_photo(
     test_id: int,
+    request: Request,
+    response: Response,
     file: UploadFile = File(...),
+    mode: Optional[Literal["sync", "async"]] = Query(None),
     db: Session = Depends(get_db)
 ):
     """
     Upload a photo for a quality test.
     
     Returns photo details including ID and file path.
+
+    With ``mode=async`` (or PHOTO_UPLOAD_MODE=async) only the header is
+    validated; the photo is returned with ``status: processing`` and 202,
+    and ``Location`` points at the processing job.
     """
     username = "system"  
 
@@ -97,13 +477,24 @@ async def upload_photo(
         raise HTTPException(status_code=400, detail="File must be an image")
 
     try:
-        # 2. Call service with correct parameter order
-        photo = await photo_service.upload_photo(
-            db=db,
-            file=file.file,           # ← file.file is the actual BinaryIO
-            filename=file.filename,
-            test_id=test_id
-        )
+        job = None
+        if (mode or PHOTO_UPLOAD_MODE) == "async":
+            photo, job = await photo_service.enqueue_upload(
+                db=db,
+                file=file.file,
+                filename=file.filename,
+                test_id=test_id
+            )
+            response.status_code = status.HTTP_202_ACCEPTED
+            response.headers["Location"] = request.app.url_path_for("get_photo_job", job_id=job.id)
+        else:
+            # 2. Call service with correct parameter order
+            photo = await photo_service.upload_photo(
+                db=db,
+                file=file.file,           # ← file.file is the actual BinaryIO
+                filename=file.filename,
+                test_id=test_id
+            )
 
         log_action(
             db,
@@ -116,11 +507,35 @@ async def upload_photo(
                 "content_type": file.content_type,
                 "test_id": test_id,
                 "file_path": getattr(photo, "file_path", None),
+                "job_id": job.id if job is not None else None,
             },
         )
 
         return photo
 
+    except (ImagePoolBusyError, ImageJobTimeoutError) as e:
+        # Worker pool saturated or job too slow - client may retry later
+        logger.warning(f"Upload rejected by image worker pool: {str(e)}")
+
+        log_action(
+            db,
+            action="UPLOAD_FAILED",
+            entity_type="Photo",
+            entity_id=0,
+            username=username,
+            meta={
+                "reason": "worker_pool_unavailable",
+                "error": str(e),
+                "filename": file.filename,
+                "content_type": file.content_type,
+                "test_id": test_id,
+            },
+        )
+
+        if isinstance(e, ImagePoolBusyError):
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+        raise HTTPException(status_code=504, detail=str(e))
+
     except ValueError as e:
         # Validation errors (bad image, wrong format, etc.)
         logger.error(f"Validation error: {str(e)}")
@@ -164,6 +579,422 @@ async def upload_photo(
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 
+@router.post("/batch", response_model=PhotoBatchResponse, status_code=201)
+async def upload_photo_batch(
+    test_id: int,
+    files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db),
+):
+    """
+    Upload many photos for a quality test in one request.
+
+    The multipart body is parsed as it arrives (each part is spooled to a
+    temporary file, never buffered whole in memory). Files are processed
+    concurrently, Photo rows and audit entries are written in bulk, and a
+    failing file does not fail the batch: every file gets its own result.
+    """
+    username = "system"
+
+    if len(files) > BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many files: {len(files)} (max {BATCH_MAX_FILES})",
+        )
+    if not db.query(Tests.id).filter(Tests.id == test_id).first():
+        raise HTTPException(status_code=404, detail="Test not found")
+
+    image_indexes = [
+        index for index, file in enumerate(files)
+        if file.content_type and file.content_type.startswith("image/")
+    ]
+    outcomes = dict(zip(
+        image_indexes,
+        await photo_service.upload_photos(
+            db,
+            [(files[index].file, files[index].filename) for index in image_indexes],
+            test_id=test_id,
+        ),
+    ))
+
+    results = []
+    audit_entries = []
+    for index, file in enumerate(files):
+        result = outcomes.get(index)
+
+        if result is None or isinstance(result, BaseException):
+            if result is None:
+                error, reason = "File must be an image", "invalid_content_type"
+            else:
+                error = str(result)
+                reason = "validation_error" if isinstance(result, ValueError) else "server_error"
+                logger.error(f"Batch upload of {file.filename} failed: {error}")
+
+            results.append(PhotoBatchItem(filename=file.filename, status="failed", error=error))
+            audit_entries.append(dict(
+                action="UPLOAD_FAILED",
+                entity_type="Photo",
+                entity_id=0,
+                username=username,
+                meta={
+                    "reason": reason,
+                    "error": error,
+                    "filename": file.filename,
+                    "content_type": file.content_type,
+                    "test_id": test_id,
+                    "source": "photos.batch",
+                },
+            ))
+            continue
+
+        results.append(PhotoBatchItem(
+            filename=file.filename,
+            status="uploaded",
+            photo=PhotoResponse.model_validate(result),
+        ))
+        audit_entries.append(dict(
+            action="UPLOAD",
+            entity_type="Photo",
+            entity_id=result.id,
+            username=username,
+            meta={
+                "filename": file.filename,
+                "content_type": file.content_type,
+                "test_id": test_id,
+                "file_path": result.file_path,
+                "source": "photos.batch",
+            },
+        ))
+
+    log_actions(db, audit_entries)
+
+    uploaded = sum(1 for item in results if item.status == "uploaded")
+    logger.info(f"Batch upload for test {test_id}: {uploaded}/{len(files)} file(s) stored")
+
+    return PhotoBatchResponse(
+        test_id=test_id,
+        uploaded=uploaded,
+        failed=len(files) - uploaded,
+        results=results,
+    )
+
+
+@router.post("/uploads", response_model=UploadSessionResponse, status_code=201)
+async def create_upload_session(payload: UploadSessionCreate, db: Session = Depends(get_db)):
+    """
+    Start a resumable chunked upload.
+
+    PUT the file's bytes to ``/uploads/{upload_id}?offset=N`` in chunks of
+    any size, then POST ``/uploads/{upload_id}/complete``. After a dropped
+    connection, GET the session and resend only its ``missing`` ranges.
+    """
+    if not payload.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="File must be an image")
+    if not db.query(Tests.id).filter(Tests.id == payload.test_id).first():
+        raise HTTPException(status_code=404, detail="Test not found")
+
+    return await run_in_threadpool(
+        upload_sessions.create,
+        payload.test_id,
+        payload.filename,
+        payload.size,
+        payload.content_type,
+    )
+
+
+@router.get("/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def get_upload_session(upload_id: str):
+    """Received and missing byte ranges of an upload session."""
+    try:
+        return await run_in_threadpool(upload_sessions.get, upload_id)
+    except UploadSessionNotFound:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+
+
+def _blocking_chunks(stream: AsyncIterator[bytes]) -> Iterator[bytes]:
+    """Iterate an async request body from a threadpool worker, one chunk at a time."""
+    while True:
+        try:
+            yield anyio.from_thread.run(stream.__anext__)
+        except StopAsyncIteration:
+            return
+
+
+@router.put("/uploads/{upload_id}", response_model=UploadSessionResponse)
+async def put_upload_chunk(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0, description="Byte offset of this chunk in the file"),
+):
+    """
+    Store one chunk (the raw request body) at ``offset``.
+
+    Chunks may arrive in any order and may be resent; the response reports
+    what is still missing.
+    """
+    try:
+        session = await run_in_threadpool(upload_sessions.get, upload_id)
+        content_length = request.headers.get("content-length")
+        if content_length and offset + int(content_length) > session["size"]:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Chunk extends past the declared size of {session['size']} bytes",
+            )
+        # The body is written as it arrives; write_chunk stops at the declared size
+        return await run_in_threadpool(
+            upload_sessions.write_chunk, upload_id, offset, _blocking_chunks(request.stream())
+        )
+    except UploadSessionNotFound:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    except ChunkTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/uploads/{upload_id}/complete", response_model=PhotoResponse, status_code=201)
+async def complete_upload_session(upload_id: str, db: Session = Depends(get_db)):
+    """
+    Assemble the uploaded chunks and run them through the photo pipeline.
+
+    Returns ``409`` while ranges are missing. The session is kept when
+    processing fails for a transient reason (busy pool, storage error) so
+    completion can be retried without re-uploading.
+    """
+    username = "system"
+
+    try:
+        session = await run_in_threadpool(upload_sessions.get, upload_id)
+    except UploadSessionNotFound:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    if not session["complete"]:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Upload is incomplete", "missing": session["missing"]},
+        )
+
+    meta = {
+        "filename": session["filename"],
+        "content_type": session["content_type"],
+        "test_id": session["test_id"],
+        "upload_id": upload_id,
+        "source": "photos.uploads",
+    }
+    try:
+        with open(upload_sessions.data_path(upload_id), "rb") as fh:
+            photo = await photo_service.upload_photo(
+                db=db,
+                file=fh,
+                filename=session["filename"],
+                test_id=session["test_id"],
+            )
+    except (ImagePoolBusyError, ImageJobTimeoutError) as e:
+        logger.warning(f"Upload session {upload_id} rejected by image worker pool: {str(e)}")
+        log_action(
+            db,
+            action="UPLOAD_FAILED",
+            entity_type="Photo",
+            entity_id=0,
+            username=username,
+            meta={"reason": "worker_pool_unavailable", "error": str(e), **meta},
+        )
+        if isinstance(e, ImagePoolBusyError):
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+        raise HTTPException(status_code=504, detail=str(e))
+    except ValueError as e:
+        # The assembled file is not a usable image; resending will not help
+        await run_in_threadpool(upload_sessions.delete, upload_id)
+        log_action(
+            db,
+            action="UPLOAD_FAILED",
+            entity_type="Photo",
+            entity_id=0,
+            username=username,
+            meta={"reason": "validation_error", "error": str(e), **meta},
+        )
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Upload session {upload_id} failed with exception: {str(e)}")
+        log_action(
+            db,
+            action="UPLOAD_FAILED",
+            entity_type="Photo",
+            entity_id=0,
+            username=username,
+            meta={"reason": "server_error", "error": str(e), **meta},
+        )
+        raise HTTPException(status_code=500, detail="Failed to process upload")
+
+    await run_in_threadpool(upload_sessions.delete, upload_id)
+    log_action(
+        db,
+        action="UPLOAD",
+        entity_type="Photo",
+        entity_id=photo.id,
+        username=username,
+        meta={"file_path": photo.file_path, **meta},
+    )
+    return photo
+
+
+@router.delete("/uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def abort_upload_session(upload_id: str):
+    """Abandon an upload session and discard its chunks."""
+    try:
+        await run_in_threadpool(upload_sessions.get, upload_id)
+    except UploadSessionNotFound:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    await run_in_threadpool(upload_sessions.delete, upload_id)
+
+
+@router.post("/direct-uploads", response_model=DirectUploadTicket, status_code=201)
+async def create_direct_upload(payload: DirectUploadCreate, db: Session = Depends(get_db)):
+    """
+    Issue a presigned PUT so the client uploads a photo straight to storage.
+
+    After the PUT succeeds, call ``/direct-uploads/{upload_id}/complete``
+    (or let a bucket notification do it); processing then runs on the photo
+    job queue and ``GET /direct-uploads/{upload_id}`` reports the result.
+    """
+    if not payload.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="File must be an image")
+    if not db.query(Tests.id).filter(Tests.id == payload.test_id).first():
+        raise HTTPException(status_code=404, detail="Test not found")
+
+    upload_id = uuid.uuid4().hex
+    staging_key = f"staging/{upload_id}"
+    try:
+        url = await photo_storage.generate_presigned_put_url(staging_key, expiration=DIRECT_UPLOAD_EXPIRES)
+    except NotImplementedError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+
+    upload = DirectUpload(
+        id=upload_id,
+        test_id=payload.test_id,
+        filename=payload.filename,
+        content_type=payload.content_type,
+        staging_key=staging_key,
+        status="awaiting_upload",
+    )
+    db.add(upload)
+    db.commit()
+    db.refresh(upload)
+
+    return DirectUploadTicket(
+        **DirectUploadStatus.model_validate(upload).model_dump(),
+        url=url,
+        headers={"Content-Type": payload.content_type},
+        expires_in=DIRECT_UPLOAD_EXPIRES,
+    )
+
+
+async def _start_direct_ingest(db: Session, upload: DirectUpload) -> bool:
+    """
+    Queue ingestion of a direct upload whose object has arrived.
+
+    Ingestion runs on the durable photo job queue, so a restart only delays
+    it. Idempotent: uploads already processing or done are left alone, and a
+    failed upload is requeued. Returns False if the object is not there yet.
+    """
+    if upload.status in ("processing", "done"):
+        return True
+    if not await photo_storage.photo_exists(upload.staging_key):
+        return False
+
+    job = photo_service.enqueue_staged(db, upload)
+    log_action(
+        db,
+        action="UPLOAD",
+        entity_type="Photo",
+        entity_id=upload.photo_id,
+        username="system",
+        meta={
+            "filename": upload.filename,
+            "content_type": upload.content_type,
+            "test_id": upload.test_id,
+            "upload_id": upload.id,
+            "job_id": job.id,
+            "source": "photos.direct_upload",
+        },
+    )
+    return True
+
+
+@router.post("/direct-uploads/events", status_code=202)
+async def direct_upload_events(
+    request: Request,
+    db: Session = Depends(get_db),
+):
+    """
+    Bucket notification webhook (MinIO / S3 ``ObjectCreated`` events).
+
+    Starts ingestion for every ``staging/`` object in the event, so clients
+    do not have to call complete themselves. Disabled (403) unless
+    DIRECT_UPLOAD_WEBHOOK_TOKEN is set.
+    """
+    if not DIRECT_UPLOAD_WEBHOOK_TOKEN:
+        raise HTTPException(
+            status_code=403,
+            detail="Bucket notifications are disabled: DIRECT_UPLOAD_WEBHOOK_TOKEN is not set",
+        )
+    expected = f"Bearer {DIRECT_UPLOAD_WEBHOOK_TOKEN}"
+    if not hmac.compare_digest(request.headers.get("authorization", "").encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail="Invalid notification token")
+
+    event = await request.json()
+    started = []
+    for record in event.get("Records", []):
+        key = unquote(record.get("s3", {}).get("object", {}).get("key", ""))
+        if not key.startswith("staging/"):
+            continue
+        upload = db.get(DirectUpload, key[len("staging/"):])
+        if upload is not None and upload.status == "awaiting_upload":
+            if await _start_direct_ingest(db, upload):
+                started.append(upload.id)
+
+    return {"started": started}
+
+
+@router.post("/direct-uploads/{upload_id}/complete", response_model=DirectUploadStatus, status_code=202)
+async def complete_direct_upload(
+    upload_id: str,
+    db: Session = Depends(get_db),
+):
+    """Signal that the presigned PUT finished; processing continues on the photo job queue."""
+    upload = db.get(DirectUpload, upload_id)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Direct upload not found")
+    if not await _start_direct_ingest(db, upload):
+        raise HTTPException(status_code=409, detail="The file has not been uploaded to storage yet")
+    return upload
+
+
+@router.get("/direct-uploads/{upload_id}", response_model=DirectUploadStatus)
+async def get_direct_upload(upload_id: str, db: Session = Depends(get_db)):
+    """Ingestion state of a direct upload (``photo_id`` is set once done)."""
+    upload = db.get(DirectUpload, upload_id)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Direct upload not found")
+    return upload
+
+
+@router.get("/jobs/{job_id}", response_model=PhotoJobStatus)
+def get_photo_job(job_id: int, db: Session = Depends(get_db)):
+    """Poll the processing job of an async upload."""
+    job = db.get(PhotoJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Photo job not found")
+    return job
+
+
+@router.get("/{photo_id}", response_model=PhotoResponse)
+def get_photo(photo_id: int, db: Session = Depends(get_db)):
+    """Photo details, including its versioned image URLs."""
+    photo = db.get(Photo, photo_id)
+    if photo is None:
+        raise HTTPException(status_code=404, detail="Photo not found")
+    return photo
+
+
 @router.delete("/{photo_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_photo(photo_id: int, db: Session = Depends(get_db)):
     """
@@ -191,15 +1022,21 @@ async def delete_photo(photo_id: int, db: Session = Depends(get_db)):
         photo_path = photo.file_path  
         test_id = getattr(photo, "test_id", None)  
 
-        # 2. Delete from MinIO storage
+        # 2. Delete from MinIO storage, unless another photo shares the content
+        #    (locked until commit so no dedup upload can start sharing it)
         minio_deleted = False  
-        try:
-            await photo_storage.delete_photo(photo.file_path)
-            minio_deleted = True  
-            logger.info(f"Deleted photo from MinIO: {photo.file_path}")
-        except Exception as e:
-            logger.error(f"Failed to delete photo from MinIO: {photo.file_path}, Error: {str(e)}")
-            # Continue to delete from DB even if MinIO deletion fails
+        await photo_service.lock_content(db, [photo_path])
+        shared = photo_path in photo_service.shared_file_paths(db, [photo_path], exclude_photo_ids=[photo_id])
+        if shared:
+            logger.info(f"Keeping shared photo object in MinIO: {photo.file_path}")
+        else:
+            try:
+                await photo_storage.delete_photo(photo.file_path)
+                minio_deleted = True  
+                logger.info(f"Deleted photo from MinIO: {photo.file_path}")
+            except Exception as e:
+                logger.error(f"Failed to delete photo from MinIO: {photo.file_path}, Error: {str(e)}")
+                # Continue to delete from DB even if MinIO deletion fails
 
         # 3. Delete from database
         db.delete(photo)
@@ -215,6 +1052,7 @@ async def delete_photo(photo_id: int, db: Session = Depends(get_db)):
                 "file_path": photo_path,
                 "test_id": test_id,
                 "minio_deleted": minio_deleted,
+                "shared": shared,
             },
         )
 
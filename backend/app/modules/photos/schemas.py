@@ -1,8 +1,14 @@
 """Photo request/response schemas."""
 
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, computed_field
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
+
+from .processing import MAX_FILE_SIZE
+from .storage import photo_version
+
+# Mount point of the photos router (see app.main)
+PHOTOS_API_PREFIX = "/api/v1/photos"
 
 
 class PhotoCreate(BaseModel):
@@ -18,23 +24,169 @@ class PhotoResponse(BaseModel):
     file_path: str
     time_stamp: datetime
     analysis_results: Optional[str] = None
+    status: str = "ready"
+    placeholder: Optional[str] = Field(None, description="Low-quality data: URI to show while the image loads")
     
     model_config = ConfigDict(from_attributes=True)
 
+    @computed_field
+    @property
+    def image_url(self) -> str:
+        """Versioned image URL, served with a year-long immutable Cache-Control."""
+        return f"{PHOTOS_API_PREFIX}/{self.id}/image?v={photo_version(self.file_path)}"
+
+    @computed_field
+    @property
+    def thumb_url(self) -> str:
+        return f"{PHOTOS_API_PREFIX}/{self.id}/image?variant=thumb&v={photo_version(self.file_path)}"
+
 
 class PhotoListResponse(BaseModel):
     """Schema for paginated photo listing."""
-    total: int
+    total: Optional[int] = Field(None, description="Matching photos; only counted when include_total=true")
+    photos: list[PhotoResponse]
+    limit: int
+    next_cursor: Optional[str] = Field(None, description="Pass as ?cursor= for the next page; null on the last page")
+
+
+class PhotoLookupRequest(BaseModel):
+    """Body of POST /lookup, for sets of test IDs too large for a query string."""
+    test_ids: list[int] = Field(..., min_length=1, description="Tests to fetch photos for")
+    per_test: Optional[int] = Field(None, ge=1, le=500, description="Keep only the first N photos of each test")
+
+
+class PhotoGroup(BaseModel):
+    test_id: int
+    total: int = Field(..., description="All photos of the test, also those trimmed by per_test")
     photos: list[PhotoResponse]
 
 
+class PhotoGroupsResponse(BaseModel):
+    """Photos of several tests, one group per requested test ID in request order."""
+    groups: list[PhotoGroup]
+    per_test: Optional[int] = None
+
+
+class PhotoFeedTest(BaseModel):
+    """The few test fields a gallery tile needs."""
+    id: int
+    product_id: int
+    test_type: str
+    status: str
+
+
+class PhotoFeedItem(BaseModel):
+    photo: PhotoResponse
+    test: PhotoFeedTest
+
+
+class PhotoFeedResponse(BaseModel):
+    """Schema for the cross-test photo feed (newest first)."""
+    items: list[PhotoFeedItem]
+    limit: int
+    next_cursor: Optional[str] = Field(None, description="Pass as ?cursor= for the next page; null on the last page")
+
+
 class PhotoUrlResponse(BaseModel):
     """Schema for presigned URL response (MinIO direct access)."""
     url: str
     expires_in: int
 
 
+class PhotoTileManifest(BaseModel):
+    """Deep-zoom pyramid description; level ``levels - 1`` is full resolution."""
+    photo_id: int
+    width: int
+    height: int
+    tile_size: int
+    levels: int
+    format: str = "jpeg"
+    url_template: str = Field(..., description="Tile URL with {z}, {x} and {y} placeholders")
+
+
 class PhotoUploadResponse(BaseModel):
     """Extended response after photo upload with access URL."""
     photo: PhotoResponse
     url: str
+
+
+class PhotoBatchItem(BaseModel):
+    """Outcome of one file in a batch upload."""
+    filename: Optional[str] = None
+    status: Literal["uploaded", "failed"]
+    photo: Optional[PhotoResponse] = None
+    error: Optional[str] = None
+
+
+class PhotoBatchResponse(BaseModel):
+    """Per-file results of a batch upload, in upload order."""
+    test_id: int
+    uploaded: int
+    failed: int
+    results: list[PhotoBatchItem]
+
+
+class UploadSessionCreate(BaseModel):
+    """Start a resumable chunked upload."""
+    test_id: int = Field(..., description="Quality test ID the photo will belong to")
+    filename: str = Field(..., min_length=1, max_length=255, description="Original filename")
+    size: int = Field(..., gt=0, le=MAX_FILE_SIZE, description="Total file size in bytes")
+    content_type: str = Field("image/jpeg", description="MIME type of the file")
+
+
+class UploadSessionResponse(BaseModel):
+    """State of a chunked upload; ``missing`` lists the [start, end) ranges still to send."""
+    upload_id: str
+    test_id: int
+    filename: str
+    content_type: str
+    size: int
+    received_bytes: int
+    missing: list[list[int]]
+    complete: bool
+    chunk_size: int
+    expires_at: datetime
+
+
+class DirectUploadCreate(BaseModel):
+    """Request a presigned PUT for uploading a photo straight to storage."""
+    test_id: int = Field(..., description="Quality test ID the photo will belong to")
+    filename: str = Field(..., min_length=1, max_length=255, description="Original filename")
+    content_type: str = Field("image/jpeg", description="MIME type of the file")
+
+
+class DirectUploadStatus(BaseModel):
+    """Ingestion state of a direct upload."""
+    upload_id: str = Field(..., validation_alias="id")
+    test_id: int
+    filename: str
+    status: Literal["awaiting_upload", "processing", "done", "failed"]
+    photo_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
+
+
+class DirectUploadTicket(DirectUploadStatus):
+    """Presigned PUT the client uploads the file to before calling complete."""
+    url: str
+    method: Literal["PUT"] = "PUT"
+    headers: dict[str, str]
+    expires_in: int
+
+
+class PhotoJobStatus(BaseModel):
+    """State of the background processing job behind an async upload."""
+    job_id: int = Field(..., validation_alias="id")
+    photo_id: int
+    status: Literal["queued", "running", "done", "failed"]
+    attempts: int
+    max_attempts: int
+    next_run_at: datetime
+    last_error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
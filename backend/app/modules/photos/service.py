@@ -1,13 +1,32 @@
+import asyncio
+import json
 import logging
-from typing import BinaryIO
+import os
+from io import BytesIO
 from uuid import uuid4
+from typing import BinaryIO, Iterable, List, Optional, Set, Tuple, Union
 from datetime import datetime, timezone
-from io import BytesIO
 
-from sqlalchemy.orm import Session
-from .models import Photo
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session, aliased
+from starlette.concurrency import run_in_threadpool
+from .models import DirectUpload, Photo, PhotoJob
 from PIL import Image
-from .storage import PhotoStorage
+from .storage import photo_storage, tile_path, variant_path
+from .processing import (
+    ProcessedPhoto,
+    ALLOWED_FORMATS,
+    MAX_FILE_SIZE,
+    THUMBNAIL_SIZE,
+    build_tile_pyramid,
+    image_to_bytes,
+    process_image,
+    process_upload,
+    validate_image,
+)
+from .workers import image_pool
+from app.pagination import keyset_page
+from .jobs import photo_jobs
 
 logger = logging.getLogger("backend_photos_service")
 
@@ -20,117 +39,295 @@ class PhotoService:
     Validates file size, format, and integrity before storing in MinIO.
     """
     
-    MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
-    ALLOWED_FORMATS = {'JPEG', 'PNG', 'WEBP'}
-    THUMBNAIL_SIZE = (300, 300)
+    MAX_FILE_SIZE = MAX_FILE_SIZE
+    ALLOWED_FORMATS = ALLOWED_FORMATS
+    THUMBNAIL_SIZE = THUMBNAIL_SIZE
+    # Seconds between attempts while another transaction holds a content lock
+    CONTENT_LOCK_POLL = 0.05
     
     def __init__(self):
-        self.storage = PhotoStorage()
+        self.storage = photo_storage
+        # Files of one multi-photo request processed at the same time
+        self.upload_concurrency = int(os.getenv("PHOTO_UPLOAD_CONCURRENCY", os.cpu_count() or 4))
     
-    async def validate_photo(self, file, filename) -> tuple:
-        """Validate photo file (size, format, integrity)."""
-        try:
-            # 1. Check file size BEFORE opening
-            file.seek(0, 2)  # Seek to end
-            file_size = file.tell()
-            file.seek(0)  # Reset
-            
-            if file_size > self.MAX_FILE_SIZE:
-                raise ValueError(f"File too large: {file_size} bytes (max {self.MAX_FILE_SIZE})")
-            
-            if file_size == 0:
-                raise ValueError("File is empty") 
-            
-            
-            try:
-                img = Image.open(file)
-            except Exception as e:
-                raise ValueError(f"Invalid image file: {str(e)}")
-            try:
-                img.verify()
-            except Exception as e:
-                raise ValueError(f"Corrupted image file: {str(e)}")
-            
-            # Reset file pointer and reopen (verify() closes the image)
-            file.seek(0)
-            img = Image.open(file)
-        
-            if img.format not in PhotoService.ALLOWED_FORMATS:
-                raise ValueError(f"Unsupported format: {img.format}. Allowed: {', '.join(PhotoService.ALLOWED_FORMATS)}")
-            
-            width, height = img.size
-        
-            if width < 10 or height < 10:
-                raise ValueError(f"Image too small: {width}x{height} (minimum 10x10)")
-            max_dimension = 10000
-            if width > max_dimension or height > max_dimension:
-                raise logging.error(f"Image too large: {width}x{height} (maximum {max_dimension}x{max_dimension})")
-            
-            logger.info(f"Validated photo: {filename} ({img.format}, {width}x{height}, {file_size} bytes)")
-            
-            return img
-        
-        except ValueError:
-            # Re-raise validation errors
-            raise
-        except Exception as e:
-            logger.error(f"Photo validation failed: {str(e)}")
-            raise ValueError(f"Validation error: {str(e)}")
+    async def validate_photo(self, file, filename) -> Image.Image:
+        """Validate photo file (size, format, dimensions, pixel budget) from its header."""
+        return validate_image(file, filename)
         
     async def process_image(self, image: Image.Image, max_dimension: int = 2000) -> Image.Image:
         """Process image: resize if too large, convert to RGB."""
-        width, height = image.size
-        
-        # Resize if too large
-        if width > max_dimension or height > max_dimension:
-            ratio = min(max_dimension / width, max_dimension / height)
-            new_size = (int(width * ratio), int(height * ratio))
-            image = image.resize(new_size, Image.Resampling.LANCZOS)
-        
-        # Convert to RGB for JPEG compatibility
-        if image.mode in ('RGBA', 'LA', 'P'):
-            background = Image.new('RGB', image.size, (255, 255, 255))
-            if image.mode == 'P':
-                image = image.convert('RGBA')
-            if 'A' in image.mode:
-                background.paste(image, mask=image.split()[-1])
-            else:
-                background.paste(image)
-            image = background
-        
-        return image
+        return process_image(image, max_dimension)
     
     def image_to_bytes(self, image: Image.Image, format: str = 'JPEG', quality: int = 85) -> bytes:
         """Convert PIL Image to bytes."""
-        buffer = BytesIO()
-        image.save(buffer, format=format, quality=quality)
-        buffer.seek(0)
-        return buffer.read()
+        return image_to_bytes(image, format=format, quality=quality)
+
+    def read_upload(self, file: BinaryIO) -> bytes:
+        """Read an uploaded file into memory, rejecting oversized files first."""
+        file.seek(0, 2)
+        file_size = file.tell()
+        file.seek(0)
+        if file_size > self.MAX_FILE_SIZE:
+            raise ValueError(f"File too large: {file_size} bytes (max {self.MAX_FILE_SIZE})")
+        return file.read()
+
+    @staticmethod
+    def content_path(processed: ProcessedPhoto) -> str:
+        """Immutable, content-addressed object key: photos/<h[:2]>/<sha256>.jpg"""
+        return f"photos/{processed.sha256[:2]}/{processed.sha256}.jpg"
+
+    async def lock_content(self, db: Session, file_paths: Iterable[str]) -> None:
+        """
+        Lock stored objects by path until ``db``'s transaction ends.
+
+        Uploads take the lock before store_processed and keep it until their
+        row is committed; deletes take it before counting references and
+        keep it until the row is gone, so a dedup upload can never insert a
+        row for an object a concurrent delete is removing. Uses PostgreSQL
+        transaction-level advisory locks, taken in sorted order (call once
+        per transaction) and polled so a wait does not block the event loop.
+        A no-op on other databases.
+        """
+        if db.get_bind().dialect.name != "postgresql":
+            return
+        for path in sorted(set(file_paths)):
+            lock = select(func.pg_try_advisory_xact_lock(func.hashtext(path)))
+            while not db.execute(lock).scalar():
+                await asyncio.sleep(self.CONTENT_LOCK_POLL)
+
+    async def store_processed(self, processed: ProcessedPhoto) -> str:
+        """
+        Store a processed photo and its derivatives under its content hash.
+
+        Re-uploads of identical content (e.g. retries over flaky Wi-Fi) find
+        the object already present and skip all storage writes. Callers hold
+        lock_content on the path until the row referencing it is committed.
+        """
+        photo_path = self.content_path(processed)
+        if await self.storage.photo_exists(photo_path):
+            logger.info(f"Photo content already stored, skipping upload: {photo_path}")
+            return photo_path
+
+        # Derivatives first: the full image's presence marks a complete set
+        for variant, variant_bytes in processed.derivatives.items():
+            await self.storage.upload_photo(variant_bytes, variant_path(photo_path, variant), "image/jpeg")
+        await self.storage.upload_photo(processed.data, photo_path, processed.content_type)
+        return photo_path
+
+    async def ensure_tiles(self, photo: Photo) -> dict:
+        """
+        Return the tile pyramid manifest of a photo, building it on first use.
+
+        The pyramid is cut in the image worker pool and stored under
+        ``tiles/``; the manifest is written last, so its presence means
+        every tile is in storage.
+        """
+        manifest_key = tile_path(photo.file_path, "manifest.json")
+        if await self.storage.photo_exists(manifest_key):
+            return json.loads(await self.storage.get_photo(manifest_key))
+
+        data = await self.storage.get_photo(photo.file_path)
+        pyramid = await image_pool.run(build_tile_pyramid, data)
+
+        semaphore = asyncio.Semaphore(self.upload_concurrency)
+
+        async def _put(name: str, tile: bytes):
+            async with semaphore:
+                await self.storage.upload_photo(tile, tile_path(photo.file_path, name), "image/jpeg")
+
+        await asyncio.gather(*(_put(name, tile) for name, tile in pyramid.tiles.items()))
+
+        manifest = {
+            "width": pyramid.width,
+            "height": pyramid.height,
+            "tile_size": pyramid.tile_size,
+            "levels": pyramid.levels,
+        }
+        await self.storage.upload_photo(json.dumps(manifest).encode("utf-8"), manifest_key, "application/json")
+        logger.info(f"Built {len(pyramid.tiles)} tiles ({pyramid.levels} levels) for photo {photo.id}")
+        return manifest
+
+    def list_test_photos(
+        self,
+        db: Session,
+        test_id: int,
+        limit: int,
+        cursor: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        include_total: bool = False,
+    ) -> dict:
+        """
+        One page of a test's ready photos in upload order (time_stamp, id).
+
+        Photos still processing (or failed) are left out; clients follow
+        those through their job. ``since`` is inclusive and ``until``
+        exclusive. The total is only
+        counted on request: it is the one part of a page whose cost grows
+        with the size of the test. Raises ValueError for a bad cursor.
+        """
+        query = db.query(Photo).filter(Photo.test_id == test_id, Photo.status == "ready")
+        if since is not None:
+            query = query.filter(Photo.time_stamp >= since)
+        if until is not None:
+            query = query.filter(Photo.time_stamp < until)
+
+        total = query.count() if include_total else None
+        photos, next_cursor = keyset_page(
+            query,
+            (Photo.time_stamp, Photo.id),
+            cursor,
+            limit,
+            key=lambda photo: (photo.time_stamp, photo.id),
+        )
+        return {"total": total, "photos": photos, "limit": limit, "next_cursor": next_cursor}
+
+    def photos_for_tests(
+        self,
+        db: Session,
+        test_ids: List[int],
+        per_test: Optional[int] = None,
+    ) -> dict:
+        """
+        Ready photos of many tests from one query, grouped by test.
+
+        Window functions rank and count the photos of each test in the
+        database, so with ``per_test`` only the first N photos per test (in
+        upload order) are read back. Tests without photos get an empty group.
+        """
+        test_ids = list(dict.fromkeys(test_ids))
+        ranked = (
+            db.query(
+                Photo,
+                func.row_number().over(
+                    partition_by=Photo.test_id, order_by=(Photo.time_stamp, Photo.id)
+                ).label("rank"),
+                func.count(Photo.id).over(partition_by=Photo.test_id).label("total"),
+            )
+            .filter(Photo.test_id.in_(test_ids), Photo.status == "ready")
+            .subquery()
+        )
+        photo = aliased(Photo, ranked)
+        query = db.query(photo, ranked.c.total)
+        if per_test is not None:
+            query = query.filter(ranked.c.rank <= per_test)
+        rows = query.order_by(ranked.c.test_id, ranked.c.rank).all()
+
+        groups = {test_id: {"test_id": test_id, "total": 0, "photos": []} for test_id in test_ids}
+        for row, total in rows:
+            group = groups[row.test_id]
+            group["total"] = total
+            group["photos"].append(row)
+        return {"groups": list(groups.values()), "per_test": per_test}
+
+    def list_feed(
+        self,
+        db: Session,
+        limit: int,
+        cursor: Optional[str] = None,
+        test_type: Optional[str] = None,
+        test_status: Optional[str] = None,
+        product_id: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> dict:
+        """
+        One page of ready photos across all tests, newest first.
+
+        A single query joins each photo with the handful of test columns
+        the gallery shows, instead of one request (and query) per test.
+        Raises ValueError for a bad cursor.
+        """
+        # Imported here: the tests package imports this module via its service
+        from app.modules.tests.models import Tests
+
+        query = (
+            db.query(Photo, Tests.id, Tests.product_id, Tests.test_type, Tests.status)
+            .join(Tests, Tests.id == Photo.test_id)
+            .filter(Photo.status == "ready")
+        )
+        if test_type is not None:
+            query = query.filter(Tests.test_type == test_type)
+        if test_status is not None:
+            query = query.filter(Tests.status == test_status)
+        if product_id is not None:
+            query = query.filter(Tests.product_id == product_id)
+        if since is not None:
+            query = query.filter(Photo.time_stamp >= since)
+        if until is not None:
+            query = query.filter(Photo.time_stamp < until)
+
+        rows, next_cursor = keyset_page(
+            query,
+            (Photo.time_stamp, Photo.id),
+            cursor,
+            limit,
+            key=lambda row: (row[0].time_stamp, row[0].id),
+            descending=True,
+        )
+        items = [
+            {
+                "photo": photo,
+                "test": {"id": tid, "product_id": product, "test_type": ttype, "status": tstatus},
+            }
+            for photo, tid, product, ttype, tstatus in rows
+        ]
+        return {"items": items, "limit": limit, "next_cursor": next_cursor}
+
+    def shared_file_paths(
+        self,
+        db: Session,
+        file_paths: Iterable[str],
+        exclude_photo_ids: Optional[Iterable[int]] = None,
+        exclude_test_id: Optional[int] = None,
+    ) -> Set[str]:
+        """
+        Of ``file_paths``, return those still referenced by other Photo rows.
+
+        Stored objects are shared by every photo with the same content, so
+        the Photo rows pointing at a path act as its reference count: an
+        object may only be deleted once no row outside the excluded set
+        references it.
+        """
+        paths = list(set(file_paths))
+        if not paths:
+            return set()
+        q = db.query(Photo.file_path).filter(Photo.file_path.in_(paths))
+        if exclude_photo_ids is not None:
+            q = q.filter(Photo.id.notin_(list(exclude_photo_ids)))
+        if exclude_test_id is not None:
+            q = q.filter(Photo.test_id != exclude_test_id)
+        return {row[0] for row in q.distinct()}
+
+    async def ingest_photo(self, file: BinaryIO, filename: str) -> ProcessedPhoto:
+        """
+        Read and process one upload in the image worker pool.
+
+        Touches neither the database nor storage, so several ingests can run
+        concurrently for a single request; storing happens under the
+        content lock.
+        """
+        data = await run_in_threadpool(self.read_upload, file)
+        return await image_pool.run(process_upload, data, filename)
 
     async def upload_photo(self, db: Session, file: BinaryIO, filename: str, test_id: int):
         """
         Upload and process a photo for a quality test.
         
-        Validates the photo, processes it (resize, format conversion),
-        uploads to MinIO storage, and saves metadata to database.
+        Validates the photo, processes it (resize, format conversion, thumb
+        and preview derivatives) in the image worker pool, stores all
+        variants under the content hash, and saves metadata to database.
         """
-        img = await self.validate_photo(file, filename)
-        
-        processed = await self.process_image(img)
-        
-        photo_id = str(uuid4())
-        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d")
-        photo_path = f"photos/{timestamp}/{photo_id}.jpg"
-        
-        photo_bytes = self.image_to_bytes(processed, quality=85)
-        
-        await self.storage.upload_photo(photo_bytes, photo_path, "image/jpeg") 
+        processed = await self.ingest_photo(file, filename)
+        await self.lock_content(db, [self.content_path(processed)])
+        photo_path = await self.store_processed(processed)
         
         photo = Photo(
             test_id=test_id,
             file_path=photo_path,
             time_stamp=datetime.now(timezone.utc),
-            analysis_results=None
+            analysis_results=None,
+            placeholder=processed.placeholder or None,
         )
         db.add(photo)
         db.commit()
@@ -138,4 +335,159 @@ class PhotoService:
         
         return photo
 
+    def enqueue_staged(self, db: Session, upload: DirectUpload) -> PhotoJob:
+        """
+        Hand a directly uploaded staging object to the photo job queue.
+
+        Creates the photo in the ``processing`` state (or reuses the failed
+        photo of an earlier attempt) with its PhotoJob, links it to the
+        upload and commits, so ingestion survives restarts like
+        ``mode=async`` uploads do.
+        """
+        photo = db.get(Photo, upload.photo_id) if upload.photo_id else None
+        if photo is None:
+            photo = Photo(
+                test_id=upload.test_id,
+                file_path=upload.staging_key,
+                time_stamp=datetime.now(timezone.utc),
+                analysis_results=None,
+                status="processing",
+            )
+            db.add(photo)
+        else:
+            photo.status = "processing"
+        job = photo_jobs.enqueue(db, photo, upload.staging_key, upload.filename)
+        db.flush()
+        upload.status = "processing"
+        upload.photo_id = photo.id
+        upload.error = None
+        db.commit()
+        db.refresh(job)
+        photo_jobs.notify()
+        return job
+
+    async def discard_staged(self, staged: Union[DirectUpload, PhotoJob]) -> None:
+        """Best-effort removal of a staging object (direct upload or queued job)."""
+        try:
+            await self.storage.delete_photo(staged.staging_key)
+        except Exception as e:
+            logger.warning(f"Failed to delete staging object {staged.staging_key}: {str(e)}")
+
+    async def enqueue_upload(self, db: Session, file: BinaryIO, filename: str, test_id: int):
+        """
+        Accept an upload for background processing.
+
+        Only the header is validated inline (so garbage is still rejected
+        with the request); the raw bytes go to a staging object and the
+        photo is created in the ``processing`` state together with its
+        PhotoJob. Returns ``(photo, job)``.
+        """
+        data = await run_in_threadpool(self.read_upload, file)
+        await run_in_threadpool(validate_image, BytesIO(data), filename)
+
+        staging_key = f"staging/{uuid4().hex}"
+        await self.storage.upload_photo(data, staging_key, "application/octet-stream")
+
+        photo = Photo(
+            test_id=test_id,
+            file_path=staging_key,
+            time_stamp=datetime.now(timezone.utc),
+            analysis_results=None,
+            status="processing",
+        )
+        db.add(photo)
+        job = photo_jobs.enqueue(db, photo, staging_key, filename)
+        db.commit()
+        db.refresh(photo)
+        db.refresh(job)
+        photo_jobs.notify()
+
+        return photo, job
+
+    async def process_staged_photo(self, db: Session, job: PhotoJob) -> Photo:
+        """
+        Queue consumer step: process a job's staged bytes into the stored photo.
+
+        The photo row keeps its id; its ``file_path`` moves from the staging
+        object to the content-addressed path and its status becomes ready.
+        """
+        photo = job.photo
+        info = await self.storage.stat_photo(job.staging_key)
+        if info.size > self.MAX_FILE_SIZE:
+            # Direct uploads reach storage without passing read_upload
+            raise ValueError(f"File too large: {info.size} bytes (max {self.MAX_FILE_SIZE})")
+        data = await self.storage.get_photo(job.staging_key)
+        processed = await image_pool.run(process_upload, data, job.filename)
+        await self.lock_content(db, [self.content_path(processed)])
+        photo_path = await self.store_processed(processed)
+
+        photo.file_path = photo_path
+        photo.placeholder = processed.placeholder or None
+        photo.status = "ready"
+        job.status = "done"
+        job.locked_at = None
+        job.last_error = None
+        db.query(DirectUpload).filter(DirectUpload.photo_id == photo.id).update(
+            {"status": "done", "error": None}, synchronize_session=False
+        )
+        db.commit()
+
+        await self.discard_staged(job)
+        return photo
+
+    async def upload_photos(
+        self,
+        db: Session,
+        files: List[Tuple[BinaryIO, str]],
+        test_id: int,
+        concurrency: Optional[int] = None,
+    ) -> List[Union[Photo, Exception]]:
+        """
+        Upload many photos for a quality test.
+
+        Files are processed concurrently (at most ``concurrency`` at once,
+        never more than the image pool accepts), then stored under one
+        content lock for the whole batch, and all Photo rows are inserted in
+        one transaction. The result list follows the order of ``files``; a
+        failed file's entry is its exception.
+        """
+        limit = min(concurrency or self.upload_concurrency, image_pool.max_queue)
+        semaphore = asyncio.Semaphore(max(limit, 1))
+
+        async def _ingest(file: BinaryIO, filename: str) -> ProcessedPhoto:
+            async with semaphore:
+                return await self.ingest_photo(file, filename)
+
+        async def _store(processed) -> dict:
+            if isinstance(processed, BaseException):
+                raise processed
+            async with semaphore:
+                photo_path = await self.store_processed(processed)
+            return {"file_path": photo_path, "placeholder": processed.placeholder or None}
+
+        processed = await asyncio.gather(
+            *(_ingest(file, filename) for file, filename in files),
+            return_exceptions=True,
+        )
+        await self.lock_content(
+            db, (self.content_path(p) for p in processed if not isinstance(p, BaseException))
+        )
+        results = await asyncio.gather(*(_store(p) for p in processed), return_exceptions=True)
+
+        now = datetime.now(timezone.utc)
+        photos = {
+            index: Photo(test_id=test_id, time_stamp=now, analysis_results=None, **fields)
+            for index, fields in enumerate(results)
+            if not isinstance(fields, BaseException)
+        }
+        if photos:
+            db.add_all(photos.values())
+            db.flush()
+            ids = [photo.id for photo in photos.values()]
+            db.commit()
+            # Reload the expired rows with one SELECT instead of one per photo
+            db.query(Photo).filter(Photo.id.in_(ids)).all()
+
+        return [photos.get(index, result) for index, result in enumerate(results)]
+
 photo_service = PhotoService()
\ No newline at end of file
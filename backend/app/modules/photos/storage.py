@@ -1,124 +1,465 @@
+import asyncio
+import contextlib
+import fcntl
+import hashlib
 import json
 import logging
 import os
-import sys
-from io import BytesIO
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-from minio import Minio
-from minio.error import S3Error
-from typing import BinaryIO
-from datetime import timedelta
+from typing import Any, AsyncIterator, Callable, Iterator, Optional, Tuple
+from datetime import datetime
+
+from .backends import STREAM_CHUNK_SIZE, ObjectInfo, StorageBackend, create_backend
 
 
 logger = logging.getLogger("backend_photos_storage")
 
+
+# Named renditions stored next to every photo; "full" is the photo itself
+PHOTO_VARIANTS = ("thumb", "preview", "full")
+
+
+def variant_path(file_path: str, variant: str) -> str:
+    """Object key of a photo variant, e.g. photos/x/abc.jpg -> photos/x/abc_thumb.jpg"""
+    if variant == "full":
+        return file_path
+    root, _ext = os.path.splitext(file_path)
+    return f"{root}_{variant}.jpg"
+
+
+def photo_version(file_path: str) -> str:
+    """
+    Short content version of a stored photo, used in cache-busting URLs.
+
+    Content-addressed keys already carry the SHA-256 of the object; older
+    keys are hashed themselves, which still changes whenever the object
+    behind a photo does (new content is always written to a new key).
+    """
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    if len(stem) == 64 and all(c in "0123456789abcdef" for c in stem):
+        return stem[:16]
+    return hashlib.sha256(file_path.encode("utf-8")).hexdigest()[:16]
+
+
+def render_prefix(file_path: str) -> str:
+    """Key prefix of all on-the-fly renditions of a photo."""
+    root, _ext = os.path.splitext(file_path)
+    return f"renders/{root.lstrip('/')}/"
+
+
+def render_path(file_path: str, width: Optional[int], height: Optional[int], fit: str, fmt: str) -> str:
+    """Object key of a rendition, e.g. renders/photos/x/abc/640x0-contain.webp"""
+    return f"{render_prefix(file_path)}{width or 0}x{height or 0}-{fit}.{fmt}"
+
+
+def tile_prefix(file_path: str) -> str:
+    """Key prefix of a photo's deep-zoom tile pyramid."""
+    root, _ext = os.path.splitext(file_path)
+    return f"tiles/{root.lstrip('/')}/"
+
+
+def tile_path(file_path: str, name: str) -> str:
+    """Object key of a tile ("z/x/y") or of the pyramid's manifest.json."""
+    suffix = name if name.endswith(".json") else f"{name}.jpg"
+    return f"{tile_prefix(file_path)}{suffix}"
+
+
+class PhotoDiskCache:
+    """
+    Size-bounded on-disk LRU cache for hot photo objects.
+
+    Objects are stored under ``<dir>/<hh>/<sha256(key)>`` with a JSON
+    sidecar holding the ObjectInfo used for response headers. The directory
+    may be shared by several uvicorn workers:
+
+    - entries are written to a temp file and published with ``os.replace``,
+      so readers only ever see complete files;
+    - a cache hit bumps the file mtime, which is the LRU clock;
+    - eviction runs under an exclusive ``flock`` so only one worker trims
+      the directory at a time, and skips entries used in the last
+      ``EVICT_GRACE`` seconds, which may be about to be sent as files.
+
+    Scanning the directory is O(entries), so it does not happen per fill:
+    each process adds its own fills to the size measured by the last scan
+    and only scans again when that estimate exceeds ``max_bytes`` or
+    ``RESCAN_INTERVAL`` seconds have passed (to account for fills by other
+    workers). A scan trims the cache to ``LOW_WATER`` of ``max_bytes`` so
+    the next few fills do not trigger another one.
+
+    Hit/miss/eviction counters are per process.
+    """
+
+    EVICT_GRACE = 30.0
+    RESCAN_INTERVAL = 60.0
+    LOW_WATER = 0.9
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock_path = os.path.join(self.directory, ".evict.lock")
+        # Estimated cache size; None until the first scan
+        self._size: Optional[int] = None
+        self._scanned_at = 0.0
+        self._metrics = {"hits": 0, "misses": 0, "fills": 0, "evictions": 0, "evicted_bytes": 0, "scans": 0}
+
+    @classmethod
+    def from_env(cls) -> Optional["PhotoDiskCache"]:
+        """Build the cache from PHOTO_CACHE_DIR / PHOTO_CACHE_MAX_MB (disabled if no dir)."""
+        directory = os.getenv("PHOTO_CACHE_DIR")
+        if not directory:
+            return None
+        max_mb = int(os.getenv("PHOTO_CACHE_MAX_MB", "1024"))
+        return cls(directory, max_mb * 1024 * 1024)
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, digest[:2], digest)
+        return base, base + ".json"
+
+    def get(self, key: str) -> Optional[ObjectInfo]:
+        """Return the cached ObjectInfo (with ``local_path`` set) or None."""
+        data_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as fh:
+                meta = json.load(fh)
+            size = os.stat(data_path).st_size
+            os.utime(data_path)  # LRU touch
+        except (OSError, ValueError):
+            self._metrics["misses"] += 1
+            return None
+        if size != meta["size"]:
+            self._metrics["misses"] += 1
+            return None
+
+        self._metrics["hits"] += 1
+        return ObjectInfo(
+            size=size,
+            etag=meta.get("etag"),
+            last_modified=datetime.fromisoformat(meta["last_modified"]) if meta.get("last_modified") else None,
+            content_type=meta.get("content_type"),
+            local_path=data_path,
+        )
+
+    def fill(self, key: str, info: ObjectInfo, chunks: Iterator[bytes]) -> Iterator[bytes]:
+        """
+        Pass ``chunks`` through while writing them to the cache.
+
+        The entry is only published if the stream completes with the expected
+        size; an aborted client download leaves no trace in the cache.
+        """
+        data_path, meta_path = self._paths(key)
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(data_path), prefix=".tmp-")
+        written = 0
+        published = False
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for chunk in chunks:
+                    out.write(chunk)
+                    written += len(chunk)
+                    yield chunk
+            if written == info.size:
+                meta = {
+                    "size": info.size,
+                    "etag": info.etag,
+                    "last_modified": info.last_modified.isoformat() if info.last_modified else None,
+                    "content_type": info.content_type,
+                }
+                meta_tmp = tmp_path + ".json"
+                with open(meta_tmp, "w", encoding="utf-8") as fh:
+                    json.dump(meta, fh)
+                os.replace(meta_tmp, meta_path)
+                os.replace(tmp_path, data_path)
+                published = True
+                self._metrics["fills"] += 1
+                if self._size is not None:
+                    self._size += written
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()  # release the upstream connection early
+            if not published:
+                with contextlib.suppress(OSError):
+                    os.unlink(tmp_path)
+        if published:
+            self.maybe_evict()
+
+    def invalidate(self, key: str) -> None:
+        """Drop a cached entry (no-op if absent)."""
+        for path in self._paths(key):
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(path)
+
+    def maybe_evict(self) -> None:
+        """Evict when the size estimate is over budget or a rescan is due."""
+        due = time.monotonic() - self._scanned_at >= self.RESCAN_INTERVAL
+        if self._size is None or self._size > self.max_bytes or due:
+            self.evict()
+
+    def evict(self) -> None:
+        """Scan the cache and remove least recently used entries while it exceeds max_bytes."""
+        with open(self._lock_path, "a") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return  # another worker is already evicting
+
+            entries = []
+            total = 0
+            for bucket in os.scandir(self.directory):
+                if not bucket.is_dir():
+                    continue
+                for entry in os.scandir(bucket.path):
+                    if entry.name.startswith(".") or entry.name.endswith(".json"):
+                        continue
+                    with contextlib.suppress(FileNotFoundError):
+                        st = entry.stat()
+                        entries.append((st.st_mtime, st.st_size, entry.path))
+                        total += st.st_size
+            self._metrics["scans"] += 1
+            self._scanned_at = time.monotonic()
+
+            if total > self.max_bytes:
+                target = int(self.max_bytes * self.LOW_WATER)
+                recent = time.time() - self.EVICT_GRACE
+                entries.sort()
+                for mtime, size, path in entries:
+                    if total <= target or mtime > recent:
+                        break
+                    for victim in (path, path + ".json"):
+                        with contextlib.suppress(FileNotFoundError):
+                            os.unlink(victim)
+                    total -= size
+                    self._metrics["evictions"] += 1
+                    self._metrics["evicted_bytes"] += size
+            self._size = total
+
+    def stats(self) -> dict:
+        return {"directory": self.directory, "max_bytes": self.max_bytes, **self._metrics}
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (milliseconds) for storage operations."""
+
+    BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, seconds: float, error: bool = False):
+        ms = seconds * 1000
+        for i, bound in enumerate(self.BUCKETS_MS):
+            if ms <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.errors += int(error)
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def snapshot(self) -> dict:
+        buckets = {f"le_{bound}ms": n for bound, n in zip(self.BUCKETS_MS, self.counts)}
+        buckets["gt_5000ms"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "buckets": buckets,
+        }
+
+
 class PhotoStorage:
-    """Handles photo storage operations with MinIO"""
+    """Async photo storage facade over a pluggable StorageBackend.
+
+    Backends (MinIO, local filesystem - see backends.py) are blocking, so
+    every call runs on a dedicated, sized thread pool (STORAGE_IO_THREADS,
+    default 16) and is awaited from the event loop. The pool size is the
+    per-process concurrency limit for storage requests; the MinIO
+    connection pool is sized to match so each I/O thread reuses a
+    keep-alive connection.
+    """
     
-    def __init__(self):
-        self.client = Minio(
-            endpoint=os.getenv("MINIO_ENDPOINT", "minio:9000"),
-            access_key=os.getenv("MINIO_ACCESS_KEY", "minioadmin"),
-            secret_key=os.getenv("MINIO_SECRET_KEY", "minioadmin"),
-            secure=False  
+    def __init__(self, backend: Optional[StorageBackend] = None):
+        self.io_threads = int(os.getenv("STORAGE_IO_THREADS", "16"))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.io_threads, thread_name_prefix="photo-storage-io"
         )
-        
-        self.bucket_name = os.getenv("MINIO_BUCKET", "qc-vision-photos")
-        
-        self.public_endpoint = os.getenv("MINIO_PUBLIC_ENDPOINT", "localhost:9000")
-        self.internal_endpoint = os.getenv("MINIO_ENDPOINT", "minio:9000")
-        self._ensure_bucket_exists()
-    
-    def _ensure_bucket_exists(self):
-        """Create bucket if it doesn't exist and configure for public read access"""
+        self._latency = {}
+        self.backend = backend or create_backend(max_connections=self.io_threads)
+        # Local files are already served zero-copy; only remote backends need the cache
+        self.cache = None if self.backend.serves_local_files else PhotoDiskCache.from_env()
+        logger.info(f"Photo storage backend: {self.backend.name}")
+
+    async def _run(self, op: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run a blocking backend call on the storage I/O pool and time it."""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        failed = False
         try:
-            if not self.client.bucket_exists(self.bucket_name):
-                self.client.make_bucket(self.bucket_name)
-                logger.info(f"Created bucket: {self.bucket_name}")
-            
-            # Set bucket policy to allow public read access
-            # This way we don't need presigned URLs
-            policy = {
-                "Version": "2012-10-17",
-                "Statement": [
-                    {
-                        "Effect": "Allow",
-                        "Principal": {"AWS": "*"},
-                        "Action": ["s3:GetObject"],
-                        "Resource": [f"arn:aws:s3:::{self.bucket_name}/*"]
-                    }
-                ]
-            }
-            
-            try:
-                self.client.set_bucket_policy(self.bucket_name, json.dumps(policy))
-                logger.info(f"Public read policy set for bucket: {self.bucket_name}")
-            except Exception as policy_error:
-                logger.warning(f"Could not set bucket policy: {str(policy_error)}")
-                
-        except S3Error as e:
-            logger.error(f"Failed to create bucket: {str(e)}")
+            return await loop.run_in_executor(self._executor, lambda: fn(*args, **kwargs))
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._latency.setdefault(op, LatencyHistogram()).observe(time.perf_counter() - started, failed)
+
+    async def _aiter_chunks(self, chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+        """Drain a blocking chunk iterator on the storage I/O pool."""
+        sentinel = object()
+        try:
+            while True:
+                chunk = await self._run("read_chunk", next, chunks, sentinel)
+                if chunk is sentinel:
+                    break
+                yield chunk
+        finally:
+            if hasattr(chunks, "close"):
+                await asyncio.get_running_loop().run_in_executor(self._executor, chunks.close)
 
+    def stats(self) -> dict:
+        """Per-operation latency histograms for this process."""
+        return {
+            "backend": self.backend.name,
+            "io_threads": self.io_threads,
+            "operations": {op: hist.snapshot() for op, hist in self._latency.items()},
+        }
+
+    def shutdown(self):
+        """Stop the I/O threads. Called from the application lifespan."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
 
     async def upload_photo(self, photo_bytes: bytes, photo_path: str, content_type: str):
-        """Upload a photo to MinIO storage."""
+        """Upload a photo to storage."""
         try:
-            file_data = BytesIO(photo_bytes)
-            file_size = len(photo_bytes)
-
-            self.client.put_object(
-                bucket_name=self.bucket_name,
-                object_name=photo_path,
-                data=file_data,
-                length=file_size,
-                content_type=content_type
-            )
-            logger.info(f"Uploaded photo to MinIO: {photo_path} ({file_size} bytes)")
+            await self._run("put", self.backend.put, photo_path, photo_bytes, content_type)
+            logger.info(f"Uploaded photo to {self.backend.name}: {photo_path} ({len(photo_bytes)} bytes)")
             return photo_path
-        except S3Error as e:
+        except Exception as e:
             logger.error(f"Failed to upload photo: {str(e)}")
             raise
     
+    async def photo_exists(self, file_path: str) -> bool:
+        """Check whether an object is already stored."""
+        if self.cache is not None and await self._run("cache_get", self.cache.get, file_path) is not None:
+            return True
+        return await self._run("exists", self.backend.exists, file_path)
+
     async def get_photo(self, file_path: str) -> bytes:
-        """Retrieve photo from MinIO. Downloads the photo data as bytes"""
+        """Retrieve photo from storage. Downloads the photo data as bytes"""
         try:
-            response = self.client.get_object(
-                bucket_name=self.bucket_name,
-                object_name=file_path
-            )
-            data = response.read()
-            response.close()
-            response.release_conn()
-            return data
-        except S3Error as e:
+            return await self._run("get", self.backend.get, file_path)
+        except Exception as e:
             logger.error(f"Failed to retrieve photo: {str(e)}")
             raise
     
-    async def delete_photo(self, file_path: str) -> bool:
-        """Delete photo from MinIO"""
+    async def stat_photo(self, file_path: str) -> ObjectInfo:
+        """Get size, etag and modification time of a stored photo without reading it.
+
+        ``local_path`` is set on the result when the bytes can be sent from a
+        local file: always for the filesystem backend, and on disk cache
+        hits for remote backends (which then are not contacted at all).
+        """
+        if self.cache is not None:
+            cached = await self._run("cache_get", self.cache.get, file_path)
+            if cached is not None:
+                return cached
+        try:
+            return await self._run("stat", self.backend.stat, file_path)
+        except Exception as e:
+            logger.error(f"Failed to stat photo: {str(e)}")
+            raise
+
+    async def stat_local_file(self, path: str) -> Optional[os.stat_result]:
+        """
+        Stat a ``local_path`` returned by stat_photo, on the I/O pool.
+
+        Returns None when the file has gone in the meantime (a disk cache
+        entry evicted by another worker); callers then fall back to
+        streaming from the backend.
+        """
         try:
-            self.client.remove_object(
-                bucket_name=self.bucket_name,
-                object_name=file_path
+            return await self._run("stat_local", os.stat, path)
+        except FileNotFoundError:
+            return None
+
+    async def stream_photo(
+        self,
+        file_path: str,
+        offset: int = 0,
+        length: Optional[int] = None,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+    ) -> AsyncIterator[bytes]:
+        """
+        Open a photo (or a byte range of it) and return an async chunk iterator.
+
+        The object is opened eagerly so missing keys fail here rather than
+        mid-response. Chunks are read on the storage I/O pool and the
+        connection is released when the iterator is exhausted or closed.
+        Full-object reads are written through to the disk cache when it is
+        enabled.
+        """
+        try:
+            info, chunks = await self._run(
+                "open_stream", self.backend.open, file_path, offset, length, chunk_size
             )
+        except Exception as e:
+            logger.error(f"Failed to open photo stream: {str(e)}")
+            raise
+        if self.cache is not None and offset == 0 and not length:
+            chunks = self.cache.fill(file_path, info, chunks)
+        return self._aiter_chunks(chunks)
+
+    async def delete_photo(self, file_path: str) -> bool:
+        """Delete photo and all of its derivative variants from storage (and the disk cache)
+
+        On-the-fly renditions and tile pyramids are removed from storage by
+        prefix; their disk cache entries cannot be enumerated and age out
+        through the LRU.
+        """
+        try:
+            for variant in PHOTO_VARIANTS:
+                object_name = variant_path(file_path, variant)
+                if self.cache is not None:
+                    self.cache.invalidate(object_name)
+                await self._run("delete", self.backend.delete, object_name)
+            for prefix in (render_prefix(file_path), tile_prefix(file_path)):
+                await self._run("delete_prefix", self.backend.delete_prefix, prefix)
             return True
-        except S3Error as e:
+        except Exception as e:
             logger.error(f"Failed to delete photo: {str(e)}")
             raise
     
     def generate_presigned_url(self, file_path: str, expiration: int = 3600) -> str:
         """Generate a public URL for photo access
 
-            Since bucket is public, we can return a direct URL without presigned parameters
+            MinIO buckets are public, so this is a direct URL without presigned
+            parameters. Backends without public URLs return an empty string.
         """
         try:
-            # Return direct public URL (no signature needed since bucket is public)
-            url = f"http://{self.public_endpoint}/{self.bucket_name}/{file_path}"
+            url = self.backend.public_url(file_path)
             logger.debug(f"Generated public URL: {url}")
             return url
         except Exception as e:
             logger.error(f"Failed to generate URL: {str(e)}")
             return ""
 
+    async def generate_presigned_put_url(self, file_path: str, expiration: int = 900) -> str:
+        """
+        Generate a time-limited URL the client can upload an object to directly.
+
+        Raises NotImplementedError when the backend cannot accept direct uploads.
+        """
+        return await self._run("presign_put", self.backend.presigned_put_url, file_path, expiration)
+
 
 photo_storage = PhotoStorage()
\ No newline at end of file
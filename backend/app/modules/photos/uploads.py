@@ -0,0 +1,209 @@
+"""
+Resumable chunked upload sessions.
+
+A client creates a session for a file of known size, PUTs chunks at byte
+offsets (in any order, retrying only what failed) and finalizes. Chunks are
+written straight into a pre-sized part file on local disk; finalize hands
+that file to the regular PhotoService pipeline.
+
+Layout under ``PHOTO_UPLOAD_DIR``::
+
+    <upload_id>/meta.json   session metadata and received byte ranges
+    <upload_id>/data.part   the file being assembled
+
+Metadata updates run under an exclusive ``flock`` on the session
+directory's lock file, so several uvicorn workers may receive chunks of
+the same session. Sessions not finalized within ``PHOTO_UPLOAD_TTL``
+seconds are purged lazily when new sessions are created.
+"""
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Iterable, List, Tuple
+
+logger = logging.getLogger("backend_photos_uploads")
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024  # suggested to clients; any size is accepted
+
+
+class UploadSessionNotFound(Exception):
+    """Raised for unknown, finalized or expired upload sessions."""
+
+
+class ChunkTooLarge(ValueError):
+    """Raised when a chunk runs past the declared file size."""
+
+
+def merge_ranges(ranges: Iterable[Tuple[int, int]]) -> List[List[int]]:
+    """Merge half-open ``[start, end)`` byte ranges into a sorted, disjoint list."""
+    merged: List[List[int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def missing_ranges(received: List[List[int]], size: int) -> List[List[int]]:
+    """Complement of the received ranges within ``[0, size)``."""
+    gaps = []
+    position = 0
+    for start, end in received:
+        if start > position:
+            gaps.append([position, start])
+        position = max(position, end)
+    if position < size:
+        gaps.append([position, size])
+    return gaps
+
+
+class UploadSessionStore:
+    """Upload sessions kept as directories on local disk."""
+
+    def __init__(self, directory: str, ttl_seconds: int = 24 * 3600):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(self.directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> "UploadSessionStore":
+        """Build the store from PHOTO_UPLOAD_DIR / PHOTO_UPLOAD_TTL."""
+        directory = os.getenv("PHOTO_UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "qc_vision_uploads"))
+        return cls(directory, int(os.getenv("PHOTO_UPLOAD_TTL", str(24 * 3600))))
+
+    def _dir(self, upload_id: str) -> str:
+        # Session ids are generated by us; anything else cannot name a session
+        try:
+            upload_id = uuid.UUID(upload_id).hex
+        except ValueError:
+            raise UploadSessionNotFound(upload_id)
+        return os.path.join(self.directory, upload_id)
+
+    def data_path(self, upload_id: str) -> str:
+        return os.path.join(self._dir(upload_id), "data.part")
+
+    @contextlib.contextmanager
+    def _locked(self, upload_id: str):
+        """Yield the session metadata under an exclusive lock; writes are persisted."""
+        session_dir = self._dir(upload_id)
+        try:
+            lock = open(os.path.join(session_dir, ".lock"), "a")
+        except FileNotFoundError:
+            raise UploadSessionNotFound(upload_id)
+        with lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            meta_path = os.path.join(session_dir, "meta.json")
+            try:
+                with open(meta_path, "r", encoding="utf-8") as fh:
+                    meta = json.load(fh)
+            except FileNotFoundError:
+                raise UploadSessionNotFound(upload_id)
+            if time.time() - meta["created"] > self.ttl_seconds:
+                raise UploadSessionNotFound(upload_id)
+            before = json.dumps(meta, sort_keys=True)
+            yield meta
+            if json.dumps(meta, sort_keys=True) != before:
+                tmp_path = meta_path + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as fh:
+                    json.dump(meta, fh)
+                os.replace(tmp_path, meta_path)
+
+    def create(self, test_id: int, filename: str, size: int, content_type: str) -> dict:
+        """Start a session and pre-size its part file."""
+        self.purge_expired()
+        upload_id = uuid.uuid4().hex
+        session_dir = os.path.join(self.directory, upload_id)
+        os.makedirs(session_dir)
+        with open(os.path.join(session_dir, "data.part"), "wb") as fh:
+            fh.truncate(size)  # sparse; chunks land at their offsets
+        meta = {
+            "upload_id": upload_id,
+            "test_id": test_id,
+            "filename": filename,
+            "content_type": content_type,
+            "size": size,
+            "received": [],
+            "created": time.time(),
+        }
+        with open(os.path.join(session_dir, "meta.json"), "w", encoding="utf-8") as fh:
+            json.dump(meta, fh)
+        logger.info(f"Created upload session {upload_id} for {filename} ({size} bytes, test {test_id})")
+        return self.describe(meta)
+
+    def get(self, upload_id: str) -> dict:
+        with self._locked(upload_id) as meta:
+            return self.describe(meta)
+
+    def write_chunk(self, upload_id: str, offset: int, chunks: Iterable[bytes]) -> dict:
+        """
+        Write a chunk at ``offset`` and record the range as received.
+
+        ``chunks`` is consumed lazily, so a request body can be passed
+        through without being buffered. Re-sending a range overwrites it
+        with the same bytes, which makes chunk PUTs idempotent.
+        """
+        size = self.get(upload_id)["size"]
+        if offset < 0 or offset >= size:
+            raise ValueError(f"Offset {offset} outside file of {size} bytes")
+
+        written = 0
+        with open(self.data_path(upload_id), "r+b") as fh:
+            fh.seek(offset)
+            for chunk in chunks:
+                if offset + written + len(chunk) > size:
+                    raise ChunkTooLarge(f"Chunk at offset {offset} extends past the declared size of {size} bytes")
+                fh.write(chunk)
+                written += len(chunk)
+
+        with self._locked(upload_id) as meta:
+            if written:
+                meta["received"] = merge_ranges(
+                    [tuple(r) for r in meta["received"]] + [(offset, offset + written)]
+                )
+            return self.describe(meta)
+
+    def delete(self, upload_id: str) -> None:
+        shutil.rmtree(self._dir(upload_id), ignore_errors=True)
+
+    def purge_expired(self) -> int:
+        """Remove sessions older than the TTL; returns how many were removed."""
+        removed = 0
+        cutoff = time.time() - self.ttl_seconds
+        for entry in os.scandir(self.directory):
+            if not entry.is_dir():
+                continue
+            with contextlib.suppress(OSError, ValueError, KeyError):
+                with open(os.path.join(entry.path, "meta.json"), "r", encoding="utf-8") as fh:
+                    created = json.load(fh)["created"]
+                if created < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    removed += 1
+        return removed
+
+    def describe(self, meta: dict) -> dict:
+        """Public view of a session (what UploadSessionResponse serializes)."""
+        received = meta["received"]
+        missing = missing_ranges(received, meta["size"])
+        return {
+            "upload_id": meta["upload_id"],
+            "test_id": meta["test_id"],
+            "filename": meta["filename"],
+            "content_type": meta["content_type"],
+            "size": meta["size"],
+            "received_bytes": sum(end - start for start, end in received),
+            "missing": missing,
+            "complete": not missing,
+            "chunk_size": DEFAULT_CHUNK_SIZE,
+            "expires_at": datetime.fromtimestamp(meta["created"] + self.ttl_seconds, tz=timezone.utc),
+        }
+
+
+upload_sessions = UploadSessionStore.from_env()
@@ -0,0 +1,178 @@
+"""
+Image worker pool.
+
+Decoding, resizing and re-encoding photos is CPU bound and holds the GIL, so
+running it inside an ``async def`` stalls every other request on the uvicorn
+worker. ImageWorkerPool pushes those jobs into a ProcessPoolExecutor and
+awaits the result, keeping the event loop free. Workers are started with
+forkserver (spawn where that is unavailable), never fork.
+
+Only bytes (and small picklable results) cross the process boundary: jobs
+must be module-level functions from ``processing.py`` that never touch the
+database or storage clients.
+
+Configuration (environment variables):
+    IMAGE_WORKERS       number of worker processes (default: CPU count).
+                        ``0`` runs jobs in a thread instead, which is handy
+                        for tests and single-core dev boxes.
+    IMAGE_QUEUE_DEPTH   max jobs queued or running before new ones are
+                        rejected with ImagePoolBusyError (default: 4 x workers)
+    IMAGE_JOB_TIMEOUT   seconds to wait for a single job (default: 30)
+
+Concurrent decodes are further capped by the decode memory budget
+(``IMAGE_DECODE_BUDGET_MB``, see processing.DecodeBudget), shared by all
+worker processes of the pool.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from .processing import DECODE_BUDGET_MB, install_decode_budget
+
+logger = logging.getLogger("backend_photos_workers")
+
+
+class ImagePoolBusyError(Exception):
+    """Raised when the pool queue is full and a job cannot be accepted."""
+
+
+class ImageJobTimeoutError(Exception):
+    """Raised when a job does not finish within the configured timeout."""
+
+
+class ImageWorkerPool:
+    """Bounded, process-backed executor for image jobs with basic metrics."""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        job_timeout: Optional[float] = None,
+    ):
+        if max_workers is None:
+            max_workers = int(os.getenv("IMAGE_WORKERS", os.cpu_count() or 1))
+        if max_queue is None:
+            max_queue = int(os.getenv("IMAGE_QUEUE_DEPTH", max(max_workers, 1) * 4))
+        if job_timeout is None:
+            job_timeout = float(os.getenv("IMAGE_JOB_TIMEOUT", "30"))
+
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.job_timeout = job_timeout
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self._metrics = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "timed_out": 0,
+            "peak_pending": 0,
+            "total_seconds": 0.0,
+        }
+
+    def _get_executor(self) -> Optional[ProcessPoolExecutor]:
+        """Create the process pool on first use (None in inline mode)."""
+        if self.max_workers <= 0:
+            return None
+        if self._executor is None:
+            # Never fork: the server process already runs storage and anyio
+            # threads, and a lock held by one of them would deadlock the child
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            ctx = multiprocessing.get_context(method)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=ctx,
+                initializer=install_decode_budget,
+                initargs=(ctx.BoundedSemaphore(DECODE_BUDGET_MB), ctx.Lock(), DECODE_BUDGET_MB),
+            )
+            logger.info(f"Started image worker pool with {self.max_workers} process(es)")
+        return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run ``fn(*args)`` in the pool and return its result.
+
+        Exceptions raised by the job (e.g. ValueError from validation) are
+        re-raised unchanged. A timed out job keeps running in its worker
+        process until it finishes; only the caller stops waiting, and the
+        job keeps its queue slot until then so slow images cannot push the
+        pool past ``max_queue`` (and the decode memory it stands for).
+        """
+        if self._pending >= self.max_queue:
+            self._metrics["rejected"] += 1
+            raise ImagePoolBusyError(
+                f"Image worker pool is busy ({self._pending} jobs pending, max {self.max_queue})"
+            )
+
+        executor = self._get_executor()
+        if executor is None:
+            job = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+        else:
+            job = asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        self._pending += 1
+        self._metrics["submitted"] += 1
+        self._metrics["peak_pending"] = max(self._metrics["peak_pending"], self._pending)
+        job.add_done_callback(self._release)
+        started = time.perf_counter()
+
+        try:
+            # shield: a timeout must not mark the job done while it still runs
+            result = await asyncio.wait_for(asyncio.shield(job), timeout=self.job_timeout)
+        except asyncio.TimeoutError:
+            self._metrics["timed_out"] += 1
+            raise ImageJobTimeoutError(f"Image job timed out after {self.job_timeout}s")
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); start a fresh pool on next use
+            self._metrics["failed"] += 1
+            logger.error("Image worker pool broke, it will be recreated")
+            if self._executor is executor:
+                # Release the dead pool's remaining processes and queues
+                self._executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        except Exception:
+            self._metrics["failed"] += 1
+            raise
+        else:
+            self._metrics["completed"] += 1
+            return result
+        finally:
+            self._metrics["total_seconds"] += time.perf_counter() - started
+
+    def _release(self, job: asyncio.Future) -> None:
+        """Free the queue slot once the job has really finished."""
+        self._pending -= 1
+        if not job.cancelled():
+            # Retrieved here so abandoned (timed out) jobs do not log
+            # "exception was never retrieved"
+            job.exception()
+
+    def stats(self) -> dict:
+        """Snapshot of pool configuration and counters."""
+        finished = self._metrics["completed"] + self._metrics["failed"] + self._metrics["timed_out"]
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "job_timeout": self.job_timeout,
+            "decode_budget_mb": DECODE_BUDGET_MB,
+            "pending": self._pending,
+            **self._metrics,
+            "avg_seconds": self._metrics["total_seconds"] / finished if finished else 0.0,
+        }
+
+    def shutdown(self, wait: bool = True):
+        """Stop worker processes. Called from the application lifespan."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
+            logger.info("Image worker pool shut down")
+
+
+image_pool = ImageWorkerPool()
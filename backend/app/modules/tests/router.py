@@ -1,15 +1,16 @@
-from fastapi import APIRouter, HTTPException, Depends, status, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, status, UploadFile, File, Form
 from typing import List, Optional
 from datetime import datetime
 import logging
 
-from .schemas import TestCreate, TestResponse
+from .schemas import TestCreate, TestResponse, TestSummaryPage
 from .service import tests_service
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.modules.photos.service import photo_service
 from app.modules.photos.schemas import PhotoResponse
-from app.modules.audit.service import log_action
+from app.modules.audit.service import log_action, log_actions
+from app.http_cache import is_not_modified, make_etag, not_modified_response
 
 logger = logging.getLogger("backend_tests_router")
 
@@ -86,19 +87,30 @@ async def create_test(
 
         uploaded_photos = []
         failed_photos = []
+        audit_entries = []
 
         if photos:
-            for photo_file in photos:
-                try:
-                    if not photo_file.content_type or not photo_file.content_type.startswith(
-                        "image/"
-                    ):
-                        failed_photos.append(
-                            {"filename": photo_file.filename, "error": "Not an image file"}
-                        )
-
-                        log_action(
-                            db,
+            image_indexes = [
+                index for index, photo_file in enumerate(photos)
+                if photo_file.content_type and photo_file.content_type.startswith("image/")
+            ]
+            # Decode/encode/store runs concurrently; rows land in one transaction
+            results = await photo_service.upload_photos(
+                db,
+                [(photos[index].file, photos[index].filename) for index in image_indexes],
+                test_id=test.id,
+            )
+            outcomes = dict(zip(image_indexes, results))
+
+            for index, photo_file in enumerate(photos):
+                result = outcomes.get(index)
+
+                if result is None:
+                    failed_photos.append(
+                        {"filename": photo_file.filename, "error": "Not an image file"}
+                    )
+                    audit_entries.append(
+                        dict(
                             action="UPLOAD_FAILED",
                             entity_type="Photo",
                             entity_id=0,
@@ -110,57 +122,54 @@ async def create_test(
                                 "test_id": test.id,
                             },
                         )
-                        continue
-
-                    photo = await photo_service.upload_photo(
-                        db=db,
-                        file=photo_file.file,
-                        filename=photo_file.filename,
-                        test_id=test.id,
-                    )
-                    uploaded_photos.append(PhotoResponse.model_validate(photo))
-                    logger.info(
-                        f"Uploaded photo {photo_file.filename} for test {test.id}"
-                    )
-
-                    log_action(
-                        db,
-                        action="UPLOAD",
-                        entity_type="Photo",
-                        entity_id=photo.id,
-                        username=username,
-                        meta={
-                            "filename": photo_file.filename,
-                            "content_type": photo_file.content_type,
-                            "test_id": test.id,
-                            "file_path": getattr(photo, "file_path", None),
-                            "source": "tests.create_test",
-                        },
                     )
 
-                except Exception as photo_error:
+                elif isinstance(result, BaseException):
                     logger.error(
-                        f"Failed to upload {photo_file.filename}: {str(photo_error)}"
+                        f"Failed to upload {photo_file.filename}: {str(result)}"
                     )
                     failed_photos.append(
-                        {"filename": photo_file.filename, "error": str(photo_error)}
+                        {"filename": photo_file.filename, "error": str(result)}
+                    )
+                    audit_entries.append(
+                        dict(
+                            action="UPLOAD_FAILED",
+                            entity_type="Photo",
+                            entity_id=0,
+                            username=username,
+                            meta={
+                                "reason": "server_error",
+                                "filename": photo_file.filename,
+                                "test_id": test.id,
+                                "error": str(result),
+                                "source": "tests.create_test",
+                            },
+                        )
                     )
 
-                    log_action(
-                        db,
-                        action="UPLOAD_FAILED",
-                        entity_type="Photo",
-                        entity_id=0,
-                        username=username,
-                        meta={
-                            "reason": "server_error",
-                            "filename": photo_file.filename,
-                            "test_id": test.id,
-                            "error": str(photo_error),
-                            "source": "tests.create_test",
-                        },
+                else:
+                    uploaded_photos.append(PhotoResponse.model_validate(result))
+                    logger.info(
+                        f"Uploaded photo {photo_file.filename} for test {test.id}"
+                    )
+                    audit_entries.append(
+                        dict(
+                            action="UPLOAD",
+                            entity_type="Photo",
+                            entity_id=result.id,
+                            username=username,
+                            meta={
+                                "filename": photo_file.filename,
+                                "content_type": photo_file.content_type,
+                                "test_id": test.id,
+                                "file_path": result.file_path,
+                                "source": "tests.create_test",
+                            },
+                        )
                     )
 
+            log_actions(db, audit_entries)
+
         return {
             "test": TestResponse.model_validate(test),
             "photos": uploaded_photos,
@@ -194,20 +203,110 @@ async def create_test(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/summary", response_model=TestSummaryPage)
+async def list_test_summaries(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    sort: str = Query("id", description="id, created_at or deadline_at; prefix with - for descending"),
+    test_status: Optional[str] = Query(None, alias="status"),
+    test_type: Optional[str] = Query(None),
+    product_id: Optional[int] = Query(None),
+    assigned_to: Optional[str] = Query(None),
+    deadline_after: Optional[datetime] = Query(None, description="Deadline at or after (inclusive)"),
+    deadline_before: Optional[datetime] = Query(None, description="Deadline before (exclusive)"),
+    test_ids: Optional[str] = Query(None, description="Only these tests, comma-separated, e.g. 1,2,3"),
+    db: Session = Depends(get_db),
+):
+    """Photo counts, defect counts by severity and latest activity for a page of tests."""
+    ids = None
+    if test_ids is not None:
+        try:
+            ids = [int(v) for v in test_ids.split(",") if v.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="test_ids must be comma-separated integers")
+    try:
+        items, next_cursor = await tests_service.get_summaries(
+            db,
+            limit=limit,
+            cursor=cursor,
+            sort=sort,
+            status=test_status,
+            test_type=test_type,
+            product_id=product_id,
+            assigned_to=assigned_to,
+            deadline_after=deadline_after,
+            deadline_before=deadline_before,
+            test_ids=ids,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"items": items, "limit": limit, "next_cursor": next_cursor}
+
+
 @router.get("/{test_id}", response_model=TestResponse)
-async def get_test(test_id: int, db: Session = Depends(get_db)):
-    """Retrieve a specific quality test by ID."""
+async def get_test(test_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    """Retrieve a specific quality test by ID.
+
+    Sends an ETag derived from ``updated_at``; a matching If-None-Match
+    gets 304 instead of the serialized test.
+    """
 
     test = await tests_service.get_test(db, test_id)
     if not test:
         raise HTTPException(status_code=404, detail="Test not found")
+
+    etag = make_etag("test", test.id, test.updated_at.isoformat())
+    if is_not_modified(request, etag):
+        return not_modified_response(etag, {"Cache-Control": "no-cache"})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
     return test
 
 
 @router.get("/", response_model=List[TestResponse])
-async def list_tests(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """List all quality tests with pagination."""
-    return await tests_service.get_all_tests(db, skip=skip, limit=limit)
+async def list_tests(
+    response: Response,
+    skip: int = Query(0, ge=0, description="Deprecated offset; prefer cursor"),
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    sort: str = Query("id", description="id, created_at or deadline_at; prefix with - for descending"),
+    test_status: Optional[str] = Query(None, alias="status"),
+    test_type: Optional[str] = Query(None),
+    product_id: Optional[int] = Query(None),
+    assigned_to: Optional[str] = Query(None),
+    deadline_after: Optional[datetime] = Query(None, description="Deadline at or after (inclusive)"),
+    deadline_before: Optional[datetime] = Query(None, description="Deadline before (exclusive)"),
+    q: Optional[str] = Query(None, description="Words that must all appear in id, product, type, requester, assignee or status"),
+    db: Session = Depends(get_db),
+):
+    """List quality tests, keyset-paginated.
+
+    The body stays a plain list; the cursor of the next page is sent in
+    the ``X-Next-Cursor`` header (absent on the last page).
+    """
+    if cursor and skip:
+        # The cursor already marks the position; an offset on top would skip rows
+        raise HTTPException(status_code=422, detail="skip cannot be combined with cursor")
+    try:
+        tests, next_cursor = await tests_service.get_all_tests(
+            db,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+            sort=sort,
+            status=test_status,
+            test_type=test_type,
+            product_id=product_id,
+            assigned_to=assigned_to,
+            deadline_after=deadline_after,
+            deadline_before=deadline_before,
+            search=q,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return tests
 
 
 @router.patch("/{test_id}", response_model=TestResponse)
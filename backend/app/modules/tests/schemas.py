@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 
 
 class TestCreate(BaseModel):
@@ -28,3 +28,19 @@ class TestResponse(BaseModel):
     
 
 
+
+
+class TestSummary(BaseModel):
+    """A test with its photo and defect aggregates."""
+    test: TestResponse
+    photo_count: int
+    defect_count: int
+    defects_by_severity: Dict[str, int] = Field(..., description="Defect count per severity, every severity present")
+    annotation_count: int
+    last_activity_at: datetime = Field(..., description="Latest of the test's update, photo, defect and annotation times")
+
+
+class TestSummaryPage(BaseModel):
+    items: List[TestSummary]
+    limit: int
+    next_cursor: Optional[str] = Field(None, description="Pass as ?cursor= for the next page; null on the last page")
@@ -1,16 +1,28 @@
 import logging
-from typing import List, Optional
-from datetime import datetime
+from typing import List, Optional, Tuple
+from datetime import datetime, timezone
 
 from .schemas import TestCreate, TestResponse
+from sqlalchemy import String, and_, case, cast, func, or_
 from sqlalchemy.orm import Session  
 from .models import Tests
+from app.modules.defects.models import DEFECT_SEVERITIES, Defect, DefectAnnotation
 from app.modules.photos.models import Photo
 from app.modules.photos.storage import photo_storage
+from app.modules.photos.service import photo_service
+from app.pagination import keyset_page
 
 
 logger = logging.getLogger("backend_tests_service")
 
+# Sort keys of the tests list; each is paired with id to make it unique and
+# follows an index (primary key, idx_quality_tests_created, _deadline).
+SORT_COLUMNS = {
+    "id": Tests.id,
+    "created_at": Tests.created_at,
+    "deadline_at": Tests.deadline_at,
+}
+
 
 class TestsService:
     """
@@ -39,9 +51,94 @@ class TestsService:
         """Get a single test by ID."""
         return db.query(Tests).filter(Tests.id == test_id).first()
     
-    async def get_all_tests(self, db: Session, skip: int = 0, limit: int = 100) -> List[Tests]:
-        """Get all tests with pagination."""
-        return db.query(Tests).offset(skip).limit(limit).all()
+    async def get_all_tests(
+        self,
+        db: Session,
+        skip: int = 0,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        sort: str = "id",
+        status: Optional[str] = None,
+        test_type: Optional[str] = None,
+        product_id: Optional[int] = None,
+        assigned_to: Optional[str] = None,
+        deadline_after: Optional[datetime] = None,
+        deadline_before: Optional[datetime] = None,
+        search: Optional[str] = None,
+    ) -> Tuple[List[Tests], Optional[str]]:
+        """
+        One page of tests and the cursor of the next page (None on the last).
+
+        ``sort`` is a key of SORT_COLUMNS, prefixed with ``-`` for descending
+        order; ties are broken by id. ``search`` keeps tests matching every
+        whitespace-separated word (see _filter_tests). Raises ValueError for
+        an unknown sort key or a bad cursor.
+        """
+        query = _filter_tests(
+            db.query(Tests),
+            status=status,
+            test_type=test_type,
+            product_id=product_id,
+            assigned_to=assigned_to,
+            deadline_after=deadline_after,
+            deadline_before=deadline_before,
+            search=search,
+        )
+        return _sorted_page(query, sort, cursor, limit, key=lambda test: test, offset=skip)
+
+    async def get_summaries(
+        self,
+        db: Session,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        sort: str = "id",
+        **filters,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        One page of tests with their photo and defect aggregates.
+
+        Tests, photos, defects and annotations are joined and grouped per
+        test in a single query; the page is cut by the same keyset as
+        get_all_tests, with the same ``sort`` and filters. Only ready
+        photos (and their defects) are counted. Counts are DISTINCT because
+        each defect row repeats once per annotation.
+        """
+        severity_counts = [
+            func.count(func.distinct(case((Defect.severity == severity, Defect.id))))
+            for severity in DEFECT_SEVERITIES
+        ]
+        query = (
+            db.query(
+                Tests,
+                func.count(func.distinct(Photo.id)),
+                func.count(func.distinct(Defect.id)),
+                func.count(func.distinct(DefectAnnotation.id)),
+                func.max(Photo.time_stamp),
+                func.max(Defect.created_at),
+                func.max(DefectAnnotation.created_at),
+                *severity_counts,
+            )
+            .outerjoin(Photo, and_(Photo.test_id == Tests.id, Photo.status == "ready"))
+            .outerjoin(Defect, Defect.photo_id == Photo.id)
+            .outerjoin(DefectAnnotation, DefectAnnotation.defect_id == Defect.id)
+            .group_by(Tests.id)
+        )
+        query = _filter_tests(query, **filters)
+        rows, next_cursor = _sorted_page(query, sort, cursor, limit, key=lambda row: row[0])
+
+        summaries = []
+        for test, photos, defects, annotations, *rest in rows:
+            latest, by_severity = rest[:3], rest[3:]
+            activity = [_aware(t) for t in (test.updated_at, *latest) if t is not None]
+            summaries.append({
+                "test": test,
+                "photo_count": photos,
+                "defect_count": defects,
+                "defects_by_severity": dict(zip(DEFECT_SEVERITIES, by_severity)),
+                "annotation_count": annotations,
+                "last_activity_at": max(activity),
+            })
+        return summaries, next_cursor
     
     async def update_test(self, db: Session, test_id: int, test_data: dict) -> Tests:
         """Update a test's properties."""
@@ -68,12 +165,20 @@ class TestsService:
             raise ValueError("Test not found")
         
         photos = db.query(Photo).filter(Photo.test_id == test_id).all()
-        for photo in photos:
+        
+        # Objects are content-addressed: skip paths still used by other tests
+        file_paths = list(dict.fromkeys(photo.file_path for photo in photos))
+        await photo_service.lock_content(db, file_paths)
+        shared = photo_service.shared_file_paths(db, file_paths, exclude_test_id=test_id)
+        for file_path in file_paths:
+            if file_path in shared:
+                logger.info(f"Keeping shared photo object in MinIO: {file_path}")
+                continue
             try:
-                await photo_storage.delete_photo(photo.file_path)
-                logger.info(f"Deleted photo from MinIO: {photo.file_path}")
+                await photo_storage.delete_photo(file_path)
+                logger.info(f"Deleted photo from MinIO: {file_path}")
             except Exception as e:
-                logger.error(f"Failed to delete photo from MinIO: {photo.file_path}, Error: {str(e)}")
+                logger.error(f"Failed to delete photo from MinIO: {file_path}, Error: {str(e)}")
         
         db.query(Photo).filter(Photo.test_id == test_id).delete()
         
@@ -83,4 +188,62 @@ class TestsService:
         logger.info(f"Deleted test {test_id} with {len(photos)} photo(s)")
 
 
+def _filter_tests(
+    query,
+    status: Optional[str] = None,
+    test_type: Optional[str] = None,
+    product_id: Optional[int] = None,
+    assigned_to: Optional[str] = None,
+    deadline_after: Optional[datetime] = None,
+    deadline_before: Optional[datetime] = None,
+    test_ids: Optional[List[int]] = None,
+    search: Optional[str] = None,
+):
+    if search:
+        # Every word must appear (case-insensitively) in one of the columns
+        columns = [cast(Tests.id, String), cast(Tests.product_id, String), Tests.test_type,
+                   Tests.requester, Tests.assigned_to, Tests.status]
+        for word in search.lower().split():
+            query = query.filter(or_(*(func.lower(column).contains(word, autoescape=True) for column in columns)))
+    if test_ids is not None:
+        query = query.filter(Tests.id.in_(test_ids))
+    if status is not None:
+        query = query.filter(Tests.status == status)
+    if test_type is not None:
+        query = query.filter(Tests.test_type == test_type)
+    if product_id is not None:
+        query = query.filter(Tests.product_id == product_id)
+    if assigned_to is not None:
+        query = query.filter(Tests.assigned_to == assigned_to)
+    if deadline_after is not None:
+        query = query.filter(Tests.deadline_at >= deadline_after)
+    if deadline_before is not None:
+        query = query.filter(Tests.deadline_at < deadline_before)
+    return query
+
+
+def _sorted_page(query, sort: str, cursor: Optional[str], limit: int, key, offset: int = 0):
+    """Keyset page of a query over Tests; ``key`` maps a row to its Tests."""
+    descending = sort.startswith("-")
+    field = sort.lstrip("-")
+    if field not in SORT_COLUMNS:
+        raise ValueError(f"Invalid sort: {sort}")
+    columns = (Tests.id,) if field == "id" else (SORT_COLUMNS[field], Tests.id)
+    return keyset_page(
+        query,
+        columns,
+        cursor,
+        limit,
+        key=lambda row: [getattr(key(row), c.key) for c in columns],
+        descending=descending,
+        nullable=field == "deadline_at",
+        offset=offset,
+    )
+
+
+def _aware(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes; they are stored in UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
 tests_service = TestsService()
\ No newline at end of file
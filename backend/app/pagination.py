@@ -0,0 +1,99 @@
+"""
+Opaque cursors for keyset (seek) pagination shared by the routers.
+
+A cursor holds the sort key of the last row of a page; the next page is
+``WHERE (key...) > (cursor...)`` on an index, so every page costs the same
+no matter how deep the client has scrolled (unlike OFFSET, which reads and
+discards all earlier rows).
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, or_, tuple_
+
+
+def encode_cursor(*values: Any) -> str:
+    """Encode a sort key (ints, strings, datetimes) as a URL-safe token."""
+    payload = [
+        {"dt": v.isoformat()} if isinstance(v, datetime) else v
+        for v in values
+    ]
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """Decode a cursor made by encode_cursor; raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = [
+            datetime.fromisoformat(v["dt"]) if isinstance(v, dict) else v
+            for v in payload
+        ]
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError(f"Invalid cursor: {str(e)}")
+    if len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def keyset_page(
+    query,
+    columns: Sequence,
+    cursor: Optional[str],
+    limit: int,
+    key: Callable[[Any], Sequence[Any]],
+    descending: bool = False,
+    nullable: bool = False,
+    offset: int = 0,
+) -> Tuple[list, Optional[str]]:
+    """
+    Fetch one page of ``query`` ordered by ``columns`` (unique together).
+
+    ``key`` extracts the values of ``columns`` from a result row so the
+    cursor of the next page can be built. One extra row is fetched to tell
+    whether there is a next page; ``next_cursor`` is None on the last one.
+
+    With ``nullable`` the first column may be NULL (the rest must not be);
+    NULLs sort after every value, as in a PostgreSQL index, so descending
+    pages start with them. ``offset`` only serves callers that still page
+    by ``skip`` (never together with a cursor); it costs what OFFSET always
+    costs.
+    """
+    if cursor:
+        values = decode_cursor(cursor, len(columns))
+        query = query.filter(_after(columns, values, descending, nullable))
+    if nullable:
+        first = columns[0].desc().nulls_first() if descending else columns[0].asc().nulls_last()
+        rest = columns[1:]
+        order = [first] + ([c.desc() for c in rest] if descending else list(rest))
+    else:
+        order = [c.desc() for c in columns] if descending else list(columns)
+    rows = query.order_by(*order).offset(offset).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
+
+
+def _after(columns: Sequence, values: Sequence, descending: bool, nullable: bool):
+    """Condition for rows that come after the sort key ``values``."""
+    if descending:
+        def beyond(cols, vals):
+            return tuple_(*cols) < tuple(vals)
+    else:
+        def beyond(cols, vals):
+            return tuple_(*cols) > tuple(vals)
+
+    if not nullable:
+        return beyond(columns, values)
+    first, rest = columns[0], columns[1:]
+    if values[0] is None:
+        # Inside the NULL block: order continues on the remaining columns
+        in_nulls = and_(first.is_(None), beyond(rest, values[1:]))
+        return or_(in_nulls, first.isnot(None)) if descending else in_nulls
+    # Comparisons with NULL are never true, so NULL rows need their own branch
+    return beyond(columns, values) if descending else or_(beyond(columns, values), first.is_(None))
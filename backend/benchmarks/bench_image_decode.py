@@ -0,0 +1,87 @@
+"""
+Benchmark: full-resolution decode vs. reduced DCT decode for upload resizing.
+
+For each typical camera resolution a JPEG is synthesised once, then resized
+to the 2000px upload limit in two ways:
+
+    full    Image.open -> resize(LANCZOS)          (the previous pipeline)
+    draft   processing.process_image               (draft() + reducing_gap)
+
+Reported memory is the size of the decoded pixel buffer (width x height x
+bands of the frame libjpeg actually produced), which dominates the peak of
+a worker; Pillow allocates it outside the Python heap, so tracemalloc
+cannot see it.
+
+Usage (from backend/):
+    python -m benchmarks.bench_image_decode [--repeat 3]
+
+Importing ``app.modules.photos`` initialises the database engine, so run it
+inside the backend container or with DATABASE_URL=sqlite:// locally.
+"""
+import argparse
+import time
+from io import BytesIO
+
+from PIL import Image, ImageDraw
+
+from app.modules.photos.processing import MAX_OUTPUT_DIMENSION, process_image
+
+RESOLUTIONS = {
+    "12MP (4000x3000)": (4000, 3000),
+    "24MP (6000x4000)": (6000, 4000),
+    "45MP (8192x5464)": (8192, 5464),
+}
+
+
+def _make_jpeg(size) -> bytes:
+    """Synthetic frame with some structure so the encoder is not trivial."""
+    img = Image.new("RGB", size, (90, 110, 130))
+    draw = ImageDraw.Draw(img)
+    step = max(size) // 40
+    for x in range(0, size[0], step):
+        draw.line([(x, 0), (size[0] - x, size[1])], fill=(200, 60, 40), width=5)
+    buf = BytesIO()
+    img.save(buf, format="JPEG", quality=92)
+    return buf.getvalue()
+
+
+def _resize_full(data: bytes):
+    img = Image.open(BytesIO(data))
+    width, height = img.size
+    ratio = min(MAX_OUTPUT_DIMENSION / width, MAX_OUTPUT_DIMENSION / height)
+    img.resize((int(width * ratio), int(height * ratio)), Image.Resampling.LANCZOS)
+    return img
+
+
+def _resize_draft(data: bytes):
+    img = Image.open(BytesIO(data))
+    process_image(img)
+    return img
+
+
+def run_case(mode: str, data: bytes):
+    """Return elapsed seconds and decoded buffer size in bytes."""
+    fn = _resize_full if mode == "full" else _resize_draft
+    start = time.perf_counter()
+    decoded = fn(data)
+    elapsed = time.perf_counter() - start
+    return elapsed, decoded.size[0] * decoded.size[1] * len(decoded.getbands())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case (best time is reported)")
+    args = parser.parse_args()
+
+    print(f"{'resolution':<20} {'mode':<6} {'time ms':>9} {'decoded MiB':>12}")
+    for label, size in RESOLUTIONS.items():
+        data = _make_jpeg(size)
+        for mode in ("full", "draft"):
+            runs = [run_case(mode, data) for _ in range(args.repeat)]
+            best = min(elapsed for elapsed, _ in runs) * 1000
+            decoded = runs[0][1] / (1024 * 1024)
+            print(f"{label:<20} {mode:<6} {best:>9.1f} {decoded:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
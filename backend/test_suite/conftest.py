@@ -2,9 +2,9 @@
 Shared fixtures for the QC-Vision backend test suite.
 
 Bootstrap order  (runs at import time, BEFORE any app code loads):
-  1. Stub the ``minio`` package – PhotoStorage() is instantiated at module
-     import time and its __init__ calls Minio(); this prevents a real
-     network connection.
+  1. Select the ``filesystem`` storage backend rooted in a throwaway temp
+     directory – PhotoStorage() is instantiated at module import time, and
+     this keeps it (and the ``minio`` package) out of the picture entirely.
   2. Replace ``sqlalchemy.dialects.postgresql.JSONB`` with the cross-database
      ``sqlalchemy.JSON`` type so that Base.metadata.create_all() works on an
      in-memory SQLite database.
@@ -13,7 +13,8 @@ Fixtures
 --------
 db_session           – fresh, isolated SQLAlchemy session backed by in-memory SQLite.
 mock_photo_storage   – replaces every live reference to PhotoStorage with
-                       controllable AsyncMock methods (upload / get / delete).
+                       controllable AsyncMock methods (upload / exists / get / stat /
+                       stream / delete).
 client               – FastAPI TestClient wired to the same db_session;
                        lifespan create_tables() is suppressed.
 """
@@ -21,27 +22,18 @@ client               – FastAPI TestClient wired to the same db_session;
 from __future__ import annotations
 
 import sys
+from datetime import datetime, timezone
 from unittest.mock import AsyncMock, MagicMock
 
 # ---------------------------------------------------------------------------
-# 1.  Stub ``minio`` – must run before any app import
+# 1.  Filesystem storage backend – must run before any app import
 # ---------------------------------------------------------------------------
-_minio_instance = MagicMock()
-_minio_instance.bucket_exists.return_value = True  # skip bucket-creation branch
-
-_minio_mod = MagicMock()
-_minio_mod.Minio = MagicMock(return_value=_minio_instance)
-
-
-class _FakeS3Error(Exception):
-    pass
-
-
-_minio_mod.error = MagicMock()
-_minio_mod.error.S3Error = _FakeS3Error
+import os as _os  # noqa: E402
+import tempfile as _tempfile  # noqa: E402
 
-sys.modules["minio"] = _minio_mod
-sys.modules["minio.error"] = _minio_mod.error
+_os.environ.setdefault("STORAGE_BACKEND", "filesystem")
+_os.environ.setdefault("STORAGE_FS_ROOT", _tempfile.mkdtemp(prefix="qc-vision-test-storage-"))
+_os.environ.setdefault("PHOTO_UPLOAD_DIR", _tempfile.mkdtemp(prefix="qc-vision-test-uploads-"))
 
 # ---------------------------------------------------------------------------
 # 2.  JSONB  →  JSON – must run before defects model is imported
@@ -55,10 +47,15 @@ _pg.JSONB = _JSON  # type: ignore[attr-defined]
 # 2b. Point DATABASE_URL at SQLite so that database.py's module-level
 #     create_engine() does NOT try to connect to PostgreSQL / load psycopg2.
 # ---------------------------------------------------------------------------
-import os as _os  # noqa: E402
-
 _os.environ.setdefault("DATABASE_URL", "sqlite://")
 
+# Run image jobs inline (in a thread) instead of forking worker processes
+# for every test; the process pool itself is covered in test_image_workers.
+_os.environ.setdefault("IMAGE_WORKERS", "0")
+
+# No background job consumers: tests drive the queue with run_once()
+_os.environ.setdefault("PHOTO_JOB_CONSUMERS", "0")
+
 # ---------------------------------------------------------------------------
 # 3.  App imports – now safe
 # ---------------------------------------------------------------------------
@@ -117,13 +114,38 @@ def mock_photo_storage(monkeypatch):
     Replaces every live reference to PhotoStorage with a single MagicMock.
     Async methods are wrapped in AsyncMock so they can be ``await``-ed.
     """
+    from app.modules.photos.storage import ObjectInfo
+
+    fake_bytes = b"\xff\xd8\xff\xe0fake-jpeg-data"
+
+    async def _stream(file_path, offset=0, length=None, **_kwargs):
+        end = offset + length if length else len(fake_bytes)
+        return iter([fake_bytes[offset:end]])
+
     mock = MagicMock()
+    mock.fake_bytes = fake_bytes
     mock.upload_photo = AsyncMock(return_value="photos/20250101/test-uuid.jpg")
-    mock.get_photo = AsyncMock(return_value=b"\xff\xd8\xff\xe0fake-jpeg-data")
+    mock.get_photo = AsyncMock(return_value=fake_bytes)
+    mock.photo_exists = AsyncMock(return_value=False)
+    mock.stat_photo = AsyncMock(
+        return_value=ObjectInfo(
+            size=len(fake_bytes),
+            etag='"fake-etag"',
+            last_modified=datetime(2025, 1, 1, tzinfo=timezone.utc),
+            content_type="image/jpeg",
+        )
+    )
+    mock.stream_photo = AsyncMock(side_effect=_stream)
+    mock.stat_local_file = AsyncMock(side_effect=lambda path: _os.stat(path) if _os.path.exists(path) else None)
+    mock.cache = None
+    mock.stats = MagicMock(return_value={"io_threads": 0, "operations": {}})
     mock.delete_photo = AsyncMock(return_value=True)
     mock.generate_presigned_url = MagicMock(
         return_value="http://localhost:9000/qc-vision-photos/photos/20250101/test-uuid.jpg"
     )
+    mock.generate_presigned_put_url = AsyncMock(
+        return_value="http://localhost:9000/qc-vision-photos/staging/test-uuid?X-Amz-Signature=fake"
+    )
 
     # Patch every module that imported photo_storage as a module-level name
     monkeypatch.setattr(_storage_mod, "photo_storage", mock)
@@ -149,6 +149,27 @@ class TestListDefectsRoute:
         assert resp.status_code == 200
         assert len(resp.json()) == 2
 
+    def test_etag_revalidation_tracks_defect_changes(self, client, db_session):
+        _test_id, photo_id, cat_id = _seed(db_session)
+        defect_id = client.post(
+            f"/api/v1/defects/photo/{photo_id}",
+            json={"category_id": cat_id, "severity": "low"},
+        ).json()["id"]
+
+        etag = client.get(f"/api/v1/defects/photo/{photo_id}").headers["etag"]
+
+        # Unchanged list → 304 with empty body
+        resp = client.get(f"/api/v1/defects/photo/{photo_id}", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.content == b""
+
+        # Any defect change bumps the per-photo version
+        client.put(f"/api/v1/defects/{defect_id}", json={"severity": "high"})
+        resp = client.get(f"/api/v1/defects/photo/{photo_id}", headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+        assert resp.headers["etag"] != etag
+        assert resp.json()[0]["severity"] == "high"
+
 
 # ---------------------------------------------------------------------------
 # POST /api/v1/defects/{defect_id}/annotations
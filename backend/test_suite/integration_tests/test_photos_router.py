@@ -8,11 +8,17 @@ wired into the ``client`` fixture.  Upload tests send real JPEG images
 processing run end-to-end.
 """
 
+import asyncio
+import sys
+from datetime import datetime, timedelta, timezone
 from io import BytesIO
 
 from PIL import Image
+from sqlalchemy.orm import sessionmaker
 
+from app.modules.audit.models import AuditLog
 from app.modules.tests.models import Tests
+from app.modules.photos.jobs import PhotoJobQueue
 from app.modules.photos.models import Photo
 
 
@@ -57,7 +63,71 @@ class TestUploadPhotoRoute:
         body = resp.json()
         assert body["test_id"] == test_id
         assert body["file_path"].startswith("photos/")
-        mock_photo_storage.upload_photo.assert_awaited_once()
+        assert body["placeholder"].startswith("data:image/jpeg;base64,")
+
+        # Full image plus thumb and preview derivatives stored side by side
+        stored = [c.args[1] for c in mock_photo_storage.upload_photo.await_args_list]
+        root = body["file_path"][: -len(".jpg")]
+        assert sorted(stored) == sorted(
+            [body["file_path"], f"{root}_preview.jpg", f"{root}_thumb.jpg"]
+        )
+
+    def test_reupload_of_same_content_skips_storage(self, client, db_session, mock_photo_storage):
+        test_id = _seed_test(db_session)
+        mock_photo_storage.photo_exists.side_effect = [False, True]
+
+        first = client.post(
+            f"/api/v1/photos/upload?test_id={test_id}",
+            files={"file": ("a.jpg", _make_jpeg(), "image/jpeg")},
+        ).json()
+        second = client.post(
+            f"/api/v1/photos/upload?test_id={test_id}",
+            files={"file": ("a-retry.jpg", _make_jpeg(), "image/jpeg")},
+        ).json()
+
+        # Same content -> same immutable path, two rows, one set of writes
+        assert first["file_path"] == second["file_path"]
+        assert first["id"] != second["id"]
+        assert mock_photo_storage.upload_photo.await_count == 3
+
+    def test_async_mode_returns_202_and_processes_in_background(self, client, db_session, mock_photo_storage):
+        test_id = _seed_test(db_session)
+        jpeg = _make_jpeg().getvalue()
+
+        resp = client.post(
+            f"/api/v1/photos/upload?test_id={test_id}&mode=async",
+            files={"file": ("sample.jpg", jpeg, "image/jpeg")},
+        )
+        assert resp.status_code == 202
+        body = resp.json()
+        assert body["status"] == "processing"
+        staging_key = body["file_path"]
+        assert staging_key.startswith("staging/")
+
+        job_url = resp.headers["Location"]
+        assert client.get(job_url).json()["status"] == "queued"
+
+        # One consumer step, as the lifespan consumers would run it
+        mock_photo_storage.get_photo.return_value = jpeg
+        queue = PhotoJobQueue(session_factory=sessionmaker(bind=db_session.get_bind()), consumers=0)
+        assert asyncio.run(queue.run_once()) is True
+
+        job = client.get(job_url).json()
+        assert job["status"] == "done" and job["attempts"] == 1
+        db_session.expire_all()
+        photo = db_session.get(Photo, body["id"])
+        assert photo.status == "ready"
+        assert photo.file_path.startswith("photos/")
+        mock_photo_storage.delete_photo.assert_awaited_once_with(staging_key)
+
+    def test_async_mode_still_rejects_invalid_headers(self, client, db_session, mock_photo_storage):
+        resp = client.post(
+            f"/api/v1/photos/upload?test_id={_seed_test(db_session)}&mode=async",
+            files={"file": ("bad.jpg", b"not an image", "image/jpeg")},
+        )
+        assert resp.status_code == 400
+        assert db_session.query(Photo).count() == 0
+        mock_photo_storage.upload_photo.assert_not_awaited()
 
     def test_rejects_non_image_content_type(self, client, db_session):
         test_id = _seed_test(db_session)
@@ -87,6 +157,276 @@ class TestUploadPhotoRoute:
         assert resp.status_code == 400
 
 
+# ---------------------------------------------------------------------------
+# POST /api/v1/photos/batch
+# ---------------------------------------------------------------------------
+
+
+class TestBatchUploadRoute:
+    def test_per_file_results_in_upload_order(self, client, db_session, mock_photo_storage):
+        test_id = _seed_test(db_session)
+
+        resp = client.post(
+            f"/api/v1/photos/batch?test_id={test_id}",
+            files=[
+                ("files", ("front.jpg", _make_jpeg(120, 100), "image/jpeg")),
+                ("files", ("notes.txt", BytesIO(b"hello"), "text/plain")),
+                ("files", ("side.jpg", _make_jpeg(100, 120), "image/jpeg")),
+                ("files", ("bad.jpg", BytesIO(b"garbage"), "image/jpeg")),
+            ],
+        )
+        assert resp.status_code == 201
+
+        body = resp.json()
+        assert (body["uploaded"], body["failed"]) == (2, 2)
+        assert [(r["filename"], r["status"]) for r in body["results"]] == [
+            ("front.jpg", "uploaded"),
+            ("notes.txt", "failed"),
+            ("side.jpg", "uploaded"),
+            ("bad.jpg", "failed"),
+        ]
+        assert body["results"][0]["photo"]["test_id"] == test_id
+        assert "Invalid image" in body["results"][3]["error"]
+
+        assert db_session.query(Photo).filter(Photo.test_id == test_id).count() == 2
+        reasons = sorted(
+            entry.meta.get("reason", "ok")
+            for entry in db_session.query(AuditLog).filter(AuditLog.entity_type == "Photo")
+        )
+        assert reasons == ["invalid_content_type", "ok", "ok", "validation_error"]
+
+    def test_404_for_unknown_test(self, client, mock_photo_storage):
+        resp = client.post(
+            "/api/v1/photos/batch?test_id=9999",
+            files=[("files", ("a.jpg", _make_jpeg(), "image/jpeg"))],
+        )
+        assert resp.status_code == 404
+        mock_photo_storage.upload_photo.assert_not_awaited()
+
+    def test_rejects_too_many_files(self, client, db_session, monkeypatch):
+        # The package re-exports ``router``, shadowing the submodule name
+        monkeypatch.setattr(sys.modules["app.modules.photos.router"], "BATCH_MAX_FILES", 1)
+        test_id = _seed_test(db_session)
+        resp = client.post(
+            f"/api/v1/photos/batch?test_id={test_id}",
+            files=[("files", (f"{i}.jpg", _make_jpeg(), "image/jpeg")) for i in range(2)],
+        )
+        assert resp.status_code == 413
+
+
+# ---------------------------------------------------------------------------
+# Resumable chunked uploads  (/api/v1/photos/uploads/...)
+# ---------------------------------------------------------------------------
+
+
+class TestChunkedUploadRoutes:
+    def _start(self, client, test_id, data: bytes) -> str:
+        resp = client.post(
+            "/api/v1/photos/uploads",
+            json={"test_id": test_id, "filename": "big.jpg", "size": len(data)},
+        )
+        assert resp.status_code == 201
+        return resp.json()["upload_id"]
+
+    def test_resume_sends_only_missing_chunks(self, client, db_session, mock_photo_storage):
+        test_id = _seed_test(db_session)
+        data = _make_jpeg(400, 300).getvalue()
+        upload_id = self._start(client, test_id, data)
+        half = len(data) // 2
+
+        # Second half arrives first; the first chunk is "lost"
+        client.put(f"/api/v1/photos/uploads/{upload_id}?offset={half}", content=data[half:])
+        state = client.get(f"/api/v1/photos/uploads/{upload_id}").json()
+        assert state["missing"] == [[0, half]]
+
+        resp = client.post(f"/api/v1/photos/uploads/{upload_id}/complete")
+        assert resp.status_code == 409
+        assert resp.json()["detail"]["missing"] == [[0, half]]
+
+        state = client.put(f"/api/v1/photos/uploads/{upload_id}?offset=0", content=data[:half]).json()
+        assert state["complete"] is True
+
+        resp = client.post(f"/api/v1/photos/uploads/{upload_id}/complete")
+        assert resp.status_code == 201
+        assert resp.json()["test_id"] == test_id
+        assert mock_photo_storage.upload_photo.await_count == 3
+
+        # Session is consumed
+        assert client.get(f"/api/v1/photos/uploads/{upload_id}").status_code == 404
+
+    def test_chunk_past_declared_size_is_413(self, client, db_session):
+        upload_id = self._start(client, _seed_test(db_session), b"x" * 10)
+        resp = client.put(f"/api/v1/photos/uploads/{upload_id}?offset=8", content=b"abc")
+        assert resp.status_code == 413
+
+    def test_streamed_chunk_is_cut_off_at_declared_size(self, client, db_session):
+        upload_id = self._start(client, _seed_test(db_session), b"x" * 10)
+        # No Content-Length (chunked transfer): the limit is enforced while streaming
+        resp = client.put(
+            f"/api/v1/photos/uploads/{upload_id}?offset=0",
+            content=iter([b"0123", b"4567", b"89ab"]),
+        )
+        assert resp.status_code == 413
+
+        state = client.put(f"/api/v1/photos/uploads/{upload_id}?offset=0", content=iter([b"0123", b"456789"])).json()
+        assert state["complete"] is True
+
+    def test_invalid_image_discards_session(self, client, db_session):
+        upload_id = self._start(client, _seed_test(db_session), b"not an image")
+        client.put(f"/api/v1/photos/uploads/{upload_id}?offset=0", content=b"not an image")
+
+        assert client.post(f"/api/v1/photos/uploads/{upload_id}/complete").status_code == 400
+        assert client.get(f"/api/v1/photos/uploads/{upload_id}").status_code == 404
+
+    def test_session_requires_image_and_known_test(self, client, db_session):
+        test_id = _seed_test(db_session)
+        resp = client.post(
+            "/api/v1/photos/uploads",
+            json={"test_id": test_id, "filename": "a.txt", "size": 5, "content_type": "text/plain"},
+        )
+        assert resp.status_code == 400
+        resp = client.post(
+            "/api/v1/photos/uploads",
+            json={"test_id": 9999, "filename": "a.jpg", "size": 5},
+        )
+        assert resp.status_code == 404
+
+    def test_abort(self, client, db_session):
+        upload_id = self._start(client, _seed_test(db_session), b"x" * 10)
+        assert client.delete(f"/api/v1/photos/uploads/{upload_id}").status_code == 204
+        assert client.delete(f"/api/v1/photos/uploads/{upload_id}").status_code == 404
+
+
+# ---------------------------------------------------------------------------
+# Direct-to-storage uploads  (/api/v1/photos/direct-uploads/...)
+# ---------------------------------------------------------------------------
+
+
+class TestDirectUploadRoutes:
+    def _ticket(self, client, test_id) -> dict:
+        resp = client.post(
+            "/api/v1/photos/direct-uploads",
+            json={"test_id": test_id, "filename": "cam1.jpg"},
+        )
+        assert resp.status_code == 201
+        return resp.json()
+
+    def _run_queue(self, db_session):
+        queue = PhotoJobQueue(session_factory=sessionmaker(bind=db_session.get_bind()), consumers=0)
+        while asyncio.run(queue.run_once()):
+            pass
+        db_session.expire_all()
+
+    def test_presigned_put_then_queued_ingestion(self, client, db_session, mock_photo_storage):
+        test_id = _seed_test(db_session)
+        ticket = self._ticket(client, test_id)
+        assert ticket["method"] == "PUT" and "X-Amz-Signature" in ticket["url"]
+        assert ticket["status"] == "awaiting_upload"
+        staging_key = mock_photo_storage.generate_presigned_put_url.await_args.args[0]
+        assert staging_key == f"staging/{ticket['upload_id']}"
+
+        # Client has PUT the file: staging object exists, content is new
+        mock_photo_storage.photo_exists.side_effect = [True, False]
+        mock_photo_storage.get_photo.return_value = _make_jpeg().getvalue()
+
+        resp = client.post(f"/api/v1/photos/direct-uploads/{ticket['upload_id']}/complete")
+        assert resp.status_code == 202
+        assert resp.json()["status"] == "processing"
+        assert db_session.get(Photo, resp.json()["photo_id"]).status == "processing"
+
+        self._run_queue(db_session)
+
+        state = client.get(f"/api/v1/photos/direct-uploads/{ticket['upload_id']}").json()
+        assert state["status"] == "done"
+        photo = db_session.get(Photo, state["photo_id"])
+        assert photo.test_id == test_id
+        assert photo.status == "ready"
+        mock_photo_storage.delete_photo.assert_awaited_once_with(staging_key)
+
+    def test_complete_before_put_is_409(self, client, db_session, mock_photo_storage):
+        ticket = self._ticket(client, _seed_test(db_session))
+        mock_photo_storage.photo_exists.return_value = False
+
+        resp = client.post(f"/api/v1/photos/direct-uploads/{ticket['upload_id']}/complete")
+        assert resp.status_code == 409
+
+    def test_invalid_image_marks_upload_failed(self, client, db_session, mock_photo_storage):
+        ticket = self._ticket(client, _seed_test(db_session))
+        mock_photo_storage.photo_exists.return_value = True
+        mock_photo_storage.get_photo.return_value = b"not an image"
+
+        client.post(f"/api/v1/photos/direct-uploads/{ticket['upload_id']}/complete")
+        self._run_queue(db_session)
+
+        state = client.get(f"/api/v1/photos/direct-uploads/{ticket['upload_id']}").json()
+        assert state["status"] == "failed"
+        assert "Invalid image" in state["error"]
+        assert db_session.get(Photo, state["photo_id"]).status == "failed"
+
+    def test_failed_upload_is_requeued_on_complete(self, client, db_session, mock_photo_storage):
+        ticket = self._ticket(client, _seed_test(db_session))
+        mock_photo_storage.photo_exists.return_value = True
+        mock_photo_storage.get_photo.return_value = b"not an image"
+        client.post(f"/api/v1/photos/direct-uploads/{ticket['upload_id']}/complete")
+        self._run_queue(db_session)
+
+        # Re-uploaded with a valid file: the same photo row is reused
+        mock_photo_storage.photo_exists.side_effect = [True, False]
+        mock_photo_storage.get_photo.return_value = _make_jpeg().getvalue()
+        resp = client.post(f"/api/v1/photos/direct-uploads/{ticket['upload_id']}/complete")
+        assert resp.json()["status"] == "processing"
+        self._run_queue(db_session)
+
+        state = client.get(f"/api/v1/photos/direct-uploads/{ticket['upload_id']}").json()
+        assert state["status"] == "done" and state["error"] is None
+        assert db_session.query(Photo).count() == 1
+        assert db_session.get(Photo, state["photo_id"]).status == "ready"
+
+    def test_bucket_notification_starts_ingestion(self, client, db_session, mock_photo_storage, monkeypatch):
+        monkeypatch.setattr(sys.modules["app.modules.photos.router"], "DIRECT_UPLOAD_WEBHOOK_TOKEN", "s3cret")
+        ticket = self._ticket(client, _seed_test(db_session))
+        mock_photo_storage.photo_exists.side_effect = [True, False]
+        mock_photo_storage.get_photo.return_value = _make_jpeg().getvalue()
+
+        event = {
+            "EventName": "s3:ObjectCreated:Put",
+            "Records": [
+                {"s3": {"object": {"key": f"staging%2F{ticket['upload_id']}"}}},
+                {"s3": {"object": {"key": "photos%2Fab%2Fother.jpg"}}},
+            ],
+        }
+        resp = client.post(
+            "/api/v1/photos/direct-uploads/events",
+            json=event,
+            headers={"Authorization": "Bearer s3cret"},
+        )
+        assert resp.status_code == 202
+        assert resp.json()["started"] == [ticket["upload_id"]]
+
+        self._run_queue(db_session)
+        state = client.get(f"/api/v1/photos/direct-uploads/{ticket['upload_id']}").json()
+        assert state["status"] == "done"
+
+    def test_bucket_notification_needs_a_configured_token(self, client, monkeypatch):
+        router_mod = sys.modules["app.modules.photos.router"]
+        event = {"Records": [{"s3": {"object": {"key": "staging%2Fabc"}}}]}
+
+        monkeypatch.setattr(router_mod, "DIRECT_UPLOAD_WEBHOOK_TOKEN", None)
+        assert client.post("/api/v1/photos/direct-uploads/events", json=event).status_code == 403
+
+        monkeypatch.setattr(router_mod, "DIRECT_UPLOAD_WEBHOOK_TOKEN", "s3cret")
+        resp = client.post("/api/v1/photos/direct-uploads/events", json=event, headers={"Authorization": "Bearer nope"})
+        assert resp.status_code == 401
+
+    def test_backend_without_direct_uploads_is_501(self, client, db_session, mock_photo_storage):
+        mock_photo_storage.generate_presigned_put_url.side_effect = NotImplementedError("no direct uploads")
+        resp = client.post(
+            "/api/v1/photos/direct-uploads",
+            json={"test_id": _seed_test(db_session), "filename": "cam1.jpg"},
+        )
+        assert resp.status_code == 501
+
+
 # ---------------------------------------------------------------------------
 # GET /api/v1/photos/test/{test_id}
 # ---------------------------------------------------------------------------
@@ -103,14 +443,240 @@ class TestListPhotosRoute:
 
         resp = client.get(f"/api/v1/photos/test/{test_id}")
         assert resp.status_code == 200
-        assert len(resp.json()) == 2
+        body = resp.json()
+        assert len(body["photos"]) == 2
+        assert body["next_cursor"] is None
+        assert body["total"] is None
+
+    def test_skips_photos_that_are_not_ready(self, client, db_session):
+        test_id = _seed_test(db_session)
+        db_session.add_all([
+            Photo(test_id=test_id, file_path="/uploads/ready.jpg"),
+            Photo(test_id=test_id, file_path="staging/abc", status="processing"),
+            Photo(test_id=test_id, file_path="staging/def", status="failed"),
+        ])
+        db_session.commit()
+
+        resp = client.get(f"/api/v1/photos/test/{test_id}?include_total=true")
+        assert [p["file_path"] for p in resp.json()["photos"]] == ["/uploads/ready.jpg"]
+        assert resp.json()["total"] == 1
 
     def test_returns_empty_for_test_with_no_photos(self, client, db_session):
         test_id = _seed_test(db_session)
 
-        resp = client.get(f"/api/v1/photos/test/{test_id}")
+        resp = client.get(f"/api/v1/photos/test/{test_id}?include_total=true")
         assert resp.status_code == 200
-        assert resp.json() == []
+        assert resp.json()["photos"] == []
+        assert resp.json()["total"] == 0
+
+    def test_keyset_pages_in_time_order(self, client, db_session):
+        test_id = _seed_test(db_session)
+        base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        # Two photos share a timestamp: id breaks the tie
+        stamps = [base + timedelta(minutes=m) for m in (4, 0, 2, 2, 1)]
+        db_session.add_all([
+            Photo(test_id=test_id, file_path=f"/uploads/p{i}.jpg", time_stamp=ts)
+            for i, ts in enumerate(stamps)
+        ])
+        db_session.commit()
+
+        seen, cursor = [], None
+        while True:
+            url = f"/api/v1/photos/test/{test_id}?limit=2" + (f"&cursor={cursor}" if cursor else "")
+            body = client.get(url).json()
+            seen += [p["file_path"] for p in body["photos"]]
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+
+        assert seen == [f"/uploads/p{i}.jpg" for i in (1, 4, 2, 3, 0)]
+
+    def test_time_range_filter(self, client, db_session):
+        test_id = _seed_test(db_session)
+        base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        db_session.add_all([
+            Photo(test_id=test_id, file_path=f"/uploads/p{m}.jpg", time_stamp=base + timedelta(minutes=m))
+            for m in range(5)
+        ])
+        db_session.commit()
+
+        resp = client.get(
+            f"/api/v1/photos/test/{test_id}",
+            params={"since": "2025-01-01T00:01:00+00:00", "until": "2025-01-01T00:03:00+00:00", "include_total": "true"},
+        )
+        body = resp.json()
+        assert [p["file_path"] for p in body["photos"]] == ["/uploads/p1.jpg", "/uploads/p2.jpg"]
+        assert body["total"] == 2
+
+    def test_malformed_cursor_is_400(self, client, db_session):
+        test_id = _seed_test(db_session)
+        assert client.get(f"/api/v1/photos/test/{test_id}?cursor=not-a-cursor").status_code == 400
+
+
+# ---------------------------------------------------------------------------
+# GET /api/v1/photos?test_ids=...  and  POST /api/v1/photos/lookup
+# ---------------------------------------------------------------------------
+
+
+class TestPhotoLookupRoutes:
+    def _seed(self, db, counts):
+        base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        ids = []
+        for n in counts:
+            test_id = _seed_test(db)
+            # Inserted newest first: the response must follow time_stamp, not id
+            db.add_all([
+                Photo(test_id=test_id, file_path=f"/uploads/t{test_id}_{m}.jpg", time_stamp=base + timedelta(minutes=m))
+                for m in reversed(range(n))
+            ])
+            ids.append(test_id)
+        db.commit()
+        return ids
+
+    def test_groups_in_request_order(self, client, db_session):
+        a, b, empty = self._seed(db_session, [2, 3, 0])
+
+        resp = client.get("/api/v1/photos", params={"test_ids": f"{b},{empty},{a},{b}"})
+        assert resp.status_code == 200
+        groups = resp.json()["groups"]
+        assert [g["test_id"] for g in groups] == [b, empty, a]
+        assert [p["file_path"] for p in groups[0]["photos"]] == [f"/uploads/t{b}_{m}.jpg" for m in range(3)]
+        assert groups[1] == {"test_id": empty, "total": 0, "photos": []}
+        assert groups[2]["total"] == 2
+
+    def test_per_test_keeps_first_photos_of_each_test(self, client, db_session):
+        a, b = self._seed(db_session, [5, 1])
+
+        resp = client.post("/api/v1/photos/lookup", json={"test_ids": [a, b], "per_test": 2})
+        assert resp.status_code == 200
+        groups = resp.json()["groups"]
+        assert [p["file_path"] for p in groups[0]["photos"]] == [f"/uploads/t{a}_0.jpg", f"/uploads/t{a}_1.jpg"]
+        assert groups[0]["total"] == 5
+        assert len(groups[1]["photos"]) == 1 and groups[1]["total"] == 1
+
+    def test_skips_photos_that_are_not_ready(self, client, db_session):
+        (a,) = self._seed(db_session, [2])
+        db_session.add(Photo(test_id=a, file_path="staging/abc", status="processing"))
+        db_session.commit()
+
+        group = client.get("/api/v1/photos", params={"test_ids": str(a)}).json()["groups"][0]
+        assert group["total"] == 2
+        assert all(p["file_path"].startswith("/uploads/") for p in group["photos"])
+
+    def test_invalid_test_ids_is_400(self, client):
+        assert client.get("/api/v1/photos?test_ids=1,x").status_code == 400
+        assert client.get("/api/v1/photos?test_ids=,").status_code == 400
+
+    def test_too_many_test_ids_is_413(self, client, monkeypatch):
+        monkeypatch.setattr(sys.modules["app.modules.photos.router"], "LOOKUP_MAX_TESTS", 2)
+        resp = client.post("/api/v1/photos/lookup", json={"test_ids": [1, 2, 3]})
+        assert resp.status_code == 413
+
+
+# ---------------------------------------------------------------------------
+# GET /api/v1/photos/feed
+# ---------------------------------------------------------------------------
+
+
+class TestPhotoFeedRoute:
+    def _seed(self, db):
+        base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        incoming = Tests(product_id=101, test_type="incoming", requester="Alice", status="open")
+        final = Tests(product_id=202, test_type="final", requester="Bob", status="completed")
+        db.add_all([incoming, final])
+        db.flush()
+        db.add_all([
+            Photo(test_id=incoming.id, file_path="/uploads/a0.jpg", time_stamp=base),
+            Photo(test_id=final.id, file_path="/uploads/b1.jpg", time_stamp=base + timedelta(minutes=1)),
+            Photo(test_id=incoming.id, file_path="/uploads/a2.jpg", time_stamp=base + timedelta(minutes=2)),
+            Photo(test_id=final.id, file_path="/uploads/b3.jpg", time_stamp=base + timedelta(minutes=3)),
+            Photo(test_id=final.id, file_path="staging/x", status="processing", time_stamp=base + timedelta(minutes=4)),
+        ])
+        db.commit()
+        return incoming.id, final.id
+
+    def test_newest_first_across_tests(self, client, db_session):
+        incoming_id, final_id = self._seed(db_session)
+
+        seen, cursor = [], None
+        while True:
+            url = "/api/v1/photos/feed?limit=3" + (f"&cursor={cursor}" if cursor else "")
+            body = client.get(url).json()
+            seen += body["items"]
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+
+        # Photos still processing are left out
+        assert [i["photo"]["file_path"] for i in seen] == [
+            "/uploads/b3.jpg", "/uploads/a2.jpg", "/uploads/b1.jpg", "/uploads/a0.jpg",
+        ]
+        assert seen[0]["test"] == {"id": final_id, "product_id": 202, "test_type": "final", "status": "completed"}
+        assert seen[0]["photo"]["thumb_url"].startswith(f"/api/v1/photos/{seen[0]['photo']['id']}/image?variant=thumb")
+
+    def test_filters_by_test_fields(self, client, db_session):
+        self._seed(db_session)
+
+        resp = client.get("/api/v1/photos/feed", params={"test_type": "incoming"})
+        assert [i["photo"]["file_path"] for i in resp.json()["items"]] == ["/uploads/a2.jpg", "/uploads/a0.jpg"]
+
+        resp = client.get("/api/v1/photos/feed", params={"status": "completed", "product_id": 202})
+        assert [i["photo"]["file_path"] for i in resp.json()["items"]] == ["/uploads/b3.jpg", "/uploads/b1.jpg"]
+
+    def test_malformed_cursor_is_400(self, client):
+        assert client.get("/api/v1/photos/feed?cursor=not-a-cursor").status_code == 400
+
+
+# ---------------------------------------------------------------------------
+# GET /api/v1/photos/{photo_id}/tiles
+# ---------------------------------------------------------------------------
+
+
+class TestPhotoTileRoutes:
+    def _seed_photo(self, db_session, status="ready"):
+        photo = Photo(test_id=_seed_test(db_session), file_path="photos/ab/abc.jpg", status=status)
+        db_session.add(photo)
+        db_session.commit()
+        db_session.refresh(photo)
+        return photo
+
+    def test_manifest_builds_and_stores_the_pyramid(self, client, db_session, mock_photo_storage):
+        photo = self._seed_photo(db_session)
+        mock_photo_storage.get_photo.return_value = _make_jpeg(600, 300).getvalue()
+
+        resp = client.get(f"/api/v1/photos/{photo.id}/tiles")
+        assert resp.status_code == 200
+        body = resp.json()
+        assert (body["width"], body["height"], body["levels"]) == (600, 300, 3)
+        assert body["url_template"] == f"/api/v1/photos/{photo.id}/tiles/{{z}}/{{x}}/{{y}}.jpg"
+
+        keys = [c.args[1] for c in mock_photo_storage.upload_photo.await_args_list]
+        assert "tiles/photos/ab/abc/2/2/1.jpg" in keys
+        assert len(keys) == 9 + 1
+        # Manifest last: its presence marks a complete pyramid
+        assert keys[-1] == "tiles/photos/ab/abc/manifest.json"
+
+    def test_tile_is_immutable(self, client, db_session, mock_photo_storage):
+        photo = self._seed_photo(db_session)
+
+        resp = client.get(f"/api/v1/photos/{photo.id}/tiles/2/1/0.jpg")
+        assert resp.status_code == 200
+        assert resp.headers["content-type"] == "image/jpeg"
+        assert "immutable" in resp.headers["cache-control"]
+        mock_photo_storage.stream_photo.assert_awaited_once_with("tiles/photos/ab/abc/2/1/0.jpg")
+
+    def test_tile_outside_pyramid_is_404(self, client, db_session, mock_photo_storage):
+        photo = self._seed_photo(db_session)
+        mock_photo_storage.stat_photo.side_effect = FileNotFoundError("NoSuchKey")
+        mock_photo_storage.photo_exists.return_value = True
+        mock_photo_storage.get_photo.return_value = b'{"width": 600, "height": 300, "tile_size": 256, "levels": 3}'
+
+        assert client.get(f"/api/v1/photos/{photo.id}/tiles/2/3/0.jpg").status_code == 404
+        assert client.get(f"/api/v1/photos/{photo.id}/tiles/5/0/0.jpg").status_code == 404
+
+    def test_processing_photo_has_no_tiles(self, client, db_session):
+        photo = self._seed_photo(db_session, status="processing")
+        assert client.get(f"/api/v1/photos/{photo.id}/tiles").status_code == 409
 
 
 # ---------------------------------------------------------------------------
@@ -143,17 +709,197 @@ class TestGetPhotoUrlRoute:
 
 
 class TestGetPhotoImageRoute:
-    def test_returns_image_data(self, client, db_session, mock_photo_storage):
+    def _seed_photo(self, db_session):
         test_id = _seed_test(db_session)
         photo = Photo(test_id=test_id, file_path="/uploads/p1.jpg")
         db_session.add(photo)
         db_session.commit()
         db_session.refresh(photo)
+        return photo
+
+    def test_returns_image_data(self, client, db_session, mock_photo_storage):
+        photo = self._seed_photo(db_session)
 
         resp = client.get(f"/api/v1/photos/{photo.id}/image")
         assert resp.status_code == 200
         assert resp.headers["content-type"] == "image/jpeg"
-        mock_photo_storage.get_photo.assert_awaited_once_with("/uploads/p1.jpg")
+        assert resp.headers["accept-ranges"] == "bytes"
+        assert resp.content == mock_photo_storage.fake_bytes
+        mock_photo_storage.stream_photo.assert_awaited_once_with("/uploads/p1.jpg")
+
+    def test_serves_requested_variant(self, client, db_session, mock_photo_storage):
+        photo = self._seed_photo(db_session)
+
+        resp = client.get(f"/api/v1/photos/{photo.id}/image?variant=thumb")
+        assert resp.status_code == 200
+        mock_photo_storage.stream_photo.assert_awaited_once_with("/uploads/p1_thumb.jpg")
+
+    def test_missing_variant_falls_back_to_full(self, client, db_session, mock_photo_storage):
+        photo = self._seed_photo(db_session)
+        info = mock_photo_storage.stat_photo.return_value
+        mock_photo_storage.stat_photo.side_effect = [Exception("NoSuchKey"), info]
+
+        resp = client.get(f"/api/v1/photos/{photo.id}/image?variant=preview")
+        assert resp.status_code == 200
+        mock_photo_storage.stream_photo.assert_awaited_once_with("/uploads/p1.jpg")
+
+    def test_rejects_unknown_variant(self, client):
+        assert client.get("/api/v1/photos/1/image?variant=huge").status_code == 422
+
+    def test_versioned_url_is_immutable(self, client, db_session, mock_photo_storage):
+        sha = "ab" * 32
+        photo = Photo(test_id=_seed_test(db_session), file_path=f"photos/ab/{sha}.jpg")
+        db_session.add(photo)
+        db_session.commit()
+
+        body = client.get(f"/api/v1/photos/{photo.id}").json()
+        assert body["image_url"] == f"/api/v1/photos/{photo.id}/image?v={sha[:16]}"
+        assert body["thumb_url"] == f"/api/v1/photos/{photo.id}/image?variant=thumb&v={sha[:16]}"
+
+        resp = client.get(body["image_url"])
+        assert resp.headers["cache-control"] == "public, max-age=31536000, immutable"
+        # Stale or missing version: short-lived caching only
+        resp = client.get(f"/api/v1/photos/{photo.id}/image?v=0000")
+        assert resp.headers["cache-control"] == "public, max-age=3600"
+
+    def test_rendition_is_negotiated_rendered_and_stored(self, client, db_session, mock_photo_storage):
+        photo = self._seed_photo(db_session)
+        info = mock_photo_storage.stat_photo.return_value
+        mock_photo_storage.stat_photo.side_effect = [FileNotFoundError("NoSuchKey"), info]
+        mock_photo_storage.get_photo.return_value = _make_jpeg(1200, 900).getvalue()
+
+        resp = client.get(
+            f"/api/v1/photos/{photo.id}/image?w=320",
+            headers={"Accept": "image/webp,image/*;q=0.8"},
+        )
+        assert resp.status_code == 200
+        assert resp.headers["content-type"] == "image/webp"
+        assert "Accept" in resp.headers["vary"]
+        assert resp.headers["cache-control"] == "public, max-age=3600"
+
+        data, key, content_type = mock_photo_storage.upload_photo.await_args.args
+        assert key == "renders/uploads/p1/320x0-contain.webp"
+        assert content_type == "image/webp"
+        assert Image.open(BytesIO(data)).size == (320, 240)
+        mock_photo_storage.stream_photo.assert_awaited_once_with(key)
+
+    def test_rendition_of_unprocessed_photo_is_409(self, client, db_session, mock_photo_storage):
+        photo = Photo(test_id=_seed_test(db_session), file_path="staging/abc", status="processing")
+        db_session.add(photo)
+        db_session.commit()
+
+        resp = client.get(f"/api/v1/photos/{photo.id}/image?w=320")
+        assert resp.status_code == 409
+        mock_photo_storage.get_photo.assert_not_awaited()
+        mock_photo_storage.upload_photo.assert_not_awaited()
+
+    def test_negotiated_rendition_304_keeps_vary(self, client, db_session, mock_photo_storage):
+        photo = self._seed_photo(db_session)
+
+        resp = client.get(
+            f"/api/v1/photos/{photo.id}/image?w=320",
+            headers={"Accept": "image/webp", "If-None-Match": '"fake-etag"'},
+        )
+        assert resp.status_code == 304
+        assert "Accept" in resp.headers["vary"]
+
+    def test_stored_rendition_is_not_rendered_again(self, client, db_session, mock_photo_storage):
+        photo = self._seed_photo(db_session)
+
+        resp = client.get(f"/api/v1/photos/{photo.id}/image?w=640&h=640&fit=cover&format=jpeg")
+        assert resp.status_code == 200
+        assert "Accept" not in resp.headers.get("vary", "")
+        mock_photo_storage.get_photo.assert_not_awaited()
+        mock_photo_storage.stream_photo.assert_awaited_once_with("renders/uploads/p1/640x640-cover.jpeg")
+
+    def test_rendition_size_must_be_allowed(self, client, db_session):
+        photo = self._seed_photo(db_session)
+        assert client.get(f"/api/v1/photos/{photo.id}/image?w=333").status_code == 400
+        assert client.get(f"/api/v1/photos/{photo.id}/image?w=320&variant=thumb").status_code == 400
+
+    def test_range_request_returns_partial_content(self, client, db_session, mock_photo_storage):
+        photo = self._seed_photo(db_session)
+        size = len(mock_photo_storage.fake_bytes)
+
+        resp = client.get(f"/api/v1/photos/{photo.id}/image", headers={"Range": "bytes=2-5"})
+        assert resp.status_code == 206
+        assert resp.headers["content-range"] == f"bytes 2-5/{size}"
+        assert resp.content == mock_photo_storage.fake_bytes[2:6]
+        mock_photo_storage.stream_photo.assert_awaited_once_with("/uploads/p1.jpg", offset=2, length=4)
+
+        # Suffix range
+        resp = client.get(f"/api/v1/photos/{photo.id}/image", headers={"Range": "bytes=-3"})
+        assert resp.status_code == 206
+        assert resp.content == mock_photo_storage.fake_bytes[-3:]
+
+    def test_unsatisfiable_range_is_416(self, client, db_session, mock_photo_storage):
+        photo = self._seed_photo(db_session)
+        size = len(mock_photo_storage.fake_bytes)
+
+        resp = client.get(f"/api/v1/photos/{photo.id}/image", headers={"Range": f"bytes={size}-"})
+        assert resp.status_code == 416
+        assert resp.headers["content-range"] == f"bytes */{size}"
+
+    def test_stale_if_range_returns_full_body(self, client, db_session, mock_photo_storage):
+        photo = self._seed_photo(db_session)
+
+        resp = client.get(
+            f"/api/v1/photos/{photo.id}/image",
+            headers={"Range": "bytes=0-1", "If-Range": '"some-older-etag"'},
+        )
+        assert resp.status_code == 200
+        assert resp.content == mock_photo_storage.fake_bytes
+
+        resp = client.get(
+            f"/api/v1/photos/{photo.id}/image",
+            headers={"Range": "bytes=0-1", "If-Range": '"fake-etag"'},
+        )
+        assert resp.status_code == 206
+
+    def test_if_none_match_returns_304_without_streaming(self, client, db_session, mock_photo_storage):
+        photo = self._seed_photo(db_session)
+
+        resp = client.get(f"/api/v1/photos/{photo.id}/image")
+        etag = resp.headers["etag"]
+        assert etag == '"fake-etag"'
+        mock_photo_storage.stream_photo.reset_mock()
+
+        resp = client.get(f"/api/v1/photos/{photo.id}/image", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.headers["etag"] == etag
+        mock_photo_storage.stream_photo.assert_not_awaited()
+
+        resp = client.get(f"/api/v1/photos/{photo.id}/image", headers={"If-None-Match": '"other"'})
+        assert resp.status_code == 200
+
+    def test_cached_object_served_from_disk(self, client, db_session, mock_photo_storage, tmp_path):
+        photo = self._seed_photo(db_session)
+        cached = tmp_path / "cached.jpg"
+        cached.write_bytes(b"cached-bytes")
+        mock_photo_storage.stat_photo.return_value = (
+            mock_photo_storage.stat_photo.return_value._replace(size=12, local_path=str(cached))
+        )
+
+        resp = client.get(f"/api/v1/photos/{photo.id}/image")
+        assert resp.status_code == 200
+        assert resp.content == b"cached-bytes"
+        assert resp.headers["etag"] == '"fake-etag"'
+        mock_photo_storage.stream_photo.assert_not_awaited()
+
+        resp = client.get(f"/api/v1/photos/{photo.id}/image", headers={"Range": "bytes=0-5"})
+        assert resp.status_code == 206
+        assert resp.content == b"cached"
+
+    def test_evicted_cache_entry_falls_back_to_storage(self, client, db_session, mock_photo_storage, tmp_path):
+        photo = self._seed_photo(db_session)
+        info = mock_photo_storage.stat_photo.return_value
+        # The first stat hits a cache entry that is evicted before it is sent
+        mock_photo_storage.stat_photo.side_effect = [info._replace(local_path=str(tmp_path / "evicted.jpg")), info]
+
+        resp = client.get(f"/api/v1/photos/{photo.id}/image")
+        assert resp.status_code == 200
+        assert resp.content == mock_photo_storage.fake_bytes
+        mock_photo_storage.stream_photo.assert_awaited_once()
 
     def test_404_for_nonexistent_photo(self, client):
         assert client.get("/api/v1/photos/9999/image").status_code == 404
@@ -178,5 +924,17 @@ class TestDeletePhotoRoute:
         # Row is gone – subsequent URL lookup returns 404
         assert client.get(f"/api/v1/photos/{photo.id}/url").status_code == 404
 
+    def test_shared_object_kept_until_last_reference(self, client, db_session, mock_photo_storage):
+        test_id = _seed_test(db_session)
+        photos = [Photo(test_id=test_id, file_path="photos/ab/abcd.jpg") for _ in range(2)]
+        db_session.add_all(photos)
+        db_session.commit()
+
+        assert client.delete(f"/api/v1/photos/{photos[0].id}").status_code == 204
+        mock_photo_storage.delete_photo.assert_not_awaited()
+
+        assert client.delete(f"/api/v1/photos/{photos[1].id}").status_code == 204
+        mock_photo_storage.delete_photo.assert_awaited_once_with("photos/ab/abcd.jpg")
+
     def test_404_for_nonexistent_photo(self, client):
         assert client.delete("/api/v1/photos/9999").status_code == 404
@@ -13,6 +13,15 @@ because FastAPI's jsonable_encoder defaults to ``by_alias=True``.
 """
 
 import pytest
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
+
+from PIL import Image
+
+from app.modules.audit.models import AuditLog
+from app.modules.defects.models import Defect, DefectAnnotation, DefectCategory
+from app.modules.photos.models import Photo
+from app.modules.tests.models import Tests
 
 
 # ---------------------------------------------------------------------------
@@ -26,6 +35,12 @@ def _form_fields(**kwargs) -> list:
     return [(k, (None, str(v))) for k, v in kwargs.items() if v is not None]
 
 
+def _jpeg(color=(128, 64, 32)) -> bytes:
+    buf = BytesIO()
+    Image.new("RGB", (100, 100), color).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
 # ---------------------------------------------------------------------------
 # POST /api/v1/tests/
 # ---------------------------------------------------------------------------
@@ -64,6 +79,28 @@ class TestCreateTestRoute:
         assert test["status"] == "finalized"
         assert test["deadline_at"] is not None
 
+    def test_photos_processed_in_bulk_with_per_file_outcomes(self, client, db_session, mock_photo_storage):
+        files = _form_fields(productId=105, testType="incoming", requester="Alice") + [
+            ("photos", ("a.jpg", _jpeg((255, 0, 0)), "image/jpeg")),
+            ("photos", ("notes.txt", b"hello", "text/plain")),
+            ("photos", ("b.jpg", _jpeg((0, 0, 255)), "image/jpeg")),
+            ("photos", ("broken.jpg", b"not an image", "image/jpeg")),
+        ]
+        resp = client.post("/api/v1/tests/", files=files)
+        assert resp.status_code == 201
+
+        body = resp.json()
+        assert [p["test_id"] for p in body["photos"]] == [body["test"]["id"]] * 2
+        assert len({p["file_path"] for p in body["photos"]}) == 2
+        assert [f["filename"] for f in body["failed_photos"]] == ["notes.txt", "broken.jpg"]
+        assert body["failed_photos"][0]["error"] == "Not an image file"
+        assert body["message"].endswith("with 2 photo(s). 2 failed")
+
+        actions = sorted(
+            a for (a,) in db_session.query(AuditLog.action).filter(AuditLog.entity_type == "Photo")
+        )
+        assert actions == ["UPLOAD", "UPLOAD", "UPLOAD_FAILED", "UPLOAD_FAILED"]
+
     def test_400_on_invalid_deadline_format(self, client):
         resp = client.post(
             "/api/v1/tests/",
@@ -95,6 +132,21 @@ class TestGetTestRoute:
         assert resp.json()["id"] == created["id"]
         assert resp.json()["product_id"] == 102
 
+    def test_conditional_get_uses_updated_at(self, client):
+        test_id = client.post(
+            "/api/v1/tests/",
+            files=_form_fields(productId=102, testType="incoming", requester="Carol"),
+        ).json()["test"]["id"]
+
+        etag = client.get(f"/api/v1/tests/{test_id}").headers["etag"]
+        resp = client.get(f"/api/v1/tests/{test_id}", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+
+        client.patch(f"/api/v1/tests/{test_id}", json={"status": "in_progress"})
+        resp = client.get(f"/api/v1/tests/{test_id}", headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+        assert resp.json()["status"] == "in_progress"
+
 
 # ---------------------------------------------------------------------------
 # GET /api/v1/tests/  –  listing & pagination
@@ -127,6 +179,160 @@ class TestListTestsRoute:
         # Skip beyond total returns empty
         assert client.get("/api/v1/tests/?skip=100").json() == []
 
+    def test_cursor_pages_cover_all_tests_once(self, client):
+        self._create_n(client, 5)
+
+        seen, cursor = [], None
+        while True:
+            resp = client.get("/api/v1/tests/", params={"limit": 2, "sort": "-id", **({"cursor": cursor} if cursor else {})})
+            assert resp.status_code == 200
+            seen += [t["id"] for t in resp.json()]
+            cursor = resp.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+
+        assert len(seen) == 5
+        assert seen == sorted(seen, reverse=True)
+
+    def test_filters(self, client, db_session):
+        db_session.add_all([
+            Tests(product_id=1, test_type="incoming", requester="A", assigned_to="Eve", status="open"),
+            Tests(product_id=1, test_type="final", requester="A", assigned_to="Eve", status="open"),
+            Tests(product_id=2, test_type="final", requester="A", assigned_to="Bob", status="finalized"),
+        ])
+        db_session.commit()
+
+        def products(**params):
+            return [(t["product_id"], t["test_type"]) for t in client.get("/api/v1/tests/", params=params).json()]
+
+        assert products(status="open", test_type="final") == [(1, "final")]
+        assert products(assigned_to="Bob") == [(2, "final")]
+        assert products(product_id=1) == [(1, "incoming"), (1, "final")]
+
+    def test_search_matches_every_word(self, client, db_session):
+        db_session.add_all([
+            Tests(product_id=101, test_type="incoming", requester="Alice", status="open"),
+            Tests(product_id=102, test_type="final", requester="alice", status="in_progress"),
+            Tests(product_id=201, test_type="final", requester="Bob", status="open"),
+        ])
+        db_session.commit()
+
+        def products(q, **params):
+            return [t["product_id"] for t in client.get("/api/v1/tests/", params={"q": q, **params}).json()]
+
+        assert products("ALICE") == [101, 102]
+        assert products("alice final") == [102]
+        assert products("progress") == [102]
+        assert products("final", status="open") == [201]
+        assert products("50%") == []
+
+    def test_sort_by_deadline_keeps_tests_without_deadline(self, client, db_session):
+        base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        deadlines = [base + timedelta(days=2), None, base, None, base + timedelta(days=1)]
+        db_session.add_all([
+            Tests(product_id=i, test_type="incoming", requester="A", status="open", deadline_at=d)
+            for i, d in enumerate(deadlines)
+        ])
+        db_session.commit()
+
+        def walk(sort, **params):
+            seen, cursor = [], None
+            while True:
+                query = {"limit": 2, "sort": sort, **params, **({"cursor": cursor} if cursor else {})}
+                resp = client.get("/api/v1/tests/", params=query)
+                seen += [t["product_id"] for t in resp.json()]
+                cursor = resp.headers.get("X-Next-Cursor")
+                if cursor is None:
+                    return seen
+
+        # Tests without a deadline come last (first when descending)
+        assert walk("deadline_at") == [2, 4, 0, 1, 3]
+        assert walk("-deadline_at") == [3, 1, 0, 4, 2]
+        assert walk(
+            "deadline_at",
+            deadline_after=(base + timedelta(days=1)).isoformat(),
+            deadline_before=(base + timedelta(days=3)).isoformat(),
+        ) == [4, 0]
+
+    def test_invalid_sort_or_cursor_is_400(self, client):
+        assert client.get("/api/v1/tests/?sort=requester").status_code == 400
+        assert client.get("/api/v1/tests/?cursor=not-a-cursor").status_code == 400
+
+    def test_skip_with_cursor_is_422(self, client):
+        self._create_n(client, 3)
+        cursor = client.get("/api/v1/tests/?limit=1").headers["X-Next-Cursor"]
+        assert client.get("/api/v1/tests/", params={"cursor": cursor, "skip": 1}).status_code == 422
+
+
+# ---------------------------------------------------------------------------
+# GET /api/v1/tests/summary
+# ---------------------------------------------------------------------------
+
+
+class TestTestSummaryRoute:
+    def test_aggregates_per_test(self, client, db_session):
+        base = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        busy = Tests(product_id=1, test_type="incoming", requester="A", status="open")
+        idle = Tests(product_id=2, test_type="final", requester="A", status="open")
+        latest_upload = datetime(2031, 1, 1, tzinfo=timezone.utc)
+        category = DefectCategory(name="Damage", is_active=True)
+        db_session.add_all([busy, idle, category])
+        db_session.flush()
+        p1 = Photo(test_id=busy.id, file_path="/uploads/1.jpg", time_stamp=base)
+        p2 = Photo(test_id=busy.id, file_path="/uploads/2.jpg", time_stamp=base)
+        pending = Photo(test_id=busy.id, file_path="staging/abc", time_stamp=latest_upload, status="processing")
+        db_session.add_all([p1, p2, pending])
+        db_session.flush()
+        high = Defect(photo_id=p1.id, severity="high", created_at=base)
+        low = Defect(photo_id=p2.id, severity="low", created_at=base)
+        db_session.add_all([high, low, Defect(photo_id=p2.id, severity="low", created_at=base)])
+        db_session.flush()
+        latest = datetime(2030, 1, 1, tzinfo=timezone.utc)
+        db_session.add_all([
+            DefectAnnotation(defect_id=high.id, category_id=category.id, geometry={}, created_at=base),
+            DefectAnnotation(defect_id=high.id, category_id=category.id, geometry={}, created_at=latest),
+        ])
+        db_session.commit()
+
+        resp = client.get("/api/v1/tests/summary")
+        assert resp.status_code == 200
+        first, second = resp.json()["items"]
+        assert first["test"]["id"] == busy.id
+        # The processing photo is neither counted nor recent activity
+        assert first["photo_count"] == 2
+        # Annotations repeat the defect rows in the join; counts stay distinct
+        assert first["defect_count"] == 3
+        assert first["defects_by_severity"] == {"low": 2, "medium": 0, "high": 1, "critical": 0}
+        assert first["annotation_count"] == 2
+        assert first["last_activity_at"].startswith("2030-01-01")
+        assert second["photo_count"] == second["defect_count"] == second["annotation_count"] == 0
+        assert second["last_activity_at"].startswith(second["test"]["updated_at"])
+
+    def test_pages_with_list_filters(self, client, db_session):
+        db_session.add_all([
+            Tests(product_id=i, test_type="incoming", requester="A", status="open" if i % 2 else "finalized")
+            for i in range(5)
+        ])
+        db_session.commit()
+
+        first = client.get("/api/v1/tests/summary", params={"status": "finalized", "limit": 2, "sort": "-id"}).json()
+        assert [i["test"]["product_id"] for i in first["items"]] == [4, 2]
+        rest = client.get("/api/v1/tests/summary", params={"status": "finalized", "limit": 2, "sort": "-id", "cursor": first["next_cursor"]}).json()
+        assert [i["test"]["product_id"] for i in rest["items"]] == [0]
+        assert rest["next_cursor"] is None
+
+    def test_only_requested_tests(self, client, db_session):
+        tests = [Tests(product_id=i, test_type="incoming", requester="A", status="open") for i in range(4)]
+        db_session.add_all(tests)
+        db_session.commit()
+
+        resp = client.get("/api/v1/tests/summary", params={"test_ids": f"{tests[3].id},{tests[1].id}"})
+        assert [i["test"]["id"] for i in resp.json()["items"]] == [tests[1].id, tests[3].id]
+        assert client.get("/api/v1/tests/summary?test_ids=1,x").status_code == 400
+
+    def test_invalid_sort_is_400(self, client):
+        assert client.get("/api/v1/tests/summary?sort=requester").status_code == 400
+
 
 # ---------------------------------------------------------------------------
 # PATCH /api/v1/tests/{test_id}
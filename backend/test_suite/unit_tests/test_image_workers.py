@@ -0,0 +1,107 @@
+"""
+Unit tests for ImageWorkerPool – process-backed execution, queue bounds,
+timeouts and metrics.
+
+The first tests start real worker processes; the rest use inline mode
+(``max_workers=0``) so they stay fast and deterministic.
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from app.modules.photos.processing import process_upload
+from app.modules.photos.workers import (
+    ImageWorkerPool,
+    ImagePoolBusyError,
+    ImageJobTimeoutError,
+)
+
+
+def _jpeg_bytes(width: int = 100, height: int = 100) -> bytes:
+    buf = BytesIO()
+    Image.new("RGB", (width, height), (10, 20, 30)).save(buf, format="JPEG")
+    return buf.getvalue()
+
+
+def _slow_job(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+def _crash() -> None:
+    os._exit(1)
+
+
+class TestImageWorkerPool:
+    async def test_runs_pipeline_in_worker_process(self):
+        pool = ImageWorkerPool(max_workers=1, max_queue=2, job_timeout=30)
+        try:
+            result = await pool.run(process_upload, _jpeg_bytes(2400, 1200), "big.jpg")
+        finally:
+            pool.shutdown()
+
+        assert result.content_type == "image/jpeg"
+        assert (result.width, result.height) == (2000, 1000)
+        assert result.data[:2] == b"\xff\xd8"
+        assert pool.stats()["completed"] == 1
+
+    async def test_broken_pool_is_shut_down_and_replaced(self):
+        pool = ImageWorkerPool(max_workers=1, max_queue=2, job_timeout=30)
+        try:
+            broken = pool._get_executor()
+            with pytest.raises(BrokenProcessPool):
+                await pool.run(_crash)
+            assert pool._executor is None
+            assert broken._shutdown_thread
+
+            assert await pool.run(_slow_job, 0) == 0
+        finally:
+            pool.shutdown()
+        assert pool.stats()["failed"] == 1
+
+    async def test_validation_errors_propagate(self):
+        pool = ImageWorkerPool(max_workers=0, max_queue=2, job_timeout=5)
+
+        with pytest.raises(ValueError, match="[Ii]nvalid"):
+            await pool.run(process_upload, b"not an image", "bad.jpg")
+        assert pool.stats()["failed"] == 1
+
+    async def test_rejects_when_queue_is_full(self):
+        pool = ImageWorkerPool(max_workers=0, max_queue=1, job_timeout=5)
+
+        first = asyncio.create_task(pool.run(_slow_job, 0.2))
+        await asyncio.sleep(0)  # let the first job claim the only slot
+        with pytest.raises(ImagePoolBusyError):
+            await pool.run(_slow_job, 0)
+
+        assert await first == 0.2
+        stats = pool.stats()
+        assert stats["rejected"] == 1
+        assert stats["pending"] == 0
+
+    async def test_job_timeout(self):
+        pool = ImageWorkerPool(max_workers=0, max_queue=2, job_timeout=0.05)
+
+        with pytest.raises(ImageJobTimeoutError):
+            await pool.run(_slow_job, 0.5)
+        assert pool.stats()["timed_out"] == 1
+
+    async def test_timed_out_job_keeps_its_slot_until_it_finishes(self):
+        pool = ImageWorkerPool(max_workers=0, max_queue=1, job_timeout=0.05)
+
+        with pytest.raises(ImageJobTimeoutError):
+            await pool.run(_slow_job, 0.3)
+        # Still running in its worker: no room for another job yet
+        assert pool.stats()["pending"] == 1
+        with pytest.raises(ImagePoolBusyError):
+            await pool.run(_slow_job, 0)
+
+        await asyncio.sleep(0.4)
+        assert pool.stats()["pending"] == 0
+        assert await pool.run(_slow_job, 0) == 0
@@ -0,0 +1,107 @@
+"""
+Unit tests for PhotoDiskCache – fill/hit/miss, LRU eviction, invalidation
+and atomic publishing.  Every test uses its own ``tmp_path`` directory.
+"""
+
+import os
+import time
+from datetime import datetime, timezone
+
+from app.modules.photos.storage import ObjectInfo, PhotoDiskCache
+
+
+def _info(size: int) -> ObjectInfo:
+    return ObjectInfo(
+        size=size,
+        etag='"abc"',
+        last_modified=datetime(2025, 1, 1, tzinfo=timezone.utc),
+        content_type="image/jpeg",
+    )
+
+
+def _fill(cache: PhotoDiskCache, key: str, data: bytes) -> bytes:
+    chunks = [data[i:i + 4] for i in range(0, len(data), 4)]
+    return b"".join(cache.fill(key, _info(len(data)), iter(chunks)))
+
+
+class TestPhotoDiskCache:
+    def test_fill_then_hit(self, tmp_path):
+        cache = PhotoDiskCache(str(tmp_path), max_bytes=1024)
+
+        assert cache.get("photos/a.jpg") is None
+        assert _fill(cache, "photos/a.jpg", b"0123456789") == b"0123456789"
+
+        info = cache.get("photos/a.jpg")
+        assert info is not None
+        assert info.etag == '"abc"'
+        assert info.last_modified == datetime(2025, 1, 1, tzinfo=timezone.utc)
+        with open(info.local_path, "rb") as fh:
+            assert fh.read() == b"0123456789"
+
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["fills"]) == (1, 1, 1)
+
+    def test_aborted_stream_is_not_published(self, tmp_path):
+        cache = PhotoDiskCache(str(tmp_path), max_bytes=1024)
+
+        stream = cache.fill("photos/a.jpg", _info(8), iter([b"0123", b"4567"]))
+        next(stream)
+        stream.close()  # client went away mid-download
+
+        assert cache.get("photos/a.jpg") is None
+        leftovers = [f for _root, _dirs, files in os.walk(tmp_path) for f in files if f.startswith(".tmp-")]
+        assert leftovers == []
+
+    def test_short_stream_is_not_published(self, tmp_path):
+        cache = PhotoDiskCache(str(tmp_path), max_bytes=1024)
+        list(cache.fill("photos/a.jpg", _info(100), iter([b"short"])))
+        assert cache.get("photos/a.jpg") is None
+
+    def test_least_recently_used_entry_is_evicted(self, tmp_path):
+        cache = PhotoDiskCache(str(tmp_path), max_bytes=25)
+        _fill(cache, "a", b"x" * 10)
+        _fill(cache, "b", b"y" * 10)
+
+        # Make "a" older, then touch it so that "b" becomes the LRU entry
+        old = time.time() - 100
+        os.utime(cache.get("b").local_path, (old, old))
+        os.utime(cache._paths("a")[0], (old - 50, old - 50))
+        cache.get("a")
+
+        _fill(cache, "c", b"z" * 10)
+
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
+        assert cache.stats()["evictions"] == 1
+
+    def test_fills_under_budget_do_not_rescan(self, tmp_path):
+        cache = PhotoDiskCache(str(tmp_path), max_bytes=1024)
+        for key in ("a", "b", "c"):
+            _fill(cache, key, b"x" * 10)
+
+        # Only the first fill measures the directory; later ones add to the estimate
+        assert cache.stats()["scans"] == 1
+        assert cache._size == 30
+
+    def test_recently_used_entries_are_not_evicted(self, tmp_path):
+        cache = PhotoDiskCache(str(tmp_path), max_bytes=15)
+        _fill(cache, "a", b"x" * 10)
+        _fill(cache, "b", b"y" * 10)
+
+        # Both are within EVICT_GRACE: a hit may be about to send them as files
+        assert cache.get("a") is not None
+        assert cache.get("b") is not None
+
+    def test_invalidate(self, tmp_path):
+        cache = PhotoDiskCache(str(tmp_path), max_bytes=1024)
+        _fill(cache, "photos/a.jpg", b"data")
+
+        cache.invalidate("photos/a.jpg")
+        cache.invalidate("photos/never-cached.jpg")
+
+        assert cache.get("photos/a.jpg") is None
+
+    def test_disabled_without_directory(self, monkeypatch):
+        monkeypatch.delenv("PHOTO_CACHE_DIR", raising=False)
+        assert PhotoDiskCache.from_env() is None
@@ -0,0 +1,130 @@
+"""
+Unit tests for PhotoJobQueue.
+
+The queue runs against the in-memory SQLite ``db_session``; the processing
+step (PhotoService.process_staged_photo) is replaced per test so retry and
+failure handling can be driven directly.
+"""
+
+import asyncio
+import sys
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from app.modules.photos.jobs import PhotoJobQueue
+from app.modules.photos.models import Photo, PhotoJob
+from app.modules.tests.models import Tests
+
+_service_mod = sys.modules["app.modules.photos.service"]
+
+
+@pytest.fixture()
+def queue(db_session):
+    return PhotoJobQueue(
+        session_factory=sessionmaker(bind=db_session.get_bind()),
+        consumers=0,
+        poll_interval=0.01,
+        max_attempts=3,
+        backoff=10,
+    )
+
+
+def _seed_job(db, queue) -> int:
+    test = Tests(product_id=1, test_type="incoming", requester="Alice", status="open")
+    db.add(test)
+    db.flush()
+    photo = Photo(test_id=test.id, file_path="staging/abc", status="processing",
+                  time_stamp=datetime.now(timezone.utc))
+    db.add(photo)
+    job = queue.enqueue(db, photo, "staging/abc", "a.jpg")
+    db.commit()
+    return job.id
+
+
+class TestPhotoJobQueue:
+    async def test_idle_queue(self, queue):
+        assert await queue.run_once() is False
+
+    async def test_transient_error_is_retried_with_backoff(self, queue, db_session, mock_photo_storage, monkeypatch):
+        job_id = _seed_job(db_session, queue)
+        monkeypatch.setattr(
+            _service_mod.photo_service, "process_staged_photo", AsyncMock(side_effect=ConnectionError("minio down"))
+        )
+
+        assert await queue.run_once() is True
+
+        db_session.expire_all()
+        job = db_session.get(PhotoJob, job_id)
+        assert job.status == "queued" and job.attempts == 1
+        assert job.last_error == "minio down"
+        next_run = job.next_run_at.replace(tzinfo=timezone.utc)
+        assert next_run > datetime.now(timezone.utc) + timedelta(seconds=5)
+        # Not due yet
+        assert await queue.run_once() is False
+        assert queue.stats()["retried"] == 1
+
+    async def test_exhausted_attempts_fail_the_photo(self, queue, db_session, mock_photo_storage, monkeypatch):
+        job_id = _seed_job(db_session, queue)
+        db_session.get(PhotoJob, job_id).attempts = 2
+        db_session.commit()
+        monkeypatch.setattr(
+            _service_mod.photo_service, "process_staged_photo", AsyncMock(side_effect=ConnectionError("minio down"))
+        )
+
+        await queue.run_once()
+
+        db_session.expire_all()
+        job = db_session.get(PhotoJob, job_id)
+        assert job.status == "failed" and job.attempts == 3
+        assert job.photo.status == "failed"
+        # Transient failure: raw bytes are kept for a manual retry
+        mock_photo_storage.delete_photo.assert_not_awaited()
+
+    async def test_invalid_image_fails_immediately(self, queue, db_session, mock_photo_storage, monkeypatch):
+        job_id = _seed_job(db_session, queue)
+        monkeypatch.setattr(
+            _service_mod.photo_service, "process_staged_photo", AsyncMock(side_effect=ValueError("Corrupted image file"))
+        )
+
+        await queue.run_once()
+
+        db_session.expire_all()
+        job = db_session.get(PhotoJob, job_id)
+        assert job.status == "failed" and job.attempts == 1
+        assert job.photo.status == "failed"
+        mock_photo_storage.delete_photo.assert_awaited_once_with("staging/abc")
+
+    def test_stale_running_jobs_are_requeued(self, queue, db_session):
+        job_id = _seed_job(db_session, queue)
+        job = db_session.get(PhotoJob, job_id)
+        job.status = "running"
+        job.locked_at = datetime.now(timezone.utc) - timedelta(seconds=queue.stale_after + 60)
+        db_session.commit()
+
+        assert queue.requeue_stale(db_session) == 1
+        db_session.expire_all()
+        assert db_session.get(PhotoJob, job_id).status == "queued"
+
+    async def test_drain_waits_for_running_job(self, queue, db_session, monkeypatch):
+        job_id = _seed_job(db_session, queue)
+        started = asyncio.Event()
+
+        async def _slow(db, job):
+            started.set()
+            await asyncio.sleep(0.05)
+            job.status = "done"
+            db.commit()
+
+        monkeypatch.setattr(_service_mod.photo_service, "process_staged_photo", _slow)
+        queue.consumers = 1
+        queue.start()
+        await started.wait()
+
+        await queue.drain(timeout=5)
+
+        db_session.expire_all()
+        assert db_session.get(PhotoJob, job_id).status == "done"
+        assert queue.stats()["consumers"] == 0
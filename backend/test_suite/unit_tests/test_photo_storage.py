@@ -0,0 +1,153 @@
+"""
+Unit tests for PhotoStorage and its backends.
+
+PhotoStorage is exercised against a real FilesystemBackend in ``tmp_path``
+(blocking calls must land on the storage I/O pool and be timed per
+operation).  MinioBackend is checked with a MagicMock client, so no
+``minio`` package or server is needed.
+"""
+
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.modules.photos.backends import FilesystemBackend, MinioBackend
+from app.modules.photos.storage import LatencyHistogram, PhotoStorage, render_path, tile_path
+
+
+@pytest.fixture()
+def storage(tmp_path):
+    s = PhotoStorage(backend=FilesystemBackend(str(tmp_path)))
+    yield s
+    s.shutdown()
+
+
+class TestPhotoStorageIO:
+    async def test_calls_run_off_the_event_loop_thread(self, storage, monkeypatch):
+        loop_thread = threading.get_ident()
+        seen = {}
+        real_put = storage.backend.put
+
+        def _put(key, data, content_type):
+            seen["thread"] = threading.get_ident()
+            real_put(key, data, content_type)
+
+        monkeypatch.setattr(storage.backend, "put", _put)
+
+        await storage.upload_photo(b"abc", "photos/x.jpg", "image/jpeg")
+
+        assert seen["thread"] != loop_thread
+        assert await storage.get_photo("photos/x.jpg") == b"abc"
+        assert storage.stats()["operations"]["put"]["count"] == 1
+
+    async def test_failures_are_recorded(self, storage):
+        with pytest.raises(FileNotFoundError):
+            await storage.stat_photo("photos/missing.jpg")
+        assert storage.stats()["operations"]["stat"]["errors"] == 1
+
+    async def test_delete_removes_all_variants(self, storage):
+        for key in ("photos/x.jpg", "photos/x_thumb.jpg", "photos/x_preview.jpg"):
+            await storage.upload_photo(b"data", key, "image/jpeg")
+
+        await storage.delete_photo("photos/x.jpg")
+
+        for key in ("photos/x.jpg", "photos/x_thumb.jpg", "photos/x_preview.jpg"):
+            assert not storage.backend.exists(key)
+
+    async def test_delete_removes_renditions(self, storage):
+        await storage.upload_photo(b"data", "photos/x.jpg", "image/jpeg")
+        await storage.upload_photo(b"webp", render_path("photos/x.jpg", 320, None, "contain", "webp"), "image/webp")
+        await storage.upload_photo(b"other", "renders/photos/y/320x0-contain.webp", "image/webp")
+        await storage.upload_photo(b"tile", tile_path("photos/x.jpg", "0/0/0"), "image/jpeg")
+
+        await storage.delete_photo("photos/x.jpg")
+
+        assert not storage.backend.exists("renders/photos/x/320x0-contain.webp")
+        assert not storage.backend.exists("tiles/photos/x/0/0/0.jpg")
+        assert storage.backend.exists("renders/photos/y/320x0-contain.webp")
+
+
+class TestFilesystemBackend:
+    async def test_stat_points_at_local_file(self, storage):
+        await storage.upload_photo(b"0123456789", "photos/x.jpg", "image/jpeg")
+
+        info = await storage.stat_photo("photos/x.jpg")
+        assert info.size == 10
+        assert info.content_type == "image/jpeg"
+        assert info.etag.startswith('"')
+        with open(info.local_path, "rb") as fh:
+            assert fh.read() == b"0123456789"
+
+    async def test_ranged_stream(self, storage):
+        await storage.upload_photo(b"0123456789", "photos/x.jpg", "image/jpeg")
+
+        chunks = [c async for c in await storage.stream_photo("photos/x.jpg", offset=2, length=5, chunk_size=2)]
+        assert chunks == [b"23", b"45", b"6"]
+
+    async def test_direct_uploads_are_not_supported(self, storage):
+        with pytest.raises(NotImplementedError):
+            await storage.generate_presigned_put_url("staging/x")
+
+    def test_rejects_keys_outside_root(self, tmp_path):
+        backend = FilesystemBackend(str(tmp_path))
+        with pytest.raises(ValueError):
+            backend.put("../escape.jpg", b"x", "image/jpeg")
+
+
+class TestMinioBackend:
+    def test_bucket_setup_is_deferred_until_first_use(self):
+        client = MagicMock()
+        client.bucket_exists.return_value = True
+        backend = MinioBackend(client=client)
+        client.bucket_exists.assert_not_called()
+
+        backend.delete("photos/x.jpg")
+        backend.delete("photos/y.jpg")
+        client.bucket_exists.assert_called_once()
+
+    def test_open_streams_and_releases_connection(self):
+        client = MagicMock()
+        response = MagicMock()
+        response.headers = {"Content-Length": "4", "ETag": '"e"'}
+        response.stream.return_value = iter([b"ab", b"cd"])
+        client.get_object.return_value = response
+        backend = MinioBackend(client=client)
+
+        info, chunks = backend.open("photos/x.jpg", offset=1, length=4)
+
+        assert info.size == 4 and info.etag == '"e"'
+        assert list(chunks) == [b"ab", b"cd"]
+        client.get_object.assert_called_once_with(
+            bucket_name=backend.bucket_name, object_name="photos/x.jpg", offset=1, length=4
+        )
+        response.release_conn.assert_called_once()
+
+
+    def test_presigned_put_is_signed_for_the_public_endpoint(self):
+        client, signer = MagicMock(), MagicMock()
+        client.bucket_exists.return_value = True
+        signer.presigned_put_object.return_value = "http://localhost:9000/b/staging/x?sig"
+        backend = MinioBackend(client=client, signing_client=signer)
+
+        assert backend.presigned_put_url("staging/x", 900) == "http://localhost:9000/b/staging/x?sig"
+        kwargs = signer.presigned_put_object.call_args.kwargs
+        assert kwargs["object_name"] == "staging/x"
+        assert kwargs["expires"].total_seconds() == 900
+        client.presigned_put_object.assert_not_called()
+
+
+class TestLatencyHistogram:
+    def test_buckets(self):
+        hist = LatencyHistogram()
+        hist.observe(0.004)
+        hist.observe(0.2)
+        hist.observe(9.0, error=True)
+
+        snap = hist.snapshot()
+        assert snap["count"] == 3
+        assert snap["errors"] == 1
+        assert snap["buckets"]["le_5ms"] == 1
+        assert snap["buckets"]["le_250ms"] == 1
+        assert snap["buckets"]["gt_5000ms"] == 1
+        assert snap["max_ms"] == 9000.0
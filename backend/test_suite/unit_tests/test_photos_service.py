@@ -3,15 +3,33 @@ Unit tests for PhotoService – image validation rules and processing logic.
 
 No database or MinIO interaction: every test works entirely with in-memory
 PIL images / BytesIO buffers.  A fresh ``PhotoService()`` is provided by the
-``svc`` fixture (its internal PhotoStorage instance is harmless because the
-``minio`` package is stubbed in conftest).
+``svc`` fixture (its PhotoStorage is harmless because conftest selects the
+filesystem backend in a temp directory).
 """
 
+import asyncio
+import base64
+import hashlib
+import threading
+import time
 import pytest
 from io import BytesIO
+from unittest.mock import MagicMock
 from PIL import Image
 
 from app.modules.photos.service import PhotoService
+from app.modules.photos.processing import (
+    DecodeBudget,
+    decoded_bytes,
+    make_derivatives,
+    process_upload,
+    build_tile_pyramid,
+    render_image,
+    render_size,
+    tile_levels,
+    validate_image,
+)
+from app.modules.photos import processing
 
 
 # ---------------------------------------------------------------------------
@@ -80,6 +98,17 @@ class TestValidatePhoto:
         with pytest.raises(ValueError, match="[Ii]nvalid"):
             await svc.validate_photo(BytesIO(b"definitely not an image"), "bad.jpg")
 
+    async def test_pixel_budget_rejects_on_header(self, svc, monkeypatch):
+        monkeypatch.setattr(processing, "MAX_PIXELS", 10_000)
+        with pytest.raises(ValueError, match="20000 pixels"):
+            await svc.validate_photo(_make_image(200, 100), "wide.jpg")
+
+    def test_only_the_header_is_parsed(self):
+        # Truncated pixel data is not noticed until the pipeline decodes it
+        data = _make_image(640, 480).getvalue()
+        img = validate_image(BytesIO(data[: len(data) // 2]), "cut.jpg")
+        assert img.size == (640, 480)
+
 
 # ---------------------------------------------------------------------------
 # process_image  –  resize & colour-mode conversion
@@ -98,6 +127,14 @@ class TestProcessImage:
         result = await svc.process_image(img, max_dimension=2000)
         assert result.size == (400, 300)
 
+    async def test_large_jpeg_uses_reduced_dct_decode(self, svc):
+        src = Image.open(_make_image(6000, 4000))
+        result = await svc.process_image(src, max_dimension=2000)
+
+        assert result.size == (2000, 1333)
+        # draft() decoded at 1/2 scale: still covers the target, never 24MP
+        assert src.size == (3000, 2000)
+
     async def test_color_mode_conversions(self, svc):
         # RGBA → RGB
         img = Image.new("RGBA", (50, 50), (255, 0, 0, 128))
@@ -130,3 +167,284 @@ class TestImageToBytes:
         high = svc.image_to_bytes(img, format="JPEG", quality=95)
         low = svc.image_to_bytes(img, format="JPEG", quality=10)
         assert len(low) < len(high)
+
+
+# ---------------------------------------------------------------------------
+# make_derivatives  –  thumb / preview renditions
+# ---------------------------------------------------------------------------
+
+
+class TestMakeDerivatives:
+    def test_variants_are_bounded_and_keep_aspect_ratio(self):
+        derivatives = make_derivatives(Image.new("RGB", (2000, 1000)))
+        assert set(derivatives) == {"thumb", "preview"}
+
+        thumb = Image.open(BytesIO(derivatives["thumb"]))
+        preview = Image.open(BytesIO(derivatives["preview"]))
+        assert thumb.format == preview.format == "JPEG"
+        assert thumb.size == (300, 150)
+        assert preview.size == (1024, 512)
+
+    def test_small_images_are_not_upscaled(self):
+        derivatives = make_derivatives(Image.new("RGB", (120, 80)))
+        assert Image.open(BytesIO(derivatives["thumb"])).size == (120, 80)
+
+    def test_upload_carries_tiny_placeholder(self):
+        processed = process_upload(_make_image(1600, 1200).getvalue(), "a.jpg")
+
+        prefix = "data:image/jpeg;base64,"
+        assert processed.placeholder.startswith(prefix)
+        assert len(processed.placeholder) < 1500
+        placeholder = Image.open(BytesIO(base64.b64decode(processed.placeholder[len(prefix):])))
+        assert placeholder.size == (32, 24)
+
+
+# ---------------------------------------------------------------------------
+# On-the-fly renditions
+# ---------------------------------------------------------------------------
+
+
+class TestRenderImage:
+    def test_contain_and_cover_sizes(self):
+        assert render_size((2000, 1000), 640, 640, "contain") == (640, 320)
+        assert render_size((2000, 1000), 640, None, "contain") == (640, 320)
+        assert render_size((2000, 1000), 640, 640, "cover") == (1280, 640)
+        # Never upscaled
+        assert render_size((300, 200), 1024, 1024, "contain") == (300, 200)
+
+    def test_cover_is_cropped_to_the_box(self):
+        data = render_image(_make_image(2000, 1000).getvalue(), 640, 640, "cover", "jpeg")
+        assert Image.open(BytesIO(data)).size == (640, 640)
+
+    def test_cover_with_only_width_scales_to_it(self):
+        data = render_image(_make_image(2000, 1500).getvalue(), 256, None, "cover", "jpeg")
+        assert Image.open(BytesIO(data)).size == (256, 192)
+
+    def test_cover_with_only_height_scales_to_it(self):
+        data = render_image(_make_image(2000, 1500).getvalue(), None, 256, "cover", "jpeg")
+        assert Image.open(BytesIO(data)).size == (341, 256)
+
+    def test_webp_output(self):
+        data = render_image(_make_image(800, 600, mode="RGBA", fmt="PNG").getvalue(), 320, None, "contain", "webp")
+        img = Image.open(BytesIO(data))
+        assert img.format == "WEBP"
+        assert img.size == (320, 240)
+
+
+# ---------------------------------------------------------------------------
+# Deep-zoom tile pyramid
+# ---------------------------------------------------------------------------
+
+
+class TestTilePyramid:
+    def test_levels(self):
+        assert tile_levels(200, 100, 256) == 1
+        assert tile_levels(256, 256, 256) == 1
+        assert tile_levels(600, 300, 256) == 3
+        assert tile_levels(2000, 1500, 256) == 4
+
+    def test_tiles_cover_every_level(self):
+        pyramid = build_tile_pyramid(_make_image(600, 300).getvalue(), tile_size=256)
+
+        assert pyramid.levels == 3
+        # 600x300 -> 3x2 tiles, 300x150 -> 2x1, 150x75 -> 1x1
+        assert sorted(pyramid.tiles) == sorted(
+            ["2/0/0", "2/1/0", "2/2/0", "2/0/1", "2/1/1", "2/2/1", "1/0/0", "1/1/0", "0/0/0"]
+        )
+        assert Image.open(BytesIO(pyramid.tiles["2/0/0"])).size == (256, 256)
+        # Edge tiles are cropped to the image
+        assert Image.open(BytesIO(pyramid.tiles["2/2/1"])).size == (88, 44)
+        assert Image.open(BytesIO(pyramid.tiles["0/0/0"])).size == (150, 75)
+
+
+# ---------------------------------------------------------------------------
+# Decode memory budget
+# ---------------------------------------------------------------------------
+
+
+class TestDecodeBudget:
+    def test_jpeg_estimate_follows_draft_scale(self):
+        jpeg = Image.open(_make_image(8192, 5464))
+        assert decoded_bytes(jpeg, 2000) == 2048 * 1366 * 4
+        assert decoded_bytes(jpeg, 10000) == 8192 * 5464 * 4
+
+        png = Image.open(_make_image(4000, 3000, fmt="PNG"))
+        assert decoded_bytes(png, 2000) == 4000 * 3000 * 4
+
+    def test_large_decodes_do_not_overlap(self):
+        budget = DecodeBudget(max_mb=10)
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def _decode():
+            with budget.reserve(8 * 1024 * 1024):
+                with lock:
+                    active[0] += 1
+                    peak[0] = max(peak[0], active[0])
+                time.sleep(0.05)
+                with lock:
+                    active[0] -= 1
+
+        threads = [threading.Thread(target=_decode) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert peak[0] == 1
+
+    def test_oversized_job_is_clamped_to_budget(self):
+        budget = DecodeBudget(max_mb=4)
+        with budget.reserve(100 * 1024 * 1024) as units:
+            assert units == 4
+
+
+# ---------------------------------------------------------------------------
+# process_upload  –  JPEG passthrough fast path
+# ---------------------------------------------------------------------------
+
+
+class TestJpegPassthrough:
+    def test_compliant_jpeg_is_stored_unchanged(self):
+        data = _make_image(640, 480).getvalue()
+        processed = process_upload(data, "a.jpg")
+
+        assert processed.passthrough is True
+        assert processed.data == data
+        assert (processed.width, processed.height) == (640, 480)
+        assert set(processed.derivatives) == {"thumb", "preview"}
+
+    @pytest.mark.parametrize(
+        "kwargs",
+        [
+            {"width": 2500, "height": 100},          # needs downscaling
+            {"mode": "RGBA", "fmt": "PNG"},          # not a JPEG
+        ],
+    )
+    def test_non_compliant_inputs_are_reencoded(self, kwargs):
+        data = _make_image(**kwargs).getvalue()
+        processed = process_upload(data, "a.img")
+
+        assert processed.passthrough is False
+        out = Image.open(BytesIO(processed.data))
+        assert out.format == "JPEG" and out.mode == "RGB"
+        assert max(out.size) <= 2000
+
+    def test_reported_size_is_the_stored_image(self):
+        processed = process_upload(_make_image(1800, 1200).getvalue(), "a.jpg")
+
+        assert processed.passthrough is True
+        assert (processed.width, processed.height) == (1800, 1200)
+        assert Image.open(BytesIO(processed.derivatives["preview"])).size == (1024, 682)
+
+    def test_exif_jpeg_is_reencoded_upright_without_metadata(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # rotate 90° clockwise to display
+        exif[0x010F] = "CamMaker"
+        buf = BytesIO()
+        Image.new("RGB", (600, 300), (10, 20, 30)).save(buf, format="JPEG", exif=exif)
+
+        processed = process_upload(buf.getvalue(), "phone.jpg")
+
+        assert processed.passthrough is False
+        full = Image.open(BytesIO(processed.data))
+        assert full.size == (300, 600) == (processed.width, processed.height)
+        assert not full.info.get("exif")
+        # Derivatives agree with the full image
+        assert Image.open(BytesIO(processed.derivatives["thumb"])).size == (150, 300)
+        placeholder = base64.b64decode(processed.placeholder.split(",", 1)[1])
+        assert Image.open(BytesIO(placeholder)).size == (16, 32)
+
+    def test_cmyk_jpeg_is_reencoded(self):
+        buf = BytesIO()
+        Image.new("CMYK", (100, 100)).save(buf, format="JPEG")
+        assert process_upload(buf.getvalue(), "cmyk.jpg").passthrough is False
+
+    def test_can_be_disabled(self, monkeypatch):
+        monkeypatch.setattr(processing, "JPEG_PASSTHROUGH", False)
+        data = _make_image(640, 480).getvalue()
+        assert process_upload(data, "a.jpg").passthrough is False
+
+    def test_truncated_jpeg_is_a_validation_error(self):
+        data = _make_image(640, 480).getvalue()
+        with pytest.raises(ValueError):
+            process_upload(data[: len(data) // 2], "cut.jpg")
+
+
+# ---------------------------------------------------------------------------
+# Content-addressed paths
+# ---------------------------------------------------------------------------
+
+
+class TestContentPath:
+    def test_path_is_derived_from_processed_bytes(self, svc):
+        processed = process_upload(_make_image().getvalue(), "a.jpg")
+        digest = hashlib.sha256(processed.data).hexdigest()
+
+        assert processed.sha256 == digest
+        assert svc.content_path(processed) == f"photos/{digest[:2]}/{digest}.jpg"
+
+    def test_identical_uploads_share_a_path(self, svc):
+        data = _make_image().getvalue()
+        first = process_upload(data, "a.jpg")
+        second = process_upload(data, "a-retry.jpg")
+        assert svc.content_path(first) == svc.content_path(second)
+
+
+# ---------------------------------------------------------------------------
+# upload_photos  –  bounded concurrency + bulk insert
+# ---------------------------------------------------------------------------
+
+
+class TestUploadPhotos:
+    async def test_ingests_concurrently_up_to_the_limit(self, svc, monkeypatch):
+        active, peak = [0], [0]
+
+        async def _ingest(file, filename):
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.01)
+            active[0] -= 1
+            if filename == "bad.jpg":
+                raise ValueError("Invalid image file")
+            return MagicMock(sha256=filename, placeholder="")
+
+        async def _store(processed):
+            return f"photos/{processed.sha256}"
+
+        monkeypatch.setattr(svc, "ingest_photo", _ingest)
+        monkeypatch.setattr(svc, "store_processed", _store)
+        db = MagicMock()
+        files = [(BytesIO(), name) for name in ("a.jpg", "bad.jpg", "c.jpg", "d.jpg", "e.jpg")]
+
+        results = await svc.upload_photos(db, files, test_id=7, concurrency=2)
+
+        assert peak[0] == 2
+        assert isinstance(results[1], ValueError)
+        assert [r.file_path for i, r in enumerate(results) if i != 1] == [
+            "photos/a.jpg", "photos/c.jpg", "photos/d.jpg", "photos/e.jpg"
+        ]
+        # One bulk insert, one commit
+        db.add_all.assert_called_once()
+        db.commit.assert_called_once()
+
+
+class TestContentLock:
+    async def test_takes_advisory_locks_in_sorted_order_on_postgres(self, svc, monkeypatch):
+        monkeypatch.setattr(svc, "CONTENT_LOCK_POLL", 0)
+        db = MagicMock()
+        db.get_bind.return_value.dialect.name = "postgresql"
+        # First attempt on "photos/a" finds it held by another transaction
+        db.execute.return_value.scalar.side_effect = [False, True, True]
+
+        await svc.lock_content(db, ["photos/b", "photos/a", "photos/b"])
+
+        statements = [str(call.args[0].compile(compile_kwargs={"literal_binds": True})) for call in db.execute.call_args_list]
+        assert len(statements) == 3
+        assert "pg_try_advisory_xact_lock(hashtext('photos/a'))" in statements[0]
+        assert "'photos/a'" in statements[1] and "'photos/b'" in statements[2]
+
+    async def test_no_op_on_other_databases(self, svc):
+        db = MagicMock()
+        db.get_bind.return_value.dialect.name = "sqlite"
+        await svc.lock_content(db, ["photos/a"])
+        db.execute.assert_not_called()
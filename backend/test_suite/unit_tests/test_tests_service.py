@@ -75,36 +75,43 @@ class TestGetTest:
 
 
 # ---------------------------------------------------------------------------
-# get_all_tests  –  skip / limit forwarding
+# get_all_tests  –  sort / skip / limit forwarding
 # ---------------------------------------------------------------------------
 
 
 class TestGetAllTests:
     async def test_pagination(self, mock_db):
         tests = [MagicMock(), MagicMock()]
-        (
-            mock_db.query.return_value
-            .offset.return_value
-            .limit.return_value
-            .all.return_value
-        ) = tests
+        ordered = mock_db.query.return_value.order_by.return_value
+        ordered.offset.return_value.limit.return_value.all.return_value = tests
 
-        result = await tests_service.get_all_tests(mock_db, skip=2, limit=3)
+        result, next_cursor = await tests_service.get_all_tests(mock_db, skip=2, limit=3)
 
         assert result == tests
-        # Verify skip and limit were forwarded to the query chain
-        mock_db.query.return_value.offset.assert_called_with(2)
-        mock_db.query.return_value.offset.return_value.limit.assert_called_with(3)
+        assert next_cursor is None
+        # Verify skip and limit (plus the look-ahead row) were forwarded to the query chain
+        ordered.offset.assert_called_with(2)
+        ordered.offset.return_value.limit.assert_called_with(4)
+
+    async def test_full_page_returns_cursor(self, mock_db):
+        tests = [MagicMock(id=i) for i in range(3)]
+        ordered = mock_db.query.return_value.order_by.return_value
+        ordered.offset.return_value.limit.return_value.all.return_value = tests
+
+        result, next_cursor = await tests_service.get_all_tests(mock_db, limit=2)
+
+        assert result == tests[:2]
+        assert next_cursor is not None
 
     async def test_empty_database_returns_empty_list(self, mock_db):
-        (
-            mock_db.query.return_value
-            .offset.return_value
-            .limit.return_value
-            .all.return_value
-        ) = []
-
-        assert await tests_service.get_all_tests(mock_db) == []
+        ordered = mock_db.query.return_value.order_by.return_value
+        ordered.offset.return_value.limit.return_value.all.return_value = []
+
+        assert await tests_service.get_all_tests(mock_db) == ([], None)
+
+    async def test_rejects_unknown_sort(self, mock_db):
+        with pytest.raises(ValueError):
+            await tests_service.get_all_tests(mock_db, sort="requester")
 
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,72 @@
+"""
+Unit tests for resumable upload sessions – range bookkeeping, out-of-order
+and repeated chunks, bounds checks and expiry.
+
+Every test uses its own UploadSessionStore in ``tmp_path``.
+"""
+
+import time
+
+import pytest
+
+from app.modules.photos.uploads import (
+    UploadSessionNotFound,
+    UploadSessionStore,
+    merge_ranges,
+    missing_ranges,
+)
+
+
+@pytest.fixture()
+def store(tmp_path):
+    return UploadSessionStore(str(tmp_path))
+
+
+class TestRanges:
+    def test_merge_and_missing(self):
+        received = merge_ranges([(6, 10), (0, 2), (2, 4), (8, 9)])
+        assert received == [[0, 4], [6, 10]]
+        assert missing_ranges(received, 12) == [[4, 6], [10, 12]]
+        assert missing_ranges([], 5) == [[0, 5]]
+        assert missing_ranges([[0, 5]], 5) == []
+
+
+class TestUploadSessionStore:
+    def test_out_of_order_and_repeated_chunks_assemble(self, store):
+        upload_id = store.create(1, "a.jpg", 10, "image/jpeg")["upload_id"]
+
+        store.write_chunk(upload_id, 6, [b"6789"])
+        state = store.write_chunk(upload_id, 0, [b"012"])
+        assert state["missing"] == [[3, 6]]
+        assert not state["complete"]
+
+        store.write_chunk(upload_id, 0, [b"012"])  # retry of a chunk already received
+        state = store.write_chunk(upload_id, 3, [b"34", b"5"])
+        assert state["complete"] and state["received_bytes"] == 10
+
+        with open(store.data_path(upload_id), "rb") as fh:
+            assert fh.read() == b"0123456789"
+
+    def test_chunk_past_declared_size_is_rejected(self, store):
+        upload_id = store.create(1, "a.jpg", 4, "image/jpeg")["upload_id"]
+        with pytest.raises(ValueError):
+            store.write_chunk(upload_id, 2, [b"xyz"])
+        with pytest.raises(ValueError):
+            store.write_chunk(upload_id, 4, [b"x"])
+        assert store.get(upload_id)["received_bytes"] == 0
+
+    def test_unknown_and_malformed_ids(self, store):
+        with pytest.raises(UploadSessionNotFound):
+            store.get("0" * 32)
+        with pytest.raises(UploadSessionNotFound):
+            store.get("../../etc")
+
+    def test_expired_sessions_are_gone_and_purged(self, tmp_path):
+        store = UploadSessionStore(str(tmp_path), ttl_seconds=0)
+        upload_id = store.create(1, "a.jpg", 4, "image/jpeg")["upload_id"]
+        time.sleep(0.01)
+
+        with pytest.raises(UploadSessionNotFound):
+            store.get(upload_id)
+        assert store.purge_expired() == 1
+        assert not (tmp_path / upload_id).exists()
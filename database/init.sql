@@ -59,10 +59,72 @@ CREATE TABLE IF NOT EXISTS photos (
 
   file_path       TEXT NOT NULL,
   time_stamp      TIMESTAMPTZ NOT NULL DEFAULT now(),
-  analysis_results TEXT
+  analysis_results TEXT,
+
+  -- bumped on every defect/annotation change, used as the defect list ETag
+  defects_version INT NOT NULL DEFAULT 0,
+
+  -- ready | processing (async upload queued) | failed
+  status          VARCHAR(20) NOT NULL DEFAULT 'ready',
+
+  -- tiny base64 JPEG data URI (LQIP) shown until the image has loaded
+  placeholder     TEXT
 );
 
+-- columns added after the first release: CREATE TABLE IF NOT EXISTS leaves
+-- an existing photos table alone, so add them explicitly (re-running this
+-- file upgrades an existing database)
+ALTER TABLE photos ADD COLUMN IF NOT EXISTS defects_version INT NOT NULL DEFAULT 0;
+ALTER TABLE photos ADD COLUMN IF NOT EXISTS status          VARCHAR(20) NOT NULL DEFAULT 'ready';
+ALTER TABLE photos ADD COLUMN IF NOT EXISTS placeholder     TEXT;
+
 CREATE INDEX IF NOT EXISTS idx_photos_test_id ON photos(test_id);
+-- keyset pagination of a test's photos: ORDER BY time_stamp, id
+CREATE INDEX IF NOT EXISTS idx_photos_test_time ON photos(test_id, time_stamp, id);
+-- cross-test gallery feed: ORDER BY time_stamp DESC, id DESC
+CREATE INDEX IF NOT EXISTS idx_photos_time ON photos(time_stamp, id);
+
+
+-- photos uploaded by clients straight to object storage (presigned PUT),
+-- tracked until background ingestion has created the photos row
+CREATE TABLE IF NOT EXISTS photo_direct_uploads (
+  id            VARCHAR(32) PRIMARY KEY,
+
+  test_id INT NOT NULL REFERENCES quality_tests(id) ON DELETE CASCADE,
+
+  filename      TEXT NOT NULL,
+  content_type  VARCHAR(100) NOT NULL,
+  staging_key   TEXT NOT NULL,
+  status        VARCHAR(20) NOT NULL DEFAULT 'awaiting_upload',
+  photo_id      INT REFERENCES photos(id) ON DELETE SET NULL,
+  error         TEXT,
+  created_at    TIMESTAMPTZ NOT NULL DEFAULT now(),
+  updated_at    TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_photo_direct_uploads_test_id ON photo_direct_uploads(test_id);
+
+
+-- persistent processing queue for async uploads (claimed with FOR UPDATE SKIP LOCKED)
+CREATE TABLE IF NOT EXISTS photo_jobs (
+  id            SERIAL PRIMARY KEY,
+
+  photo_id INT NOT NULL REFERENCES photos(id) ON DELETE CASCADE,
+
+  filename      TEXT NOT NULL,
+  staging_key   TEXT NOT NULL,
+  status        VARCHAR(20) NOT NULL DEFAULT 'queued',
+  attempts      INT NOT NULL DEFAULT 0,
+  max_attempts  INT NOT NULL DEFAULT 5,
+  next_run_at   TIMESTAMPTZ NOT NULL DEFAULT now(),
+  locked_at     TIMESTAMPTZ,
+  last_error    TEXT,
+  created_at    TIMESTAMPTZ NOT NULL DEFAULT now(),
+  updated_at    TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_photo_jobs_photo_id ON photo_jobs(photo_id);
+CREATE INDEX IF NOT EXISTS idx_photo_jobs_due      ON photo_jobs(status, next_run_at);
 
 
 
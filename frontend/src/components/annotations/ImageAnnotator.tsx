@@ -43,6 +43,9 @@ export function ImageAnnotator({
 
   // Load image
   useEffect(() => {
+    if (!imageUrl) {
+      return;
+    }
     const img = new window.Image();
     img.crossOrigin = 'anonymous';
     img.onload = () => {
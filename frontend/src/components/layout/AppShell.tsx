@@ -1,4 +1,4 @@
-import { useCallback, useEffect, useMemo, useState } from 'react';
+import { useCallback, useEffect, useMemo, useRef, useState } from 'react';
 import { Outlet, NavLink, useNavigate } from 'react-router-dom';
 import { photos as initialPhotos, tests as initialTests } from '../../mock/data';
 import type { AuditEvent, Photo, Test } from '../../mock/data';
@@ -20,8 +20,21 @@ export type AppDataContext = {
     removePhoto: (photoId: string) => void;
     updateTest: (testId: string, updates: Partial<Test>) => void;
     refreshTests: () => Promise<void>;
+    hasMoreTests: boolean;
+    loadMoreTests: () => Promise<void>;
+    loadTest: (testId: string) => Promise<void>;
+    testFilters: TestFilters;
+    setTestFilters: (filters: TestFilters) => void;
 };
 
+/** Filters of the tests list, applied by GET /api/v1/tests/ so they cover every page. */
+export type TestFilters = {
+    q?: string;
+    status?: string;
+};
+
+const TESTS_PAGE_SIZE = 100;
+
 const STORAGE_KEYS = {
     photos: 'qc-vision:photos',
     audit: 'qc-vision:audit-events',
@@ -98,12 +111,44 @@ const toFrontendTest = (raw: ApiTest): Test => {
     };
 };
 
+/** One page of tests, newest first; the next page's cursor comes in X-Next-Cursor. */
+const fetchTestsPage = async (cursor: string | null, filters: TestFilters) => {
+    const params = new URLSearchParams({ limit: String(TESTS_PAGE_SIZE), sort: '-id' });
+    if (cursor) {
+        params.set('cursor', cursor);
+    }
+    if (filters.q) {
+        params.set('q', filters.q);
+    }
+    if (filters.status) {
+        params.set('status', filters.status);
+    }
+    const response = await fetch(`/api/v1/tests/?${params}`);
+    console.log('[refreshTests] Response status:', response.status);
+    if (!response.ok) {
+        throw new Error(`Failed to load tests (${response.status})`);
+    }
+    const payload = await response.json();
+    if (import.meta.env.DEV) {
+        console.log('[Tests] GET /api/v1/tests/ response:', payload);
+    }
+    const rawTests: ApiTest[] = Array.isArray(payload) ? payload : [];
+    return {
+        tests: rawTests.map((test: ApiTest) => toFrontendTest(test)),
+        nextCursor: response.headers.get('X-Next-Cursor'),
+    };
+};
+
 export function AppShell() {
     const navigate = useNavigate();
     const [tests, setTests] = useState<Test[]>(initialTests);
     const [auditEvents, setAuditEvents] = useState<AuditEvent[]>([]);
     const [photos, setPhotos] = useState<Photo[]>(initialPhotos);
     const [testsLoaded, setTestsLoaded] = useState(false);
+    const [testsCursor, setTestsCursor] = useState<string | null>(null);
+    const [testFilters, setTestFilters] = useState<TestFilters>({});
+    // Bumped per first-page fetch so a slow response for old filters is dropped
+    const testsRequest = useRef(0);
     const [storageHydrated, setStorageHydrated] = useState(false);
     const [deletedTestIds, setDeletedTestIds] = useState<string[]>([]);
 
@@ -165,30 +210,20 @@ export function AppShell() {
     const refreshTests = useCallback(async () => {
         try {
             console.log('[refreshTests] Starting fetch from /api/v1/tests/');
-            const response = await fetch('/api/v1/tests/');
-            console.log('[refreshTests] Response status:', response.status);
-            if (!response.ok) {
-                throw new Error(`Failed to load tests (${response.status})`);
-            }
-            const payload = await response.json();
-            if (import.meta.env.DEV) {
-                console.log('[Tests] GET /api/v1/tests/ response:', payload);
+            // First page only; further pages load on demand via loadMoreTests
+            const request = ++testsRequest.current;
+            // Cursors of the previous filters do not apply to the new ones
+            setTestsCursor(null);
+            const { tests: mapped, nextCursor } = await fetchTestsPage(null, testFilters);
+            if (request !== testsRequest.current) {
+                return;
             }
-            const rawTests = Array.isArray(payload)
-                ? payload
-                : Array.isArray(payload?.items)
-                    ? payload.items
-                    : Array.isArray(payload?.tests)
-                        ? payload.tests
-                        : [];
-
-            console.log('[refreshTests] Raw tests count:', rawTests.length);
-            const mapped = rawTests.map((test: ApiTest) => toFrontendTest(test));
             console.log('[refreshTests] Mapped tests count:', mapped.length);
             
             // Don't filter by deletedTestIds - the API is the source of truth
             // If a test exists in the API, it should be shown
             setTests(mapped);
+            setTestsCursor(nextCursor);
             setTestsLoaded(true);
             
             // Clear deleted IDs since we're syncing with API
@@ -201,7 +236,33 @@ export function AppShell() {
                 console.error('[Tests] Failed to load tests:', error);
             }
         }
-    }, [deletedTestIds]);
+    }, [deletedTestIds, testFilters]);
+
+    const loadMoreTests = useCallback(async () => {
+        if (!testsCursor) {
+            return;
+        }
+        const request = testsRequest.current;
+        const { tests: mapped, nextCursor } = await fetchTestsPage(testsCursor, testFilters);
+        if (request !== testsRequest.current) {
+            return;
+        }
+        setTests((prev) => {
+            const known = new Set(prev.map((test) => test.id));
+            return [...prev, ...mapped.filter((test) => !known.has(test.id))];
+        });
+        setTestsCursor(nextCursor);
+    }, [testsCursor, testFilters]);
+
+    // Tests opened by direct link may lie beyond the pages loaded so far
+    const loadTest = useCallback(async (testId: string) => {
+        const response = await fetch(`/api/v1/tests/${testId}`);
+        if (!response.ok) {
+            return;
+        }
+        const test = toFrontendTest(await response.json());
+        setTests((prev) => (prev.some((existing) => existing.id === test.id) ? prev : [...prev, test]));
+    }, []);
 
     useEffect(() => {
     const loadAuditLogs = async () => {
@@ -288,8 +349,13 @@ export function AppShell() {
             removePhoto,
             updateTest,
             refreshTests,
+            hasMoreTests: testsCursor !== null,
+            loadMoreTests,
+            loadTest,
+            testFilters,
+            setTestFilters,
         }),
-        [tests, testsLoaded, photos, auditEvents, refreshTests],
+        [tests, testsLoaded, photos, auditEvents, refreshTests, testsCursor, loadMoreTests, loadTest, testFilters],
     );
 
     // Reusable nav items data
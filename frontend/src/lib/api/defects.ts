@@ -36,6 +36,8 @@ export type PhotoRecord = {
   test_id?: number | string;
   file_path?: string;
   url?: string;
+  image_url?: string;
+  thumb_url?: string;
 };
 
 export async function getPhoto(photoId: string | number) {
@@ -0,0 +1,100 @@
+import { request } from './http';
+
+const API_BASE = '/api/v1';
+
+export const PHOTO_ENDPOINTS = {
+  testPhotos: (testId: string | number) => `${API_BASE}/photos/test/${testId}`,
+  feed: `${API_BASE}/photos/feed`,
+  lookup: `${API_BASE}/photos/lookup`,
+};
+
+export type PhotoRecord = {
+  id: number;
+  test_id: number;
+  file_path: string;
+  time_stamp: string;
+  status: string;
+  placeholder?: string | null;
+  image_url: string;
+  thumb_url: string;
+};
+
+export type PhotoPage = {
+  photos: PhotoRecord[];
+  limit: number;
+  total: number | null;
+  next_cursor: string | null;
+};
+
+export async function getTestPhotosPage(testId: string | number, cursor?: string | null, limit = 200) {
+  const params = new URLSearchParams({ limit: String(limit) });
+  if (cursor) {
+    params.set('cursor', cursor);
+  }
+  return request<PhotoPage>(`${PHOTO_ENDPOINTS.testPhotos(testId)}?${params}`);
+}
+
+/** All photos of a test, following next_cursor page by page. */
+export async function getAllTestPhotos(testId: string | number) {
+  const photos: PhotoRecord[] = [];
+  let cursor: string | null = null;
+  do {
+    const page: PhotoPage = await getTestPhotosPage(testId, cursor);
+    photos.push(...page.photos);
+    cursor = page.next_cursor;
+  } while (cursor);
+  return photos;
+}
+
+export type PhotoFeedItem = {
+  photo: PhotoRecord;
+  test: {
+    id: number;
+    product_id: number;
+    test_type: string;
+    status: string;
+  };
+};
+
+export type PhotoFeedPage = {
+  items: PhotoFeedItem[];
+  limit: number;
+  next_cursor: string | null;
+};
+
+/** One page of photos across all tests, newest first. */
+export async function getPhotoFeedPage(cursor?: string | null, limit = 60) {
+  const params = new URLSearchParams({ limit: String(limit) });
+  if (cursor) {
+    params.set('cursor', cursor);
+  }
+  return request<PhotoFeedPage>(`${PHOTO_ENDPOINTS.feed}?${params}`);
+}
+
+export type PhotoGroup = {
+  test_id: number;
+  total: number;
+  photos: PhotoRecord[];
+};
+
+/** Test IDs the backend accepts per lookup (PHOTO_LOOKUP_MAX_TESTS); larger sets are split. */
+export const PHOTO_LOOKUP_MAX_TESTS = 1000;
+
+/** The first `perTest` photos of each test, one request per PHOTO_LOOKUP_MAX_TESTS tests. */
+export async function getPhotosForTests(testIds: Array<string | number>, perTest?: number) {
+  const ids = testIds.map(Number);
+  const batches: number[][] = [];
+  for (let start = 0; start < ids.length; start += PHOTO_LOOKUP_MAX_TESTS) {
+    batches.push(ids.slice(start, start + PHOTO_LOOKUP_MAX_TESTS));
+  }
+  const bodies = await Promise.all(
+    batches.map((batch) =>
+      request<{ groups: PhotoGroup[] }>(PHOTO_ENDPOINTS.lookup, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ test_ids: batch, per_test: perTest }),
+      }),
+    ),
+  );
+  return bodies.flatMap((body) => body.groups);
+}
@@ -0,0 +1,40 @@
+import { request } from './http';
+
+const API_BASE = '/api/v1';
+
+export const TEST_ENDPOINTS = {
+  summary: `${API_BASE}/tests/summary`,
+};
+
+export type TestSummary = {
+  test: { id: number };
+  photo_count: number;
+  defect_count: number;
+  defects_by_severity: Record<string, number>;
+  annotation_count: number;
+  last_activity_at: string;
+};
+
+type TestSummaryPage = {
+  items: TestSummary[];
+  limit: number;
+  next_cursor: string | null;
+};
+
+/** Most test IDs per summary request: one page at the endpoint's largest limit. */
+const SUMMARY_BATCH = 200;
+
+/** Photo and defect aggregates of the given tests, one request per SUMMARY_BATCH tests. */
+export async function getTestSummaries(testIds: Array<string | number>) {
+  const batches: string[] = [];
+  for (let start = 0; start < testIds.length; start += SUMMARY_BATCH) {
+    batches.push(testIds.slice(start, start + SUMMARY_BATCH).join(','));
+  }
+  const pages = await Promise.all(
+    batches.map((ids) => {
+      const params = new URLSearchParams({ limit: String(SUMMARY_BATCH), test_ids: ids });
+      return request<TestSummaryPage>(`${TEST_ENDPOINTS.summary}?${params}`);
+    }),
+  );
+  return pages.flatMap((page) => page.items);
+}
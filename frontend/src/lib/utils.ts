@@ -1,3 +1,4 @@
+import type { CSSProperties } from 'react';
 import type { ClassValue } from 'clsx';
 import { clsx } from 'clsx';
 import { twMerge } from 'tailwind-merge';
@@ -5,3 +6,14 @@ import { twMerge } from 'tailwind-merge';
 export function cn(...inputs: ClassValue[]) {
   return twMerge(clsx(inputs));
 }
+
+/**
+ * Tile background for a photo: its inline low-quality placeholder (a tiny
+ * data: URI sent with photo lists), stretched and blurred by the browser
+ * until the real image has loaded on top of it.
+ */
+export function photoPlaceholderStyle(placeholder?: string | null): CSSProperties {
+  return placeholder
+    ? { backgroundImage: `url(${placeholder})`, backgroundSize: 'cover', backgroundPosition: 'center' }
+    : {};
+}
@@ -1,46 +1,38 @@
-import { useEffect, useState } from 'react';
-import { Link, useOutletContext } from 'react-router-dom';
-import type { AppDataContext } from '../components/layout/AppShell';
+import { useCallback, useEffect, useState } from 'react';
+import { Link } from 'react-router-dom';
+import { photoPlaceholderStyle } from '@/lib/utils';
+import { getPhotoFeedPage, type PhotoFeedItem } from '@/lib/api/photos';
 
 export function Gallery() {
-    const { tests } = useOutletContext<AppDataContext>();
-    const [photos, setPhotos] = useState<Array<{ id: number; test_id: number; file_path: string; url?: string }>>([]);
+    const [items, setItems] = useState<PhotoFeedItem[]>([]);
+    const [cursor, setCursor] = useState<string | null>(null);
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
+
+    // One feed request per page, newest first, instead of one per test
+    const loadPage = useCallback(async (after: string | null) => {
+        const page = await getPhotoFeedPage(after);
+        setItems((prev) => (after ? [...prev, ...page.items] : page.items));
+        setCursor(page.next_cursor);
+    }, []);
 
     useEffect(() => {
-        const fetchAllPhotos = async () => {
-            try {
-                setLoading(true);
-                const allPhotos: Array<{ id: number; test_id: number; file_path: string; url?: string }> = [];
-                
-                // Fetch photos for each test
-                for (const test of tests) {
-                    const response = await fetch(`/api/v1/photos/test/${test.id}`);
-                    if (response.ok) {
-                        const testPhotos = await response.json();
-                        
-                        // Fetch presigned URLs for each photo
-                        const photosWithUrls = await Promise.all(
-                            testPhotos.map(async (photo: any) => {
-                                // Use direct image endpoint with timestamp to prevent caching
-                                return { ...photo, url: `/api/v1/photos/${photo.id}/image?t=${Date.now()}` };
-                            })
-                        );
-                        
-                        allPhotos.push(...photosWithUrls);
-                    }
-                }
-                
-                setPhotos(allPhotos);
-            } catch (error) {
-                console.error('Failed to fetch photos:', error);
-            } finally {
-                setLoading(false);
-            }
-        };
+        setLoading(true);
+        loadPage(null)
+            .catch((error) => console.error('Failed to fetch photos:', error))
+            .finally(() => setLoading(false));
+    }, [loadPage]);
 
-        fetchAllPhotos();
-    }, [tests]);
+    const loadMore = async () => {
+        setLoadingMore(true);
+        try {
+            await loadPage(cursor);
+        } catch (error) {
+            console.error('Failed to fetch photos:', error);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
 
     return (
         <div className="page">
@@ -52,28 +44,31 @@ export function Gallery() {
             {loading ? (
                 <p className="page-description">Loading photos...</p>
             ) : (
-                <div className="gallery-grid">
-                    {photos.length === 0 ? (
-                        <p className="page-description">No photos yet. Upload photos when creating a test.</p>
-                    ) : (
-                        photos.map((photo) => (
-                            <Link
-                                key={photo.id}
-                                className="gallery-item"
-                                style={{ backgroundColor: '#1f2937' }}
-                                to={`/photos/${photo.id}`}
-                            >
-                                {photo.url ? (
-                                    <img src={photo.url} alt={`Photo ${photo.id}`} style={{ width: '100%', height: '100%', objectFit: 'cover' }} />
-                                ) : (
-                                    <span style={{ color: 'white', textShadow: '0 1px 2px rgba(0,0,0,0.3)' }}>
-                                        Loading...
-                                    </span>
-                                )}
-                            </Link>
-                        ))
+                <>
+                    <div className="gallery-grid">
+                        {items.length === 0 ? (
+                            <p className="page-description">No photos yet. Upload photos when creating a test.</p>
+                        ) : (
+                            items.map(({ photo, test }) => (
+                                <Link
+                                    key={photo.id}
+                                    className="gallery-item"
+                                    style={{ backgroundColor: '#1f2937', ...photoPlaceholderStyle(photo.placeholder) }}
+                                    to={`/photos/${photo.id}`}
+                                    title={`Test #${test.id} · ${test.test_type} · ${test.status}`}
+                                >
+                                    {/* Versioned URL: cached by the browser as immutable */}
+                                    <img src={photo.thumb_url} alt={`Photo ${photo.id}`} loading="lazy" decoding="async" style={{ width: '100%', height: '100%', objectFit: 'cover' }} />
+                                </Link>
+                            ))
+                        )}
+                    </div>
+                    {cursor && (
+                        <button className="btn btn-secondary" onClick={loadMore} disabled={loadingMore}>
+                            {loadingMore ? 'Loading...' : 'Load more'}
+                        </button>
                     )}
-                </div>
+                </>
             )}
         </div>
     );
@@ -54,8 +54,12 @@ export function PhotoDefects() {
     if (!photoId) {
       return '';
     }
-    return `/api/v1/photos/${photoId}/image?t=${Date.now()}`;
-  }, [photoId]);
+    // Wait for the versioned URL; fall back to the plain one if the photo lookup failed
+    if (!photo) {
+      return '';
+    }
+    return photo.image_url ?? `/api/v1/photos/${photoId}/image`;
+  }, [photoId, photo]);
 
   const resetForm = () => {
     setForm({
@@ -89,6 +93,9 @@ export function PhotoDefects() {
       return;
     }
     loadDefects();
+    getPhoto(photoId)
+      .then(setPhoto)
+      .catch(() => setPhoto({ id: photoId }));
   }, [photoId]);
 
   if (!photoId) {
@@ -7,14 +7,16 @@ import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select';
 import { TEST_STATUSES, TEST_TYPES, type TestStatus, type TestType } from '@/lib/db-constants';
+import { photoPlaceholderStyle } from '@/lib/utils';
+import { getAllTestPhotos } from '@/lib/api/photos';
 
 export function TestDetails() {
-    const { tests, addAuditEvent, removeTest, updateTest } = useOutletContext<AppDataContext>();
+    const { tests, testsLoaded, addAuditEvent, removeTest, updateTest, loadTest } = useOutletContext<AppDataContext>();
     const { id } = useParams<{ id: string }>();
     const navigate = useNavigate();
     const test = tests.find((t) => t.id === id);
-    const [apiPhotos, setApiPhotos] = useState<Array<{ id: number; test_id: number; file_path: string; url?: string }>>([]);
-    const [photosWithDefects, setPhotosWithDefects] = useState<Array<{ id: number; test_id: number; file_path: string; url?: string; defectCount: number }>>([]);
+    const [apiPhotos, setApiPhotos] = useState<Array<{ id: number; test_id: number; file_path: string; url?: string; placeholder?: string | null }>>([]);
+    const [photosWithDefects, setPhotosWithDefects] = useState<Array<{ id: number; test_id: number; file_path: string; url?: string; placeholder?: string | null; defectCount: number }>>([]);
     const [isDeleting, setIsDeleting] = useState(false);
     const [showDeleteConfirm, setShowDeleteConfirm] = useState(false);
     const [showUpdateModal, setShowUpdateModal] = useState(false);
@@ -34,16 +36,22 @@ export function TestDetails() {
         status: (test?.status ?? 'pending') as TestStatus,
     });
 
+    useEffect(() => {
+        // Only the first page of tests is loaded up front
+        if (testsLoaded && id && !test) {
+            loadTest(id).catch((error) => console.error('Failed to fetch test:', error));
+        }
+    }, [testsLoaded, id, test, loadTest]);
+
     useEffect(() => {
         if (id) {
-            fetch(`/api/v1/photos/test/${id}`)
-                .then(res => res.json())
+            getAllTestPhotos(id)
                 .then(async (data) => {
                     console.log('Fetched photos from API:', data);
                     const photosWithUrls = await Promise.all(
                         data.map(async (photo: any) => {
-                            // Use direct image endpoint with timestamp to prevent caching issues
-                            return { ...photo, url: `/api/v1/photos/${photo.id}/image?t=${Date.now()}` };
+                            // Versioned URL: cached by the browser as immutable
+                            return { ...photo, url: photo.image_url };
                         })
                     );
                     console.log('Photos with URLs:', photosWithUrls);
@@ -313,8 +321,8 @@ export function TestDetails() {
                         const photoData = await photoResponse.json();
                         console.log('Photo uploaded:', photoData);
                         
-                        // Use direct image endpoint with timestamp
-                        setApiPhotos(prev => [...prev, { ...photoData, url: `/api/v1/photos/${photoData.id}/image?t=${Date.now()}` }]);
+                        // Versioned URL: cached by the browser as immutable
+                        setApiPhotos(prev => [...prev, { ...photoData, url: photoData.image_url }]);
                     } else {
                         const errorText = await photoResponse.text();
                         console.error(`Failed to upload ${file.name}:`, errorText);
@@ -423,12 +431,14 @@ export function TestDetails() {
                                             key={photo.id}
                                             to={`/photos/${photo.id}`}
                                             className="gallery-item"
-                                            style={{ backgroundColor: '#1f2937' }}
+                                            style={{ backgroundColor: '#1f2937', ...photoPlaceholderStyle(photo.placeholder) }}
                                         >
                                             {photo.url ? (
                                                 <img
                                                     src={photo.url}
                                                     alt={`Photo ${photo.id}`}
+                                                    loading="lazy"
+                                                    decoding="async"
                                                     style={{ width: '100%', height: '100%', objectFit: 'cover' }}
                                                     onLoad={() => console.log(`Image loaded: Photo ${photo.id}`, photo.url)}
                                                     onError={(e) => console.error(`Image failed to load: Photo ${photo.id}`, photo.url, e)}
@@ -459,13 +469,15 @@ export function TestDetails() {
                                             key={photo.id}
                                             to={`/photos/${photo.id}`}
                                             className="gallery-item"
-                                            style={{ backgroundColor: '#1f2937', position: 'relative' }}
+                                            style={{ backgroundColor: '#1f2937', position: 'relative', ...photoPlaceholderStyle(photo.placeholder) }}
                                         >
                                             {photo.url ? (
                                                 <>
                                                     <img
                                                         src={photo.url}
                                                         alt={`Photo ${photo.id}`}
+                                                        loading="lazy"
+                                                        decoding="async"
                                                         style={{ width: '100%', height: '100%', objectFit: 'cover' }}
                                                     />
                                                     <div style={{ 
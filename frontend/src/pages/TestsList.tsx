@@ -1,4 +1,4 @@
-import { type FormEvent, useMemo, useState } from 'react';
+import { type FormEvent, useEffect, useMemo, useRef, useState } from 'react';
 import { Link, useOutletContext } from 'react-router-dom';
 import type { AppDataContext } from '../components/layout/AppShell';
 import { Button } from '@/components/ui/button';
@@ -6,6 +6,11 @@ import { Card, CardContent, CardHeader, CardTitle } from '@/components/ui/card';
 import { Input } from '@/components/ui/input';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select';
 import { formatEnumLabel, TEST_STATUSES, type TestStatus } from '@/lib/db-constants';
+import { getPhotosForTests, type PhotoGroup } from '@/lib/api/photos';
+import { getTestSummaries, type TestSummary } from '@/lib/api/tests';
+import { photoPlaceholderStyle } from '@/lib/utils';
+
+const PREVIEWS_PER_TEST = 4;
 
 const statusClass: Record<TestStatus, string> = {
     open: 'badge-open',
@@ -17,48 +22,63 @@ const statusClass: Record<TestStatus, string> = {
 const statusLabel = (status: TestStatus) => formatEnumLabel(status);
 
 export function TestsList() {
-    const { tests, testsLoaded } = useOutletContext<AppDataContext>();
-    const [searchInput, setSearchInput] = useState('');
-    const [searchQuery, setSearchQuery] = useState('');
-    const [statusFilter, setStatusFilter] = useState('');
+    const { tests, testsLoaded, hasMoreTests, loadMoreTests, testFilters, setTestFilters } =
+        useOutletContext<AppDataContext>();
+    const [searchInput, setSearchInput] = useState(testFilters.q ?? '');
+    const statusFilter = testFilters.status ?? '';
+    const [previews, setPreviews] = useState<Record<string, PhotoGroup>>({});
+    const [summaries, setSummaries] = useState<Record<string, TestSummary>>({});
+    const [loadingMore, setLoadingMore] = useState(false);
+    // Tests whose previews and counts were already requested (kept across pages and filters)
+    const requestedTestIds = useRef(new Set<string>());
+
+    const loadMore = async () => {
+        setLoadingMore(true);
+        try {
+            await loadMoreTests();
+        } catch (error) {
+            console.error('Failed to fetch tests:', error);
+        } finally {
+            setLoadingMore(false);
+        }
+    };
 
+    // Search and status are applied by the API across all tests, not just the loaded pages
     const handleSearchSubmit = (event: FormEvent<HTMLFormElement>) => {
         event.preventDefault();
-        setSearchQuery(searchInput.trim());
+        setTestFilters({ ...testFilters, q: searchInput.trim() || undefined });
     };
 
-    const filteredTests = useMemo(() => {
-        const normalizedQuery = searchQuery.toLowerCase();
-        const tokens = normalizedQuery.split(/\s+/).filter(Boolean);
-
-        return tests.filter((test) => {
-            if (statusFilter && test.status !== statusFilter) {
-                return false;
-            }
+    const visibleTestIds = useMemo(() => tests.map((test) => test.id).join(','), [tests]);
 
-            if (tokens.length === 0) {
-                return true;
-            }
+    useEffect(() => {
+        const ids = visibleTestIds.split(',').filter((id) => id && !requestedTestIds.current.has(id));
+        if (ids.length === 0) {
+            return;
+        }
+        ids.forEach((id) => requestedTestIds.current.add(id));
+        // Previews and counts of the tests on screen only; the backend keeps just the first few photos of each
+        getPhotosForTests(ids, PREVIEWS_PER_TEST)
+            .then((groups) =>
+                setPreviews((prev) => ({
+                    ...prev,
+                    ...Object.fromEntries(groups.map((group) => [String(group.test_id), group])),
+                })),
+            )
+            .catch((error) => console.error('Failed to fetch photo previews:', error));
+        getTestSummaries(ids)
+            .then((items) =>
+                setSummaries((prev) => ({
+                    ...prev,
+                    ...Object.fromEntries(items.map((item) => [String(item.test.id), item])),
+                })),
+            )
+            .catch((error) => console.error('Failed to fetch test summaries:', error));
+    }, [visibleTestIds]);
 
-            const haystack = [
-                test.id,
-                test.externalOrderId,
-                test.productType,
-                test.testType,
-                test.requester,
-                test.deadline,
-                test.status,
-                statusLabel(test.status),
-            ]
-                .join(' ')
-                .toLowerCase();
-
-            return tokens.every((token) => haystack.includes(token));
-        });
-    }, [searchQuery, statusFilter, tests]);
-
-    const showEmptyState = testsLoaded && tests.length === 0;
-    const showNoMatches = testsLoaded && tests.length > 0 && filteredTests.length === 0;
+    const filtered = Boolean(testFilters.q || testFilters.status);
+    const showEmptyState = testsLoaded && !filtered && tests.length === 0;
+    const showNoMatches = testsLoaded && filtered && tests.length === 0;
 
     return (
         <div className="page">
@@ -77,8 +97,8 @@ export function TestsList() {
                     onChange={(event) => {
                         const nextValue = event.target.value;
                         setSearchInput(nextValue);
-                        if (nextValue.trim() === '') {
-                            setSearchQuery('');
+                        if (nextValue.trim() === '' && testFilters.q) {
+                            setTestFilters({ ...testFilters, q: undefined });
                         }
                     }}
                 />
@@ -87,7 +107,7 @@ export function TestsList() {
                 </Button>
                 <Select
                     value={statusFilter || 'all'}
-                    onValueChange={(value) => setStatusFilter(value === 'all' ? '' : value)}
+                    onValueChange={(value) => setTestFilters({ ...testFilters, status: value === 'all' ? undefined : value })}
                 >
                     <SelectTrigger className="form-select">
                         <SelectValue placeholder="All Status" />
@@ -110,7 +130,7 @@ export function TestsList() {
                     {showNoMatches ? (
                         <p className="page-description">No tests match your search or filters.</p>
                     ) : (
-                        filteredTests.map((test) => (
+                        tests.map((test) => (
                             <Link
                                 to={`/tests/${test.id}`}
                                 key={test.id}
@@ -126,11 +146,42 @@ export function TestsList() {
                                     <CardContent className="card-meta p-0">
                                         <span>{test.productType}</span>
                                         <span>{test.deadline}</span>
+                                        {summaries[test.id] && (
+                                            <span>
+                                                {summaries[test.id].photo_count} photos · {summaries[test.id].defect_count} defects
+                                                {summaries[test.id].defects_by_severity.critical > 0 &&
+                                                    ` (${summaries[test.id].defects_by_severity.critical} critical)`}
+                                            </span>
+                                        )}
                                     </CardContent>
+                                    {previews[test.id]?.photos.length ? (
+                                        <div className="flex items-center gap-2" style={{ marginTop: '0.5rem' }}>
+                                            {previews[test.id].photos.map((photo) => (
+                                                <img
+                                                    key={photo.id}
+                                                    src={photo.thumb_url}
+                                                    alt={`Photo ${photo.id}`}
+                                                    loading="lazy"
+                                                    decoding="async"
+                                                    style={{ width: 48, height: 48, objectFit: 'cover', borderRadius: 4, ...photoPlaceholderStyle(photo.placeholder) }}
+                                                />
+                                            ))}
+                                            {previews[test.id].total > previews[test.id].photos.length && (
+                                                <span className="page-description">
+                                                    +{previews[test.id].total - previews[test.id].photos.length}
+                                                </span>
+                                            )}
+                                        </div>
+                                    ) : null}
                                 </Card>
                             </Link>
                         ))
                     )}
+                    {hasMoreTests && (
+                        <button className="btn btn-secondary" onClick={loadMore} disabled={loadingMore}>
+                            {loadingMore ? 'Loading...' : 'Load more'}
+                        </button>
+                    )}
                 </div>
             )}
         </div>